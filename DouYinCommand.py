@@ -35,8 +35,17 @@ except ImportError:
 
 from apiproxy.douyin.douyin import Douyin
 from apiproxy.douyin.download import Download
+from apiproxy.douyin.orchestrator import CrawlOrchestrator, CrawlJob
+from apiproxy.douyin.blobstore import BlobStore
+from apiproxy.douyin.quality import quality_policy
+from apiproxy.douyin.resolver import link_resolver
 from apiproxy.douyin import douyin_headers
-from apiproxy.common import utils
+from apiproxy.common import utils, session, response_cache, bandwidth_shaper, host_gate
+from apiproxy.common.bandwidth import BandwidthShaper
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
+if ASYNC_SUPPORT:
+    from apiproxy.douyin.async_download import AsyncDownload
+    from apiproxy.common.aio import iterate_in_thread, run_in_thread
 
 @dataclass
 class DownloadConfig:
@@ -102,6 +111,31 @@ configModel = {
         "music": False,
     },
     "thread": 5,
+    "async": False,
+    "segments": 4,
+    "segment_min_mb": 16,
+    "min_speed_kb": 20,
+    "stall_window": 15,
+    "quality": {
+        "prefer": "highest",
+        "max_resolution": 0,
+        "max_bitrate_kbps": 0,
+        "max_size_mb": 0,
+    },
+    "bandwidth": {
+        "rate_kbps": 0,
+        "host_kbps": 0,
+        "job_kbps": 0,
+        "budget_mb": 0,
+        "job_budget_mb": 0,
+        "schedule": [],
+    },
+    "cache": True,
+    "cache_mb": 64,
+    "jobs": 1,
+    "api_host_requests": 4,
+    "dedup": True,
+    "manifest": True,
     "cookie": os.environ.get("DOUYIN_COOKIE", "")
 }
 
@@ -151,6 +185,54 @@ def argument():
     parser.add_argument("--thread", "-t",
                         help="设置线程数, 默认5个线程",
                         type=int, required=False, default=5)
+    parser.add_argument("--async", "-A", dest="asyncmode",
+                        help="是否使用异步模式(True/False), 所有链接并发解析与下载, 需要安装 aiohttp, 默认为False",
+                        type=utils.str2bool, required=False, default=False)
+    parser.add_argument("--segments", "-S",
+                        help="大视频分段下载的连接数, 1 表示不分段, 默认4",
+                        type=int, required=False, default=4)
+    parser.add_argument("--min-speed", dest="min_speed_kb",
+                        help="单个连接的最低下载速度(KB/s), 持续低于该速度时中断并换新连接或其他镜像续传, 0 表示不限制, 默认20",
+                        type=int, required=False, default=20)
+    parser.add_argument("--stall-window", dest="stall_window",
+                        help="判定下载速度过低的统计时长(秒), 默认15",
+                        type=int, required=False, default=15)
+    parser.add_argument("--quality", "-Q", choices=["highest", "lowest"],
+                        help="视频清晰度策略: highest 取满足上限的最高版本, lowest 取最低版本, 默认highest",
+                        type=str, required=False, default="highest")
+    parser.add_argument("--max-resolution", dest="max_resolution",
+                        help="视频清晰度上限(短边像素), 如 720 表示最高 720p, 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--max-bitrate", dest="max_bitrate_kbps",
+                        help="视频码率上限(kbps), 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--max-video-mb", dest="max_size_mb",
+                        help="单个视频的大小上限(MB), 超出时选择更低的版本, 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--limit-rate", dest="rate_kbps",
+                        help="所有下载合计的带宽上限(KB/s), 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--host-limit-rate", dest="host_kbps",
+                        help="每个CDN节点的带宽上限(KB/s), 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--job-limit-rate", dest="job_kbps",
+                        help="每个抓取任务的带宽上限(KB/s), 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--budget-mb", dest="budget_mb",
+                        help="本次运行的下载流量预算(MB), 用完后不再开始新的下载, 默认0 不限制",
+                        type=int, required=False, default=0)
+    parser.add_argument("--jobs", "-J",
+                        help="同时进行的抓取任务数(每个用户的每种模式为一个任务), 大于1时多个用户并行下载, 默认1",
+                        type=int, required=False, default=1)
+    parser.add_argument("--api-host-requests", dest="api_host_requests",
+                        help="同时进行的 www.douyin.com 接口请求数上限, 只限制翻页等接口请求, 不限制任务数与文件下载, 默认4",
+                        type=int, required=False, default=4)
+    parser.add_argument("--dedup", help="是否跨目录去重(True/False), 同一文件在不同目录中只下载一次并以硬链接保存, 默认为True",
+                        type=utils.str2bool, required=False, default=True)
+    parser.add_argument("--manifest", help="是否使用下载清单(True/False), 已下载的文件只查清单不再逐个检查磁盘, 默认为True",
+                        type=utils.str2bool, required=False, default=True)
+    parser.add_argument("--cache", help="是否使用接口响应缓存(True/False), 重复解析同一链接时不再请求接口, 默认为True",
+                        type=utils.str2bool, required=False, default=True)
     parser.add_argument("--cookie", help="设置cookie, 格式: \"name1=value1; name2=value2;\" 注意要加冒号",
                         type=str, required=False, default='')
     parser.add_argument("--config", "-F", 
@@ -210,6 +292,22 @@ def validate_config(config: dict) -> bool:
     if not all(isinstance(url, str) for url in config['link']):
         douyin_logger.error("链接配置格式错误")
         return False
+
+    if config['quality'].get('prefer') not in ("highest", "lowest"):
+        douyin_logger.error("无效配置项: quality.prefer 只能为 highest 或 lowest")
+        return False
+
+    schedule = config['bandwidth'].get('schedule') or []
+    try:
+        if not isinstance(schedule, list):
+            raise ValueError("应为时段列表")
+        BandwidthShaper.parse_schedule(schedule)
+        for item in schedule:
+            if not isinstance(item.get("rate_kbps", 0), int) or item.get("rate_kbps", 0) < 0:
+                raise ValueError(f"rate_kbps 应为非负整数: {item}")
+    except ValueError as e:
+        douyin_logger.error(f"无效配置项: bandwidth.schedule {e}; 时间格式为 \"HH:MM\"(00:00 至 24:00)")
+        return False
         
     return True
 
@@ -244,6 +342,29 @@ def main():
     os.makedirs(configModel["path"], exist_ok=True)
     douyin_logger.info(f"数据保存路径 {configModel['path']}")
 
+    # 接口响应缓存; 关闭时短链解析结果也不读写缓存
+    response_cache.configure(enabled=configModel["cache"], max_bytes=configModel["cache_mb"] * 1024 * 1024)
+    link_resolver.configure(enabled=configModel["cache"])
+
+    # 同时进行的接口请求数, 避免多个任务同时翻页触发限流; 只在请求期间占用名额
+    host_gate.configure({"www.douyin.com": configModel["api_host_requests"]})
+
+    # 视频清晰度策略, 作品解析时从 bit_rate 中按策略选择版本
+    quality = configModel["quality"]
+    quality_policy.configure(mode=quality["prefer"], max_resolution=quality["max_resolution"],
+                             max_bitrate=quality["max_bitrate_kbps"],
+                             max_size=quality["max_size_mb"] * 1024 * 1024)
+
+    # 带宽整形与流量预算, 所有下载数据流共享
+    bandwidth = configModel["bandwidth"]
+    bandwidth_shaper.configure(rate=bandwidth["rate_kbps"] * 1024, host_rate=bandwidth["host_kbps"] * 1024,
+                               job_rate=bandwidth["job_kbps"] * 1024,
+                               budget=bandwidth["budget_mb"] * 1024 * 1024,
+                               job_budget=bandwidth["job_budget_mb"] * 1024 * 1024,
+                               schedule=[{"start": item["start"], "end": item["end"],
+                                          "rate": item.get("rate_kbps", 0) * 1024}
+                                         for item in bandwidth["schedule"] or []])
+
     # 初始化下载器
     dy = Douyin(database=configModel["database"])
     dl = Download(
@@ -252,16 +373,63 @@ def main():
         cover=configModel["cover"],
         avatar=configModel["avatar"],
         resjson=configModel["json"],
-        folderstyle=configModel["folderstyle"]
+        folderstyle=configModel["folderstyle"],
+        segments=configModel["segments"],
+        segment_min_mb=configModel["segment_min_mb"],
+        min_speed_kb=configModel["min_speed_kb"],
+        stall_window=configModel["stall_window"],
+        blob_dir=_blob_dir(),
+        manifest_dir=_manifest_dir()
     )
+    # 作品级与文件级线程池会同时访问同一个CDN域名, 分段下载时每个文件再占用多个连接
+    session.set_pool_size(cdn=configModel["thread"] * 2 * max(1, configModel["segments"]))
 
-    # 处理每个链接
+    # 并发解析所有分享链接, 之后逐个处理时直接命中解析缓存
+    share_links = []
     for link in configModel["link"]:
-        process_link(dy, dl, link)
+        try:
+            share_links.append(dy.getShareLink(link))
+        except IndexError:
+            pass
+    dy.getKeys(share_links)
+
+    if configModel["async"] and not ASYNC_SUPPORT:
+        douyin_logger.warning("aiohttp 未安装，回退到同步模式")
+
+    if configModel["async"] and ASYNC_SUPPORT:
+        asyncio.run(run_async(configModel["link"]))
+    elif configModel["jobs"] > 1:
+        run_parallel(dy, configModel["link"])
+    else:
+        # 处理每个链接
+        for link in configModel["link"]:
+            process_link(dy, dl, link)
 
     # 计算耗时
     duration = time.time() - start
     douyin_logger.info(f'\n[下载完成]:总耗时: {int(duration/60)}分钟{int(duration%60)}秒\n')
+    for host, stats in session.stats().items():
+        douyin_logger.info(f"[连接复用]:{host} 请求 {stats['requests']} 次, 新建连接 {stats['connections']} 个, 复用 {stats['reused']} 次")
+    if configModel["cache"]:
+        stats = response_cache.stats()
+        douyin_logger.info(f"[接口缓存]:命中 {stats['hits']} 次, 未命中 {stats['misses']} 次")
+    if configModel["dedup"]:
+        blobs = BlobStore.open(_blob_dir())
+        if blobs.linked:
+            douyin_logger.info(f"[去重]:复用已下载文件 {blobs.linked} 个, 节省 {blobs.saved_bytes / 1024 / 1024:.1f}MB")
+    if bandwidth_shaper.used:
+        budget = f" / 预算 {bandwidth_shaper.budget / 1024 / 1024:.0f}MB" if bandwidth_shaper.budget else ""
+        douyin_logger.info(f"[流量]:本次下载 {bandwidth_shaper.used / 1024 / 1024:.1f}MB{budget}")
+
+
+def _blob_dir():
+    """去重仓库目录, 未启用去重时为 None"""
+    return os.path.join(configModel["path"], ".blobs") if configModel["dedup"] else None
+
+
+def _manifest_dir():
+    """下载清单所在目录(下载根目录), 未启用清单时为 None"""
+    return configModel["path"] if configModel["manifest"] else None
 
 
 def process_link(dy, dl, link):
@@ -283,6 +451,8 @@ def process_link(dy, dl, link):
         
         handler = handlers.get(key_type)
         if handler:
+            # 每个链接作为一个任务, 按任务限速与计算流量预算
+            dl.job = key
             handler(dy, dl, key)
         else:
             douyin_logger.warning(f"[  警告  ]:未知的链接类型: {key_type}")
@@ -290,9 +460,8 @@ def process_link(dy, dl, link):
         douyin_logger.error(f"处理链接时出错: {str(e)}")
 
 
-def handle_user_download(dy, dl, key):
-    """处理用户主页下载"""
-    douyin_logger.info("[  提示  ]:正在请求用户主页下作品")
+def _user_path(dy, key):
+    """用户主页的保存目录"""
     data = dy.getUserDetailInfo(sec_uid=key)
     nickname = ""
     if data and data.get('user'):
@@ -300,19 +469,32 @@ def handle_user_download(dy, dl, key):
 
     userPath = os.path.join(configModel["path"], f"user_{nickname}_{key}")
     os.makedirs(userPath, exist_ok=True)
+    return userPath
+
+
+def handle_user_download(dy, dl, key):
+    """处理用户主页下载"""
+    douyin_logger.info("[  提示  ]:正在请求用户主页下作品")
+    userPath = _user_path(dy, key)
 
     for mode in configModel["mode"]:
-        douyin_logger.info("-" * 80)
-        douyin_logger.info(f"[  提示  ]:正在请求用户主页模式: {mode}")
-        
-        if mode in ('post', 'like'):
-            _handle_post_like_mode(dy, dl, key, mode, userPath)
-        elif mode == 'mix':
-            _handle_mix_mode(dy, dl, key, userPath)
+        handle_user_mode(dy, dl, key, mode, userPath)
+
+
+def handle_user_mode(dy, dl, key, mode, userPath=None):
+    """下载用户主页的某一种模式(post/like/mix)"""
+    douyin_logger.info("-" * 80)
+    douyin_logger.info(f"[  提示  ]:正在请求用户主页模式: {mode}")
+    userPath = userPath or _user_path(dy, key)
+
+    if mode in ('post', 'like'):
+        _handle_post_like_mode(dy, dl, key, mode, userPath)
+    elif mode == 'mix':
+        _handle_mix_mode(dy, dl, key, userPath)
 
 def _handle_post_like_mode(dy, dl, key, mode, userPath):
-    """处理发布/喜欢模式的下载"""
-    datalist = dy.getUserInfo(
+    """处理发布/喜欢模式的下载, 边翻页边下载"""
+    datalist = dy.iterUserInfo(
         key, 
         mode, 
         35, 
@@ -321,9 +503,6 @@ def _handle_post_like_mode(dy, dl, key, mode, userPath):
         start_time=configModel.get("start_time", ""),
         end_time=configModel.get("end_time", "")
     )
-    
-    if not datalist:
-        return
         
     modePath = os.path.join(userPath, mode)
     os.makedirs(modePath, exist_ok=True)
@@ -342,7 +521,7 @@ def _handle_mix_mode(dy, dl, key, userPath):
     for mix_id, mix_name in mixIdNameDict.items():
         douyin_logger.info(f'[  提示  ]:正在下载合集 [{mix_name}] 中的作品')
         mix_file_name = utils.replaceStr(mix_name)
-        datalist = dy.getMixInfo(
+        datalist = dy.iterMixInfo(
             mix_id, 
             35, 
             0, 
@@ -352,15 +531,14 @@ def _handle_mix_mode(dy, dl, key, userPath):
             end_time=configModel.get("end_time", "")
         )
         
-        if datalist:
-            dl.userDownload(awemeList=datalist, savePath=os.path.join(modePath, mix_file_name))
-            douyin_logger.info(f'[  提示  ]:合集 [{mix_name}] 中的作品下载完成')
+        dl.userDownload(awemeList=datalist, savePath=os.path.join(modePath, mix_file_name))
+        douyin_logger.info(f'[  提示  ]:合集 [{mix_name}] 中的作品下载完成')
 
 def handle_mix_download(dy, dl, key):
     """处理单个合集下载"""
     douyin_logger.info("[  提示  ]:正在请求单个合集下作品")
     try:
-        datalist = dy.getMixInfo(
+        datalist = dy.iterMixInfo(
             key, 
             35, 
             configModel["number"]["mix"], 
@@ -370,11 +548,13 @@ def handle_mix_download(dy, dl, key):
             end_time=configModel.get("end_time", "")
         )
         
-        if not datalist:
+        # 先看第一个作品确定合集名称, 全部作品边翻页边下载
+        first = datalist.peek()
+        if first is None:
             douyin_logger.error("获取合集信息失败")
             return
             
-        mixname = utils.replaceStr(datalist[0]["mix_info"]["mix_name"])
+        mixname = utils.replaceStr(first["mix_info"]["mix_name"])
         mixPath = os.path.join(configModel["path"], f"mix_{mixname}_{key}")
         os.makedirs(mixPath, exist_ok=True)
         dl.userDownload(awemeList=datalist, savePath=mixPath)
@@ -384,10 +564,11 @@ def handle_mix_download(dy, dl, key):
 def handle_music_download(dy, dl, key):
     """处理音乐作品下载"""
     douyin_logger.info("[  提示  ]:正在请求音乐(原声)下作品")
-    datalist = dy.getMusicInfo(key, 35, configModel["number"]["music"], configModel["increase"]["music"])
+    datalist = dy.iterMusicInfo(key, 35, configModel["number"]["music"], configModel["increase"]["music"])
 
-    if datalist:
-        musicname = utils.replaceStr(datalist[0]["music"]["title"])
+    first = datalist.peek()
+    if first is not None:
+        musicname = utils.replaceStr(first["music"]["title"])
         musicPath = os.path.join(configModel["path"], f"music_{musicname}_{key}")
         os.makedirs(musicPath, exist_ok=True)
         dl.userDownload(awemeList=datalist, savePath=musicPath)
@@ -401,7 +582,7 @@ def handle_aweme_download(dy, dl, key):
             douyin_logger.error("获取作品信息失败")
             return
             
-        datanew, _ = result  # 只有在确保result不为空时才解包
+        datanew = result
         
         if datanew:
             awemePath = os.path.join(configModel["path"], "aweme")
@@ -429,16 +610,135 @@ def handle_live_download(dy, dl, key):
         with open(json_path, "w", encoding='utf-8') as f:
             json.dump(live_json, f, ensure_ascii=False, indent=2)
 
-# 条件定义异步函数
-if ASYNC_SUPPORT:
-    async def download_file(url, path):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    async with aiofiles.open(path, 'wb') as f:
-                        await f.write(await response.read())
-                    return True
-        return False
+class _WorkerContext(object):
+    """并行模式下每个工作线程独立的 Douyin 与 Download 实例"""
+
+    def __init__(self, progress):
+        self.dy = Douyin(database=configModel["database"])
+        self.dl = Download(
+            thread=configModel["thread"],
+            music=configModel["music"],
+            cover=configModel["cover"],
+            avatar=configModel["avatar"],
+            resjson=configModel["json"],
+            folderstyle=configModel["folderstyle"],
+            segments=configModel["segments"],
+            segment_min_mb=configModel["segment_min_mb"],
+            min_speed_kb=configModel["min_speed_kb"],
+            stall_window=configModel["stall_window"],
+            progress=progress,
+            blob_dir=_blob_dir(),
+            manifest_dir=_manifest_dir()
+        )
+
+
+def _crawl_job(handler, *args):
+    """把 handler 包装为任务, 任务结果为本次下载成功/失败的作品数"""
+    def run(ctx):
+        before = dict(ctx.dl.stats)
+        # 按任务限速与计算流量预算
+        ctx.dl.job = ":".join(args)
+        try:
+            handler(ctx.dy, ctx.dl, *args)
+        finally:
+            ctx.dl.job = None
+        return f"成功 {ctx.dl.stats['success'] - before['success']}, 失败 {ctx.dl.stats['failed'] - before['failed']}"
+    return run
+
+
+def run_parallel(dy, links):
+    """并行模式: 每个用户的每种模式作为一个任务, 由编排器分发到 jobs 个工作线程
+
+    同一用户的任务依次执行, 不同用户之间轮转调度, 大账号不会阻塞其他账号。
+    """
+    handlers = {
+        "mix": handle_mix_download,
+        "music": handle_music_download,
+        "aweme": handle_aweme_download,
+        "live": handle_live_download
+    }
+    orchestrator = CrawlOrchestrator(workers=configModel["jobs"], per_owner=1)
+    for link in links:
+        try:
+            key_type, key = dy.getKey(dy.getShareLink(link))
+        except IndexError:
+            douyin_logger.warning(f"[  警告  ]:链接中没有网址: {link}")
+            continue
+        if key_type == "user":
+            for mode in configModel["mode"]:
+                orchestrator.add(CrawlJob(key, mode, _crawl_job(handle_user_mode, key, mode)))
+        elif key_type in handlers:
+            orchestrator.add(CrawlJob(key, key_type, _crawl_job(handlers[key_type], key)))
+        else:
+            douyin_logger.warning(f"[  警告  ]:未知的链接类型: {key_type}")
+
+    # 每个任务内部还有作品级与文件级线程池, 连接池按总并发放大
+    session.set_pool_size(api=max(10, configModel["jobs"] * 2),
+                          cdn=configModel["jobs"] * configModel["thread"] * 2 * max(1, configModel["segments"]))
+    progress = Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(),
+                        TaskProgressColumn(), TimeRemainingColumn(), transient=True)
+    with progress:
+        orchestrator.run(lambda: _WorkerContext(progress))
+    orchestrator.summary()
+
+
+class _DownloadCollector(object):
+    """异步模式下代替 Download 传给各个 handler, 只记录需要下载的作品列表(或翻页生成器)
+
+    job 由 process_link 设置, 与作品列表一起记录, 下载时传给共享的 AsyncDownload。
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self.job = None
+
+    def userDownload(self, awemeList, savePath):
+        self.jobs.append((awemeList, savePath, self.job))
+
+
+def resolve_link(link):
+    """在工作线程中解析单个链接
+
+    每个链接使用独立的 Douyin 实例; 返回的翻页生成器在下载时才逐页推进
+    """
+    dy = Douyin(database=configModel["database"])
+    collector = _DownloadCollector()
+    process_link(dy, collector, link)
+    return collector.jobs
+
+
+async def run_async(links):
+    """异步模式: 所有链接并发解析、分页, 解析完成的链接立即开始下载"""
+    resolve_sem = asyncio.Semaphore(configModel["thread"])
+
+    async with AsyncDownload(
+        thread=configModel["thread"],
+        music=configModel["music"],
+        cover=configModel["cover"],
+        avatar=configModel["avatar"],
+        resjson=configModel["json"],
+        folderstyle=configModel["folderstyle"],
+        segments=configModel["segments"],
+        segment_min_mb=configModel["segment_min_mb"],
+        min_speed_kb=configModel["min_speed_kb"],
+        stall_window=configModel["stall_window"],
+        blob_dir=_blob_dir(),
+        manifest_dir=_manifest_dir()
+    ) as adl:
+        async def run_link(link):
+            async with resolve_sem:
+                jobs = await run_in_thread(resolve_link, link)
+            # 同一个链接的各个任务共享一个 Douyin 实例, 依次下载
+            for awemeList, savePath, job in jobs:
+                ack = getattr(awemeList, "ack", None)
+                if not isinstance(awemeList, list):
+                    awemeList = iterate_in_thread(lambda it=awemeList: it)
+                await adl.userDownloadAsync(awemeList, savePath, job, ack)
+
+        results = await asyncio.gather(*(run_link(link) for link in links), return_exceptions=True)
+        for link, result in zip(links, results):
+            if isinstance(result, Exception):
+                douyin_logger.error(f"处理链接时出错: {link} {str(result)}")
 
 def update_config_from_args(args):
     """从命令行参数更新配置"""
@@ -451,6 +751,23 @@ def update_config_from_args(args):
     configModel["folderstyle"] = args.folderstyle
     configModel["mode"] = args.mode if args.mode else ["post"]
     configModel["thread"] = args.thread
+    configModel["async"] = args.asyncmode
+    configModel["segments"] = args.segments
+    configModel["min_speed_kb"] = max(0, args.min_speed_kb)
+    configModel["stall_window"] = max(1, args.stall_window)
+    configModel["quality"]["prefer"] = args.quality
+    configModel["quality"]["max_resolution"] = args.max_resolution
+    configModel["quality"]["max_bitrate_kbps"] = args.max_bitrate_kbps
+    configModel["quality"]["max_size_mb"] = args.max_size_mb
+    configModel["bandwidth"]["rate_kbps"] = args.rate_kbps
+    configModel["bandwidth"]["host_kbps"] = args.host_kbps
+    configModel["bandwidth"]["job_kbps"] = args.job_kbps
+    configModel["bandwidth"]["budget_mb"] = args.budget_mb
+    configModel["cache"] = args.cache
+    configModel["jobs"] = max(1, args.jobs)
+    configModel["api_host_requests"] = max(1, args.api_host_requests)
+    configModel["dedup"] = args.dedup
+    configModel["manifest"] = args.manifest
     configModel["cookie"] = args.cookie
     configModel["database"] = args.database
     
@@ -470,19 +787,3 @@ def update_config_from_args(args):
 
 if __name__ == "__main__":
     main()
-
-# 新增性能测试命令
-parser_test = subparsers.add_parser('test', help='运行测试套件')
-parser_test.add_argument('--performance', action='store_true', help='运行性能基准测试')
-
-# 现有命令处理逻辑
-if args.command == 'test' and args.performance:
-    os.system('scripts\\run_perf_test.bat')
-    else:
-        douyin_logger.warning(f"[  警告  ]:未知的链接类型: {key_type}")
-    except Exception as e:
-        douyin_logger.error(f"处理链接时出错: {str(e)}")
-
-# 更新requirements.txt增加jemalloc安装项
-# requirements.txt新增内容：
-# jemalloc==5.3.0; sys_platform == 'linux'
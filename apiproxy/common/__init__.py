@@ -1,6 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from .utils import Utils
+from .utils import Utils, XBogus
+from .session import HttpSession
+from .ratelimit import TokenBucket, Backoff, AdaptiveRateLimiter, HostGate
+from .cache import ResponseCache
+from .progress import ProgressBus, RichProgressSink, ThroughputMeter
+from .bandwidth import BandwidthShaper
 
 utils = Utils()
+session = HttpSession()
+# 所有接口请求共享的自适应限速器与退避策略
+rate_limiter = AdaptiveRateLimiter()
+backoff = Backoff()
+# 按接口域名限制同时进行的请求数, 由命令行在启动时配置
+host_gate = HostGate()
+# 接口响应缓存, 各接口的有效期由 apiproxy.douyin.request 设置
+response_cache = ResponseCache()
+# 所有下载数据流共享的带宽整形与流量预算
+bandwidth_shaper = BandwidthShaper()
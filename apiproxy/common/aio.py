@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import functools
+import threading
+
+
+class ThreadFeed(object):
+    """从普通线程向事件循环投递数据的有界通道
+
+    生产者线程调用 put()/close(), 队列满时 put() 阻塞(反压);
+    事件循环中用 async for 消费。
+    """
+
+    _DONE = object()
+
+    def __init__(self, loop, maxsize=64):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.cancelled = False
+
+    def put(self, item):
+        if self.cancelled:
+            raise asyncio.CancelledError()
+        asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+
+    def close(self, error=None):
+        """结束投递, error 不为空时由消费端重新抛出"""
+        item = self._DONE if error is None else error
+        asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # 消费端提前退出时让生产者停止, 并腾出队列避免其阻塞
+            self.cancelled = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """在默认线程池中执行阻塞调用(文件读写、同步请求等), 不阻塞事件循环
+
+    与 asyncio.to_thread 相同, 但 Python 3.8 也可用。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def iterate_in_thread(gen_factory, maxsize=64):
+    """在一个独立线程中完整地运行同步生成器, 以异步迭代器的形式产出结果
+
+    生成器始终在同一个线程中推进, 因此可以安全地使用 sqlite 等线程相关资源。
+    """
+    feed = ThreadFeed(asyncio.get_running_loop(), maxsize)
+
+    def produce():
+        try:
+            for item in gen_factory():
+                feed.put(item)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            feed.close(e)
+            return
+        feed.close()
+
+    threading.Thread(target=produce, daemon=True).start()
+    async for item in feed:
+        yield item
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import asyncio
+import threading
+from typing import List, Optional
+
+from .ratelimit import TokenBucket
+
+# 令牌桶容量按 1/4 秒的流量计算, 限制突发
+_BURST_SECONDS = 0.25
+# 时段计划的检查间隔(秒)
+_SCHEDULE_INTERVAL = 30.0
+
+
+def _minutes(value) -> int:
+    """"HH:MM" -> 当天的分钟数, 24:00 表示午夜
+
+    整数视为已经换算好的分钟数: YAML 把不带引号的 18:00 按六十进制读成整数 1080, 正好是分钟数。
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not 0 <= value <= 24 * 60:
+            raise ValueError(f"无效的时间: {value}")
+        return value
+    try:
+        hour, _, minute = str(value).strip().partition(":")
+        hour, minute = int(hour), int(minute or 0)
+    except ValueError:
+        raise ValueError(f"无效的时间: {value}") from None
+    if not (0 <= minute < 60 and (0 <= hour < 24 or (hour == 24 and minute == 0))):
+        raise ValueError(f"无效的时间: {value}")
+    return hour * 60 + minute
+
+
+def _capacity(rate: float) -> float:
+    return max(64 * 1024, rate * _BURST_SECONDS)
+
+
+def _bucket(rate: float) -> TokenBucket:
+    return TokenBucket(rate, capacity=_capacity(rate))
+
+
+class BandwidthTap(object):
+    """一个数据流在带宽整形器上的接入点, 由 BandwidthShaper.tap 创建"""
+
+    __slots__ = ("shaper", "host", "job")
+
+    def __init__(self, shaper: "BandwidthShaper", host: Optional[str], job: Optional[str]):
+        self.shaper = shaper
+        self.host = host
+        self.job = job
+
+    @property
+    def max_read(self) -> Optional[int]:
+        return self.shaper.max_read
+
+    def reserve(self, size: int) -> float:
+        return self.shaper.reserve(size, self.host, self.job)
+
+
+class BandwidthShaper(object):
+    """按字节的带宽整形与流量预算
+
+    所有下载数据流共用一个全局令牌桶, 另外每个 CDN 节点(按域名)、每个抓取任务各有一个。
+    每读到 n 字节就从相关的桶中同时预支 n 个令牌, 按其中需要等待最久的一个休眠,
+    不读取时 TCP 接收窗口会让服务器放慢发送, 因此限制的是实际的网络流量, 并发数不受影响。
+    速率单位为字节/秒, 0 表示不限制; 可在运行中随时调用 configure 修改, 对正在进行的下载立即生效。
+
+    schedule 为按时段覆盖全局速率的计划, 例如白天限速、夜间不限:
+        [{"start": "09:00", "end": "18:00", "rate": 2 * 1024 * 1024}]
+    结束时间早于开始时间表示跨越午夜, 不在任何时段内时使用 rate。
+
+    budget / job_budget 是本次运行总流量与每个任务流量的上限(字节), 用完后不再开始新的下载,
+    已经开始的下载照常完成。
+    """
+
+    def __init__(self, rate=0, host_rate=0, job_rate=0, budget=0, job_budget=0, schedule=None):
+        self.lock = threading.Lock()
+        self.rate = 0
+        self.host_rate = 0
+        self.job_rate = 0
+        self.budget = 0
+        self.job_budget = 0
+        self.schedule = []
+        self.used = 0
+        self.job_used = {}
+        self._global = _bucket(0)
+        self._hosts = {}
+        self._jobs = {}
+        self._checked = 0.0
+        self.configure(rate, host_rate, job_rate, budget, job_budget, schedule)
+
+    @staticmethod
+    def parse_schedule(schedule: List[dict]) -> List[tuple]:
+        """把时段计划转换为 [(开始分钟, 结束分钟, 速率)], 格式错误时抛出 ValueError"""
+        parsed = []
+        for item in schedule:
+            if not isinstance(item, dict) or "start" not in item or "end" not in item:
+                raise ValueError(f"时段需要包含 start 与 end: {item}")
+            parsed.append((_minutes(item["start"]), _minutes(item["end"]), max(0, item.get("rate") or 0)))
+        return parsed
+
+    def configure(self, rate=None, host_rate=None, job_rate=None, budget=None, job_budget=None,
+                  schedule: Optional[List[dict]] = None) -> None:
+        with self.lock:
+            if schedule is not None:
+                self.schedule = self.parse_schedule(schedule)
+            if rate is not None:
+                self.rate = max(0, rate)
+            if host_rate is not None:
+                self.host_rate = max(0, host_rate)
+                for bucket in self._hosts.values():
+                    bucket.set_rate(self.host_rate, capacity=_capacity(self.host_rate))
+            if job_rate is not None:
+                self.job_rate = max(0, job_rate)
+                for bucket in self._jobs.values():
+                    bucket.set_rate(self.job_rate, capacity=_capacity(self.job_rate))
+            if budget is not None:
+                self.budget = max(0, budget)
+            if job_budget is not None:
+                self.job_budget = max(0, job_budget)
+            self._apply_schedule(time.monotonic())
+
+    def scheduled_rate(self, now: Optional[time.struct_time] = None) -> float:
+        """当前时段的全局速率"""
+        now = now or time.localtime()
+        minute = now.tm_hour * 60 + now.tm_min
+        for start, end, rate in self.schedule:
+            if start <= minute < end or (end < start and (minute >= start or minute < end)):
+                return rate
+        return self.rate
+
+    def _apply_schedule(self, now: float):
+        self._checked = now
+        rate = self.scheduled_rate()
+        if rate != self._global.rate:
+            self._global.set_rate(rate, capacity=_capacity(rate))
+
+    @property
+    def limited(self) -> bool:
+        return bool(self._global.rate or self.host_rate or self.job_rate)
+
+    @property
+    def max_read(self) -> Optional[int]:
+        """限速时单次读取的上限, 避免一次读入大块造成突发; 不限速时为 None"""
+        rates = [rate for rate in (self._global.rate, self.host_rate, self.job_rate) if rate]
+        if not rates:
+            return None
+        return int(max(16 * 1024, min(rates) * _BURST_SECONDS))
+
+    def tap(self, host: Optional[str] = None, job: Optional[str] = None) -> BandwidthTap:
+        return BandwidthTap(self, host, job)
+
+    def reserve(self, size: int, host: Optional[str] = None, job: Optional[str] = None) -> float:
+        """记录 size 字节的流量并预支令牌, 返回需要等待的秒数"""
+        with self.lock:
+            self.used += size
+            if job is not None:
+                self.job_used[job] = self.job_used.get(job, 0) + size
+            now = time.monotonic()
+            if self.schedule and now - self._checked >= _SCHEDULE_INTERVAL:
+                self._apply_schedule(now)
+            buckets = [self._global]
+            if host is not None and self.host_rate:
+                bucket = self._hosts.get(host)
+                if bucket is None:
+                    bucket = self._hosts[host] = _bucket(self.host_rate)
+                buckets.append(bucket)
+            if job is not None and self.job_rate:
+                bucket = self._jobs.get(job)
+                if bucket is None:
+                    bucket = self._jobs[job] = _bucket(self.job_rate)
+                buckets.append(bucket)
+        return max(bucket.reserve(size) for bucket in buckets)
+
+    def consume(self, size: int, host: Optional[str] = None, job: Optional[str] = None) -> float:
+        """线程中使用: 记录流量并按限速休眠, 返回休眠的秒数"""
+        wait = self.reserve(size, host, job)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aconsume(self, size: int, host: Optional[str] = None, job: Optional[str] = None) -> float:
+        """协程中使用的 consume"""
+        wait = self.reserve(size, host, job)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def exhausted(self, job: Optional[str] = None) -> bool:
+        """本次运行(或该任务)的流量预算是否已经用完"""
+        with self.lock:
+            if self.budget and self.used >= self.budget:
+                return True
+            return bool(job is not None and self.job_budget and self.job_used.get(job, 0) >= self.job_budget)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# 每次请求都会变化的签名/令牌参数, 不参与缓存键
+VOLATILE_PARAMS = frozenset(["X-Bogus", "a_bogus", "msToken", "_signature"])
+# 标识客户端的固定参数, 不影响返回内容; 不参与缓存键, 命令行与图形界面带或不带它们的请求共用缓存
+CLIENT_PARAMS = frozenset(["device_platform", "aid"])
+
+
+class ResponseCache(object):
+    """接口响应的持久化缓存
+
+    以 sqlite 保存 zlib 压缩后的 JSON, 键为 "接口路径?排序后的未签名参数"。
+    每个接口单独设置有效期(秒), 未设置或为 0 的接口不缓存;
+    总大小超过 max_bytes 时按最近访问时间淘汰(LRU)。
+    数据库在第一次读写时才打开, 未启用时不会创建文件。
+    """
+
+    def __init__(self, path="api_cache.db", ttls=None, max_bytes=64 * 1024 * 1024, enabled=True):
+        self.path = path
+        self.ttls = dict(ttls or {})
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        self.size = 0
+        self.lock = threading.RLock()
+
+    def configure(self, path=None, ttls=None, max_bytes=None, enabled=None) -> None:
+        with self.lock:
+            if path is not None and path != self.path:
+                self.close()
+                self.path = path
+            if ttls is not None:
+                self.ttls.update(ttls)
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if enabled is not None:
+                self.enabled = enabled
+
+    @staticmethod
+    def key(base_url: str, query: str) -> str:
+        """缓存键: 接口路径加上排序后的参数, 去掉签名与客户端标识参数"""
+        endpoint = urlsplit(base_url).path
+        params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+                        if k not in VOLATILE_PARAMS and k not in CLIENT_PARAMS)
+        return f"{endpoint}?{urlencode(params)}"
+
+    def ttl(self, base_url: str) -> int:
+        return self.ttls.get(urlsplit(base_url).path, 0)
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL;")
+            self.conn.execute("PRAGMA synchronous=NORMAL;")
+            self.conn.execute("""CREATE TABLE if not exists t_response (
+                                    key text primary key,
+                                    body blob,
+                                    size integer,
+                                    created real,
+                                    accessed real
+                                );""")
+            self.conn.execute("CREATE INDEX if not exists idx_response_accessed on t_response (accessed);")
+            self.size = self.conn.execute("select coalesce(sum(size), 0) from t_response;").fetchone()[0]
+        return self.conn
+
+    def get(self, base_url: str, query: str):
+        """返回未过期的缓存数据, 没有时返回 None"""
+        ttl = self.ttl(base_url)
+        if not self.enabled or ttl <= 0:
+            return None
+        key = self.key(base_url, query)
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self._connect()
+                row = conn.execute("select body, created from t_response where key=?;", (key,)).fetchone()
+                if row is None or now - row[1] > ttl:
+                    self.misses += 1
+                    return None
+                with conn:
+                    conn.execute("update t_response set accessed=? where key=?;", (now, key))
+            data = json.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, base_url: str, query: str, data) -> None:
+        if not self.enabled or self.ttl(base_url) <= 0:
+            return
+        key = self.key(base_url, query)
+        body = zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self._connect()
+                with conn:
+                    old = conn.execute("select size from t_response where key=?;", (key,)).fetchone()
+                    conn.execute("insert or replace into t_response (key, body, size, created, accessed) "
+                                 "values(?,?,?,?,?);", (key, body, len(body), now, now))
+                self.size += len(body) - (old[0] if old else 0)
+                if self.size > self.max_bytes:
+                    self._evict()
+        except Exception as e:
+            pass
+
+    def _evict(self):
+        """删除最久未访问的条目, 直到总大小降到上限的 90% 以下"""
+        target = self.max_bytes * 0.9
+        conn = self.conn
+        with conn:
+            # 先清掉已经过期的
+            for endpoint, ttl in self.ttls.items():
+                conn.execute("delete from t_response where key like ? and created < ?;",
+                             (f"{endpoint}?%", time.time() - ttl))
+            self.size = conn.execute("select coalesce(sum(size), 0) from t_response;").fetchone()[0]
+            victims = []
+            for key, size in conn.execute("select key, size from t_response order by accessed;"):
+                if self.size <= target:
+                    break
+                victims.append((key,))
+                self.size -= size
+            conn.executemany("delete from t_response where key=?;", victims)
+
+    def clear(self) -> None:
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("delete from t_response;")
+            self.size = 0
+
+    def close(self) -> None:
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.size}
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("douyin_downloader")
+
+class TaskState(object):
+    """进度总线中一个任务的当前状态"""
+
+    __slots__ = ("task_id", "description", "total", "completed", "unit", "updated")
+
+    def __init__(self, task_id: int, description: str, total: Optional[float], completed: float, unit: str):
+        self.task_id = task_id
+        self.description = description
+        self.total = total
+        self.completed = completed
+        self.unit = unit
+        # 最近一次有进度的时间(monotonic)
+        self.updated = time.monotonic()
+
+
+class ProgressSnapshot(object):
+    """一次发布的内容: 本周期内有变化的任务、已结束的任务、传输的字节数"""
+
+    __slots__ = ("time", "changed", "removed", "tasks", "transferred")
+
+    def __init__(self, now: float, changed: List[TaskState], removed: List[TaskState],
+                 tasks: Dict[int, TaskState], transferred: int):
+        self.time = now
+        self.changed = changed
+        self.removed = removed
+        self.tasks = tasks
+        self.transferred = transferred
+
+
+class ProgressBus(object):
+    """进度事件总线
+
+    下载线程只向一个 deque 追加事件(append 本身是线程安全的, 不需要加锁),
+    发布线程按固定频率(默认 10Hz)取出全部事件, 合并成每个任务的最新状态,
+    再把快照交给所有订阅者(rich 进度条、Qt 界面、统计等)。
+    界面刷新次数与传输的字节数无关; 在同一周期内开始又结束的任务(小文件)不会发布给订阅者。
+    订阅者在发布线程中被调用, 不应保存快照中的 TaskState 引用。
+    没有任务时发布线程自动退出, 下次添加任务时再启动。
+    """
+
+    def __init__(self, hz: float = 10.0):
+        self.interval = 1.0 / hz
+        self.tasks: Dict[int, TaskState] = {}
+        self._events = deque()
+        self._ids = itertools.count(1)
+        self._subscribers: List[Callable[[ProgressSnapshot], None]] = []
+        self._publish_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[ProgressSnapshot], None]) -> None:
+        self._subscribers.append(callback)
+
+    def add_task(self, description: str, total: Optional[float] = None, completed: float = 0,
+                 unit: str = "B") -> int:
+        """添加任务, 返回任务id; unit 为 "B" 的任务计入传输字节数"""
+        task_id = next(self._ids)
+        self._events.append(("add", task_id, description, total, completed, unit))
+        self._ensure_thread()
+        return task_id
+
+    def advance(self, task_id: int, amount: float) -> None:
+        self._events.append(("advance", task_id, amount))
+
+    def update(self, task_id: int, total: Optional[float] = None, completed: Optional[float] = None,
+               description: Optional[str] = None) -> None:
+        self._events.append(("update", task_id, total, completed, description))
+
+    def remove_task(self, task_id: int) -> None:
+        self._events.append(("remove", task_id))
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="progress-bus", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+            with self._thread_lock:
+                if not self.tasks and not self._events:
+                    self._thread = None
+                    return
+
+    def flush(self) -> None:
+        """立即合并并发布积压的事件"""
+        with self._publish_lock:
+            changed = {}
+            added = set()
+            removed = []
+            transferred = 0
+            now = time.monotonic()
+            while True:
+                try:
+                    event = self._events.popleft()
+                except IndexError:
+                    break
+                kind, task_id = event[0], event[1]
+                if kind == "add":
+                    state = self.tasks[task_id] = TaskState(task_id, event[2], event[3], event[4], event[5])
+                    changed[task_id] = state
+                    added.add(task_id)
+                    continue
+                state = self.tasks.get(task_id)
+                if state is None:
+                    continue
+                if kind == "advance":
+                    state.completed += event[2]
+                    state.updated = now
+                    if state.unit == "B":
+                        transferred += event[2]
+                elif kind == "update":
+                    if event[2] is not None:
+                        state.total = event[2]
+                    if event[3] is not None:
+                        state.completed = event[3]
+                    if event[4] is not None:
+                        state.description = event[4]
+                elif kind == "remove":
+                    del self.tasks[task_id]
+                    changed.pop(task_id, None)
+                    # 本周期内新增又结束的任务订阅者从未见过, 直接丢弃
+                    if task_id not in added:
+                        removed.append(state)
+                    continue
+                changed[task_id] = state
+            if not changed and not removed and not transferred:
+                return
+            snapshot = ProgressSnapshot(now, list(changed.values()), removed, self.tasks, transferred)
+            for callback in self._subscribers:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.debug(f"进度订阅者出错: {str(e)}")
+
+
+class RichProgressSink(object):
+    """订阅者: 把总线上的任务同步到一个 rich Progress"""
+
+    def __init__(self, progress):
+        self.progress = progress
+        self._ids = {}
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        for state in snapshot.changed:
+            rich_id = self._ids.get(state.task_id)
+            if rich_id is None:
+                self._ids[state.task_id] = self.progress.add_task(state.description, total=state.total,
+                                                                  completed=state.completed)
+            else:
+                self.progress.update(rich_id, total=state.total, completed=state.completed,
+                                     description=state.description)
+        for state in snapshot.removed:
+            rich_id = self._ids.pop(state.task_id, None)
+            if rich_id is not None:
+                self.progress.remove_task(rich_id)
+
+
+class ThroughputMeter(object):
+    """订阅者: 累计传输字节数与平滑后的速度(字节/秒)"""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.bytes = 0
+        self.rate = 0.0
+        self._last = None
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        self.bytes += snapshot.transferred
+        if self._last is not None and snapshot.time > self._last:
+            rate = snapshot.transferred / (snapshot.time - self._last)
+            self.rate = rate if not self.rate else self.alpha * rate + (1 - self.alpha) * self.rate
+        self._last = snapshot.time
+
+
+if __name__ == "__main__":
+    pass
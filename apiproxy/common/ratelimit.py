@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+
+class TokenBucket(object):
+    """线程安全的令牌桶
+
+    rate 为每秒补充的令牌数, capacity 为桶容量(允许的突发量)。
+    rate 为 None 或 0 时不限速。单次请求的令牌数超过容量时允许透支,
+    之后的请求等待补足, 因此也可以按字节数做带宽限制。
+    """
+
+    def __init__(self, rate, capacity=None):
+        self._cond = threading.Condition()
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate, capacity=None):
+        with self._cond:
+            self._refill(time.monotonic())
+            self.rate = rate
+            if capacity is not None:
+                self.capacity = capacity
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """暂停发放令牌, 用于服务器返回 Retry-After 时"""
+        with self._cond:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+            self._cond.notify_all()
+
+    def reserve(self, tokens) -> float:
+        """立即扣除令牌(允许透支), 返回需要等待的秒数
+
+        不在锁内等待, 调用方自己休眠(线程中 time.sleep, 协程中 asyncio.sleep);
+        多个数据流同时透支时按先后排队, 总速率仍为 rate。
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if not self.rate:
+                return 0.0
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, tokens=1.0, timeout=None) -> bool:
+        """取得令牌, 超过 timeout 秒仍未取得时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until:
+                    if not self.rate:
+                        return True
+                    if self.tokens >= min(tokens, self.capacity):
+                        self.tokens -= tokens
+                        return True
+                    wait = (min(tokens, self.capacity) - self.tokens) / self.rate
+                else:
+                    wait = self.paused_until - now
+                if deadline is not None:
+                    if now + wait > deadline:
+                        return False
+                self._cond.wait(wait)
+
+
+class Backoff(object):
+    """带抖动的指数退避
+
+    第 attempt 次重试等待 [base, min(cap, base * 2^attempt)] 之间的随机时间,
+    避免多个线程同时失败后又同时重试; 服务器给出 Retry-After 时至少等待该时长。
+    """
+
+    def __init__(self, base=0.5, cap=30.0):
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt, retry_after=None) -> float:
+        delay = random.uniform(self.base, max(self.base, min(self.cap, self.base * (2 ** attempt))))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class AdaptiveRateLimiter(object):
+    """按接口划分的自适应限速器(AIMD)
+
+    每个接口一个令牌桶。请求成功且延迟正常时线性提高速率,
+    遇到 429/5xx/空响应(抖音限流时常返回空内容)时速率减半, 并遵守 Retry-After;
+    延迟超过 latency_target 时小幅降速。速率保持在 [min_rate, max_rate] 之间。
+    """
+
+    def __init__(self, rate=5.0, min_rate=0.5, max_rate=20.0, increase=1.0, decrease=0.5,
+                 latency_target=2.0):
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint) -> TokenBucket:
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(endpoint, TokenBucket(self.initial_rate))
+        return bucket
+
+    def acquire(self, endpoint, timeout=None) -> bool:
+        return self.bucket(endpoint).acquire(1, timeout)
+
+    def feedback(self, endpoint, throttled: bool, latency: float, retry_after=None) -> None:
+        """根据一次请求的结果调整该接口的速率"""
+        bucket = self.bucket(endpoint)
+        rate = bucket.rate
+        if throttled:
+            rate *= self.decrease
+            if retry_after:
+                bucket.pause(retry_after)
+        elif latency > self.latency_target:
+            rate *= 0.9
+        else:
+            # 每秒约增加 increase, 与当前速率无关
+            rate += self.increase / rate
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        bucket.set_rate(rate, capacity=max(1.0, rate))
+
+    def rates(self) -> dict:
+        """当前各接口的速率(次/秒)"""
+        with self._lock:
+            return {endpoint: bucket.rate for endpoint, bucket in self._buckets.items()}
+
+
+class HostGate(object):
+    """按域名限制同时进行的请求数
+
+    limits 为 {域名: 并发数}, 没有配置的域名不限制。
+    只在请求进行期间占用名额, 退避等待与处理结果时不占用, 因此限制的是请求而不是抓取任务。
+    """
+
+    def __init__(self, limits=None):
+        self._slots = {}
+        self.configure(limits or {})
+
+    def configure(self, limits: dict) -> None:
+        self._slots = {host: threading.BoundedSemaphore(max(1, int(limit))) for host, limit in limits.items()}
+
+    @contextmanager
+    def slot(self, host, timeout=None):
+        """占用 host 的一个名额, 返回是否在 timeout 秒内取得"""
+        semaphore = self._slots.get(host)
+        if semaphore is None:
+            yield True
+            return
+        acquired = semaphore.acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                semaphore.release()
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头(秒数形式), 无法解析时返回 None"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    pass
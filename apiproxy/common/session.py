@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+# 接口域名, 与媒体CDN域名使用不同的连接池上限
+API_HOSTS = (
+    'www.douyin.com',
+    'live.douyin.com',
+    'www.iesdouyin.com',
+    'v.douyin.com',
+    'webcast.amemv.com',
+    'ttwid.bytedance.com',
+)
+
+
+def _counting_pool(base, on_connect):
+    """生成一个在建立 TCP 连接时回调 on_connect(host) 的连接池类
+
+    服务器关闭 keep-alive 后 urllib3 会复用同一个连接对象重新 connect,
+    因此在连接类的 connect() 上计数, 而不是连接池的 _new_conn()。
+    """
+
+    class CountingConnection(base.ConnectionCls):
+        def connect(self):
+            on_connect(self.host)
+            return super().connect()
+
+    class CountingPool(base):
+        ConnectionCls = CountingConnection
+
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """记录每个 host 新建 TCP 连接次数的适配器"""
+
+    def __init__(self, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self._on_connect),
+            'https': _counting_pool(HTTPSConnectionPool, self._on_connect),
+        }
+
+
+class HttpSession(object):
+    """apiproxy 共享的 HTTP 会话层
+
+    所有接口请求与媒体下载共用一个 requests.Session, 按 host 复用 keep-alive 连接。
+    接口域名与 CDN 域名挂载不同的适配器, 各自限制每个 host 的最大连接数
+    (pool_block=True, 超出上限的线程会等待空闲连接), 并统计连接复用情况。
+    """
+
+    def __init__(self, api_pool_size=10, cdn_pool_size=32, timeout=30):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.set_pool_size(api=api_pool_size, cdn=cdn_pool_size)
+
+    def set_pool_size(self, api=None, cdn=None):
+        """设置每个 host 的连接上限, 通常在启动时根据下载线程数调整"""
+        if api is not None:
+            self.api_pool_size = api
+            adapter = _CountingAdapter(self._on_connect, pool_connections=len(API_HOSTS),
+                                       pool_maxsize=api, pool_block=True)
+            self._mount([f'{scheme}://{host}' for host in API_HOSTS for scheme in ('https', 'http')], adapter)
+        if cdn is not None:
+            self.cdn_pool_size = cdn
+            adapter = _CountingAdapter(self._on_connect, pool_connections=64,
+                                       pool_maxsize=cdn, pool_block=True)
+            self._mount(['https://', 'http://'], adapter)
+
+    def _mount(self, prefixes, adapter):
+        """挂载新适配器, 并关闭被替换的旧适配器, 释放它们的连接池"""
+        replaced = {}
+        for prefix in prefixes:
+            old = self.session.adapters.get(prefix)
+            if old is not None:
+                replaced[id(old)] = old
+        for old in replaced.values():
+            old.close()
+        for prefix in prefixes:
+            self.session.mount(prefix, adapter)
+
+    def _host_stats(self, host):
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = {'requests': 0, 'connections': 0}
+        return stats
+
+    def _on_connect(self, host):
+        with self._lock:
+            self._host_stats(host)['connections'] += 1
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            self._host_stats(host)['requests'] += 1
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def stats(self):
+        """每个 host 的请求数、新建连接数与复用次数"""
+        with self._lock:
+            return {
+                host: {**s, 'reused': max(0, s['requests'] - s['connections'])}
+                for host, s in self._stats.items()
+            }
+
+    def close(self):
+        self.session.close()
+
+
+if __name__ == "__main__":
+    pass
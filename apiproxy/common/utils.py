@@ -3,13 +3,13 @@
 
 
 import random
-import requests
 import re
 import os
 import sys
 import hashlib
 import base64
 import time
+import threading
 
 import apiproxy
 
@@ -65,7 +65,8 @@ class Utils(object):
     def getttwid(self):
         url = 'https://ttwid.bytedance.com/ttwid/union/register/'
         data = '{"region":"cn","aid":1768,"needFid":false,"service":"www.ixigua.com","migrate_info":{"ticket":"","source":"node"},"cbUrlProtocol":"https","union":true}'
-        res = requests.post(url=url, data=data)
+        from apiproxy.common import session
+        res = session.post(url=url, data=data)
 
         for i, j in res.cookies.items():
             return j
@@ -75,87 +76,13 @@ class Utils(object):
         params = payload + "&X-Bogus=" + xbogus
         return params
 
+    def getXbogusMany(self, payloads, form='', ua=apiproxy.ua):
+        """批量签名, 同一批使用相同的时间戳"""
+        signer = XBogus.get(ua, form)
+        return [payload + "&X-Bogus=" + xbogus for payload, xbogus in zip(payloads, signer.sign_many(payloads))]
+
     def get_xbogus(self, payload, ua, form):
-        short_str = "Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe="
-        arr2 = self.get_arr2(payload, ua, form)
-
-        garbled_string = self.get_garbled_string(arr2)
-
-        xbogus = ""
-
-        for i in range(0, 21, 3):
-            char_code_num0 = garbled_string[i]
-            char_code_num1 = garbled_string[i + 1]
-            char_code_num2 = garbled_string[i + 2]
-            base_num = char_code_num2 | char_code_num1 << 8 | char_code_num0 << 16
-            str1 = short_str[(base_num & 16515072) >> 18]
-            str2 = short_str[(base_num & 258048) >> 12]
-            str3 = short_str[(base_num & 4032) >> 6]
-            str4 = short_str[base_num & 63]
-            xbogus += str1 + str2 + str3 + str4
-
-        return xbogus
-
-    def get_garbled_string(self, arr2):
-        p = [
-            arr2[0], arr2[10], arr2[1], arr2[11], arr2[2], arr2[12], arr2[3], arr2[13], arr2[4], arr2[14],
-            arr2[5], arr2[15], arr2[6], arr2[16], arr2[7], arr2[17], arr2[8], arr2[18], arr2[9]
-        ]
-
-        char_array = [chr(i) for i in p]
-        f = []
-        f.extend([2, 255])
-        tmp = ['ÿ']
-        bytes_ = self._0x30492c(tmp, "".join(char_array))
-
-        for i in range(len(bytes_)):
-            f.append(bytes_[i])
-
-        return f
-
-    def get_arr2(self, payload, ua, form):
-        salt_payload_bytes = hashlib.md5(hashlib.md5(payload.encode()).digest()).digest()
-        salt_payload = [byte for byte in salt_payload_bytes]
-
-        salt_form_bytes = hashlib.md5(hashlib.md5(form.encode()).digest()).digest()
-        salt_form = [byte for byte in salt_form_bytes]
-
-        ua_key = ['\u0000', '\u0001', '\u000e']
-        salt_ua_bytes = hashlib.md5(base64.b64encode(self._0x30492c(ua_key, ua))).digest()
-        salt_ua = [byte for byte in salt_ua_bytes]
-
-        timestamp = int(time.time())
-        canvas = 1489154074
-
-        arr1 = [
-            64,  # 固定
-            0,  # 固定
-            1,  # 固定
-            14,  # 固定 这个还要再看一下，14,12,0都出现过
-            salt_payload[14],  # payload 相关
-            salt_payload[15],
-            salt_form[14],  # form 相关
-            salt_form[15],
-            salt_ua[14],  # ua 相关
-            salt_ua[15],
-            (timestamp >> 24) & 255,
-            (timestamp >> 16) & 255,
-            (timestamp >> 8) & 255,
-            (timestamp >> 0) & 255,
-            (canvas >> 24) & 255,
-            (canvas >> 16) & 255,
-            (canvas >> 8) & 255,
-            (canvas >> 0) & 255,
-            64,  # 校验位
-        ]
-
-        for i in range(1, len(arr1) - 1):
-            arr1[18] ^= arr1[i]
-
-        arr2 = [arr1[0], arr1[2], arr1[4], arr1[6], arr1[8], arr1[10], arr1[12], arr1[14], arr1[16], arr1[18], arr1[1],
-                arr1[3], arr1[5], arr1[7], arr1[9], arr1[11], arr1[13], arr1[15], arr1[17]]
-
-        return arr2
+        return XBogus.get(ua, form).sign(payload)
 
     def _0x30492c(self, a, b):
         d = [i for i in range(256)]
@@ -182,5 +109,74 @@ class Utils(object):
         return result
 
 
+class XBogus(object):
+    """X-Bogus 签名器
+
+    只与 UA、form 相关的部分(UA 的 RC4+MD5 盐、form 的双重 MD5 盐、校验位的常量部分)
+    在创建时计算一次; RC4 的密钥固定为 'ÿ', 其密钥流也是常量, 预先生成后整体异或。
+    每次签名只剩下 payload 的双重 MD5 和一次 base64, 没有逐字节的 Python 循环。
+    """
+
+    _STD_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    _ALPHABET = b"Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe"
+    _TRANSLATE = bytes.maketrans(_STD_ALPHABET, _ALPHABET)
+    _CANVAS = 1489154074
+    # 签名明文共 19 字节, 用固定密钥 'ÿ' 做 RC4
+    _KEYSTREAM = int.from_bytes(Utils()._0x30492c(['ÿ'], '\x00' * 19), 'big')
+
+    _signers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, ua=apiproxy.ua, form=''):
+        self.ua = ua
+        self.form = form
+        ua_salt = hashlib.md5(base64.b64encode(Utils()._0x30492c(['\u0000', '\u0001', '\u000e'], ua))).digest()
+        form_salt = hashlib.md5(hashlib.md5(form.encode()).digest()).digest()
+        # 明文: 64, 0, 1, 14, payload盐[14:16], form盐[14:16], UA盐[14:16], 时间戳(4), canvas(4), 校验位
+        self._head = bytes([64, 0, 1, 14])
+        self._salts = form_salt[14:16] + ua_salt[14:16]
+        self._canvas = self._CANVAS.to_bytes(4, 'big')
+        # 校验位 = 64 异或明文第 1~17 字节, 先折叠其中的常量部分
+        self._checksum = self._fold(self._head[1:] + self._salts + self._canvas, 64)
+
+    @classmethod
+    def get(cls, ua=apiproxy.ua, form=''):
+        """按 (UA, form) 缓存签名器"""
+        key = (ua, form)
+        signer = cls._signers.get(key)
+        if signer is None:
+            with cls._lock:
+                signer = cls._signers.setdefault(key, cls(ua, form))
+        return signer
+
+    @staticmethod
+    def _fold(data: bytes, value=0) -> int:
+        """按字节异或折叠"""
+        n = int.from_bytes(data, 'big') if data else 0
+        while n:
+            value ^= n & 0xFFFFFFFF
+            n >>= 32
+        value ^= value >> 16
+        value ^= value >> 8
+        return value & 255
+
+    def sign(self, payload: str, timestamp=None) -> str:
+        return self.sign_many([payload], timestamp)[0]
+
+    def sign_many(self, payloads, timestamp=None) -> list:
+        """签名一批 query 字符串, 返回对应的 X-Bogus 列表"""
+        ts = (int(time.time()) if timestamp is None else timestamp).to_bytes(4, 'big')
+        checksum = self._checksum ^ self._fold(ts)
+        head, salts, tail = self._head, self._salts, ts + self._canvas
+        keystream, md5, translate = self._KEYSTREAM, hashlib.md5, self._TRANSLATE
+        result = []
+        for payload in payloads:
+            salt = md5(md5(payload.encode()).digest()).digest()[14:16]
+            plain = head + salt + salts + tail + bytes([checksum ^ salt[0] ^ salt[1]])
+            garbled = (int.from_bytes(plain, 'big') ^ keystream).to_bytes(19, 'big')
+            result.append(base64.b64encode(b'\x02\xff' + garbled).translate(translate).decode())
+        return result
+
+
 if __name__ == "__main__":
     pass
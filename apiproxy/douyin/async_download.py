@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import time
+import logging
+from pathlib import Path
+from typing import List
+from urllib.parse import urlsplit
+
+import aiohttp
+from rich.panel import Panel
+from rich.text import Text
+
+from apiproxy.douyin import douyin_headers
+from apiproxy.douyin.download import Download
+from apiproxy.douyin.partial import PartialDownload
+from apiproxy.common import utils
+from apiproxy.common.aio import run_in_thread
+
+logger = logging.getLogger("douyin_downloader")
+
+
+async def _aiter(items):
+    """统一迭代普通可迭代对象与异步迭代器"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class AsyncDownload(Download):
+    """基于 aiohttp 的异步下载器
+
+    文件命名、JSON 保存等规划逻辑沿用 Download, 媒体流通过一个有界的
+    aiohttp 连接器下载。需要在 async with 中使用:
+
+        async with AsyncDownload(thread=5) as adl:
+            await adl.userDownloadAsync(awemeList, savePath)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session = None
+        self._aweme_sem = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.thread * 4, limit_per_host=self.thread * 2)
+        # aiohttp 不接受值为 None 的请求头
+        headers = {k: v for k, v in douyin_headers.items() if v is not None}
+        # 启用速度下限时, 完全没有数据到达的连接也在一个统计窗口后中断
+        sock_read = min(self.timeout, self.stream.stall_window) if self.stream.min_speed else self.timeout
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=sock_read)
+        )
+        # 所有链接共享同一个作品并发上限
+        self._aweme_sem = asyncio.Semaphore(self.thread * 2)
+        self.progress.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.bus.flush()
+        self.progress.stop()
+        await self._session.close()
+        self._session = None
+
+    async def userDownloadAsync(self, awemeList, savePath, job=None, ack=None) -> int:
+        """并发下载作品, 返回成功数量
+
+        awemeList 可以是列表, 也可以是 Douyin.aiterUserInfo 等异步迭代器;
+        后者边取边下载, 在途作品数受共享的并发上限约束。
+        多个链接共用一个下载器, 按任务限速与计算预算的任务名由 job 传入。
+        ack 在每个作品下载完成(或失败)后调用, 默认为 awemeList.ack; 在线程中翻页的 CrawlFeed 由调用方传入它的 ack。
+        """
+        ack = ack or getattr(awemeList, "ack", None)
+        total_count = len(awemeList) if hasattr(awemeList, "__len__") else None
+        if total_count == 0:
+            self.console.print("[yellow]⚠️  没有找到可下载的内容[/]")
+            return 0
+
+        save_path = Path(savePath)
+        self._ensure_dir(save_path)
+
+        start_time = time.time()
+        download_task = self.bus.add_task(f"[cyan]📥 {save_path.name}", total=total_count, unit="个")
+        counts = {"done": 0, "success": 0}
+        pending = set()
+
+        async def run(aweme):
+            try:
+                ok = await self.awemeDownloadAsync(aweme, save_path, job)
+                if ack is not None:
+                    # 推进断点会写数据库
+                    await run_in_thread(ack, aweme)
+            finally:
+                self._aweme_sem.release()
+            counts["done"] += 1
+            counts["success"] += 1 if ok else 0
+            self.bus.advance(download_task, 1)
+
+        async for aweme in _aiter(awemeList):
+            # 先占用并发名额再取下一个作品, 形成反压
+            await self._aweme_sem.acquire()
+            task = asyncio.create_task(run(aweme))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+        self.bus.remove_task(download_task)
+        if self.manifest is not None:
+            self.manifest.flush()
+
+        if counts["done"] == 0:
+            self.console.print("[yellow]⚠️  没有找到可下载的内容[/]")
+            return 0
+
+        duration = time.time() - start_time
+        self.console.print(Panel(
+            Text.assemble(
+                ("下载完成\n", "bold green"),
+                (f"成功: {counts['success']}/{counts['done']}\n", "green"),
+                (f"用时: {int(duration // 60)}分{int(duration % 60)}秒\n", "green"),
+                (f"保存位置: {save_path}\n", "green"),
+            ),
+            title="下载统计",
+            border_style="green"
+        ))
+        return counts["success"]
+
+    async def awemeDownloadAsync(self, awemeDict: dict, savePath: Path, job=None) -> bool:
+        """下载单个作品的所有内容, 作品内的文件并发下载"""
+        if not awemeDict:
+            logger.warning("无效的作品数据")
+            return False
+
+        try:
+            save_path = Path(savePath)
+            file_name = f"{awemeDict['create_time']}_{utils.replaceStr(awemeDict['desc'])}"
+            aweme_path = save_path / file_name if self.folderstyle else save_path
+
+            if self.resjson:
+                await run_in_thread(self._save_json, aweme_path / f"{file_name}_result.json", awemeDict)
+
+            assets = self._collect_assets(awemeDict, aweme_path, file_name, file_name[:30])
+            results = await asyncio.gather(*(
+                self._download_media_async(urls, path, desc, key, job) for urls, path, desc, _, key in assets))
+
+            for (urls, path, desc, required, _), ok in zip(assets, results):
+                if ok:
+                    continue
+                if required:
+                    raise Exception(f"下载失败: {desc}")
+                self.console.print(f"[yellow]⚠️  下载失败: {desc}[/]")
+            return True
+
+        except Exception as e:
+            logger.error(f"处理作品时出错: {str(e)}")
+            return False
+
+    async def _download_media_async(self, url, path: Path, desc: str, key=None, job=None) -> bool:
+        """_download_media 的协程版本, 清单、去重仓库等文件操作都在线程中执行"""
+        if await run_in_thread(self._is_complete, path, key):
+            self.console.print(f"[cyan]⏭️  跳过已存在: {desc}[/]")
+            return True
+        await run_in_thread(self._ensure_dir, path.parent)
+        if not key or self.blobs is None:
+            ok = await self.download_with_resume_async(url, path, desc, job)
+        else:
+            # 同一资源同时只下载一次; 等待其他下载完成时不占用线程
+            while (waiting := self.blobs.claim(key)) is not None:
+                while not waiting.is_set():
+                    await asyncio.sleep(0.05)
+            try:
+                if await run_in_thread(self.blobs.link, key, path):
+                    self.console.print(f"[cyan]🔗 复用已下载文件: {desc}[/]")
+                    ok = True
+                else:
+                    ok = await self.download_with_resume_async(url, path, desc, job)
+                    if ok:
+                        await run_in_thread(self.blobs.add, key, path)
+            finally:
+                self.blobs.release(key)
+        if ok and self.manifest is not None:
+            await run_in_thread(self.manifest.record, path, key)
+        return ok
+
+    async def _reserve(self, size: int, streams: int = 1) -> int:
+        """在事件循环中预留在途字节; 不占用线程等待, 额度不足时轮询"""
+        while True:
+            reserved = self.byte_budget.try_acquire(size, streams)
+            if reserved:
+                return reserved
+            await asyncio.sleep(0.05)
+
+    async def download_with_resume_async(self, url, filepath: Path, desc: str, job=None) -> bool:
+        """支持断点续传的异步下载方法, url 可以是镜像地址列表
+
+        与同步下载一样先写 .part、共享在途字节预算; 大视频改为在线程中分段下载。
+        """
+        job = job or self.job
+        if self._over_budget(job):
+            return False
+        urls = [url] if isinstance(url, str) else list(url)
+        if len(urls) > 1:
+            # 竞速探测是阻塞请求, 放到线程中
+            urls = await run_in_thread(self.mirrors.order, urls, douyin_headers)
+
+        segmentable = self.segmenter.connections > 1 and filepath.suffix == '.mp4'
+        if segmentable:
+            total = await run_in_thread(self.segmenter.pending_total, filepath)
+            if total:
+                return await run_in_thread(self._download_segmented, urls, filepath, desc, total,
+                                           await self._reserve(total, self.segmenter.connections), job)
+
+        partial = PartialDownload(filepath)
+        attempts = max(self.retry_times, len(urls))
+        segment_total = None
+        for attempt in range(attempts):
+            url = urls[attempt % len(urls)]
+            reserved = 0
+            try:
+                file_size = await run_in_thread(partial.resume)
+                expected = partial.total - file_size if partial.total else 0
+                reserved = await self._reserve(expected or self.stream.max_chunk)
+                start = time.monotonic()
+                async with self._session.get(url, headers=partial.headers(url, ranged=segmentable)) as response:
+                    if response.status == 429:
+                        retry_after = int(response.headers.get('Retry-After', 5))
+                        logger.warning(f'HTTP 429 Too Many Requests, 将在 {retry_after} 秒后重试')
+                        self.byte_budget.release(reserved)
+                        reserved = 0
+                        await asyncio.sleep(retry_after)
+                        continue
+
+                    if response.status == 416 and file_size:
+                        if partial.total == file_size and await run_in_thread(partial.finish):
+                            return True
+                        await run_in_thread(partial.discard)
+                        raise Exception("HTTP 416")
+
+                    if segmentable and not file_size:
+                        segment_total = self.segmenter.range_total(response.status, response.headers)
+                        if self.segmenter.should_segment(segment_total):
+                            # 关闭这个连接, 改为分段下载
+                            break
+                        segment_total = None
+
+                    # 服务器忽略 Range 或文件已变化时从头写
+                    mode = partial.start(response.status, response.headers, url)
+                    latency = time.monotonic() - start
+                    resumed_from = partial.done
+                    if response.content_length:
+                        self.byte_budget.release(reserved)
+                        reserved = 0
+                        reserved = await self._reserve(response.content_length)
+
+                    f = await run_in_thread(open, partial.part, mode)
+                    task = self.bus.add_task(f"[cyan]⬇️  {desc}", total=partial.total, completed=partial.done)
+                    try:
+                        async def write(view):
+                            await run_in_thread(lambda: partial.advance(f.write(view)))
+
+                        await self.stream.acopy(response.content, write,
+                                                on_progress=lambda n: self.bus.advance(task, n),
+                                                throttle=self.shaper.tap(urlsplit(url).netloc, job))
+                    finally:
+                        self.bus.remove_task(task)
+                        await run_in_thread(f.close)
+
+                    if not await run_in_thread(partial.finish):
+                        raise Exception(f"文件不完整: {partial.done}/{partial.total}")
+                    self.mirrors.record(url, partial.done - resumed_from, time.monotonic() - start, latency)
+                    return True
+
+            except Exception as e:
+                if partial.done:
+                    await run_in_thread(partial.save, force=True)
+                self.mirrors.fail(url)
+                logger.warning(f"下载失败 (尝试 {attempt + 1}/{attempts}): {str(e)}")
+                if attempt == attempts - 1:
+                    self.console.print(f"[red]❌ 下载失败: {desc}\n   {str(e)}[/]")
+                    return False
+                if (attempt + 1) % len(urls) == 0:
+                    self.byte_budget.release(reserved)
+                    reserved = 0
+                    await asyncio.sleep(1)
+            finally:
+                self.byte_budget.release(reserved)
+        if segment_total:
+            return await run_in_thread(self._download_segmented, urls, filepath, desc, segment_total,
+                                       await self._reserve(segment_total, self.segmenter.connections), job)
+        return False
+
+
+if __name__ == "__main__":
+    pass
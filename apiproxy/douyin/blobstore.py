@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("douyin_downloader")
+
+# Linux 上的 FICLONE ioctl, 支持的文件系统(btrfs/xfs)上可以做写时复制的 reflink
+_FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            dst.unlink()
+        except OSError:
+            pass
+        return False
+
+
+def place(src: Path, dst: Path, copy=True) -> Optional[str]:
+    """让 dst 拥有与 src 相同的内容, 优先硬链接, 其次 reflink, 最后复制; 返回使用的方式
+
+    copy 为 False 时不复制, 硬链接与 reflink 都不可用时返回 None, dst 保持不变。
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".link")
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, tmp)
+        how = "hardlink"
+    except OSError:
+        if _reflink(src, tmp):
+            how = "reflink"
+        elif copy:
+            shutil.copyfile(src, tmp)
+            how = "copy"
+        else:
+            return None
+    os.replace(tmp, dst)
+    return how
+
+
+class BlobStore(object):
+    """按资源 uri 寻址的媒体文件仓库, 用于跨目录去重
+
+    同一个作品会同时出现在用户作品、合集、音乐等目录中。第一次下载完成后,
+    文件被硬链接进仓库(<下载目录>/.blobs/xx/<sha1>), 并在 index.db 中记录;
+    之后任何目录再需要同一个 uri 的文件时直接从仓库硬链接过去,
+    不再访问网络也不占用额外磁盘。硬链接不可用时依次退化为 reflink 与复制。
+    登记时硬链接与 reflink 都不可用(FAT/exFAT、部分网络盘、跨设备)的文件不复制进仓库,
+    只记录它已有的保存路径, 否则每个下载的文件都要占两份磁盘。
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root) -> "BlobStore":
+        """同一目录只创建一个实例, 并行下载的各个 Download 共享索引与锁"""
+        root = Path(root).resolve()
+        with cls._stores_lock:
+            store = cls._stores.get(root)
+            if store is None:
+                store = cls._stores[root] = cls(root)
+            return store
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("""CREATE TABLE if not exists t_blob (
+                                key text primary key,
+                                size integer,
+                                created real,
+                                path text
+                            );""")
+        # path 为 NULL 时文件在仓库中, 否则为文件已有的保存路径; 旧版本的索引没有这一列
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(t_blob);")]
+        if "path" not in columns:
+            self.conn.execute("ALTER TABLE t_blob ADD COLUMN path text;")
+        self.lock = threading.RLock()
+        # 正在下载的 key: 同一个 uri 同时只有一个线程下载, 其余线程等它完成后直接链接
+        self._inflight = {}
+        self.linked = 0
+        self.saved_bytes = 0
+
+    def _blob_path(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / digest
+
+    def claim(self, key: str) -> Optional[threading.Event]:
+        """认领 key 的下载
+
+        返回 None 表示认领成功, 调用方链接或下载后必须调用 release(key);
+        其他线程正在处理该 key 时返回它的事件, 等待事件后重新认领。
+        只有同一个 key 的线程互相等待, 不同资源之间不会串行。
+        """
+        with self.lock:
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+            return event
+
+    def release(self, key: str) -> None:
+        with self.lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def link(self, key: str, path: Path) -> bool:
+        """仓库中已有该 key 时把它放到 path, 返回是否成功"""
+        with self.lock:
+            row = self.conn.execute("select size, path from t_blob where key=?;", (key,)).fetchone()
+        if row is None:
+            return False
+        size, saved = row
+        source = Path(saved) if saved else self._blob_path(key)
+        path = Path(path)
+        try:
+            if source.stat().st_size != size:
+                raise FileNotFoundError(source)
+        except FileNotFoundError:
+            # 仓库文件(或登记的保存路径)丢失或被改动, 删除索引后重新下载
+            self.forget(key)
+            return False
+        if source != path.resolve():
+            place(source, path)
+        self.linked += 1
+        self.saved_bytes += size
+        return True
+
+    def add(self, key: str, path: Path) -> None:
+        """下载完成的文件登记到仓库; 无法硬链接或 reflink 进仓库时只登记它的保存路径"""
+        path = Path(path).resolve()
+        blob = self._blob_path(key)
+        try:
+            size = path.stat().st_size
+            saved = None
+            if not blob.exists() or blob.stat().st_size != size:
+                if place(path, blob, copy=False) is None:
+                    saved = str(path)
+            with self.lock, self.conn:
+                self.conn.execute("insert or replace into t_blob (key, size, created, path) values(?,?,?,?);",
+                                  (key, size, time.time(), saved))
+        except OSError as e:
+            logger.warning(f"登记去重文件失败: {path} {str(e)}")
+
+    def forget(self, key: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("delete from t_blob where key=?;", (key,))
+
+
+if __name__ == "__main__":
+    pass
@@ -2,24 +2,41 @@
 # -*- coding: utf-8 -*-
 
 
+import os
 import sqlite3
 import json
+import time
+import threading
+
+from apiproxy.douyin.known import KnownIndex
 
 
 class DataBase(object):
-    def __init__(self):
-        self.conn = sqlite3.connect('data.db')
+    def __init__(self, path='data.db'):
+        fresh = not os.path.exists(path)
+        # 流式下载时翻页生成器可能在其他线程中推进, 连接的使用由 self.lock 串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        self.lock = threading.RLock()
+        # WAL 模式下写事务不阻塞读, synchronous=NORMAL 避免每次提交都 fsync
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
         self.create_user_post_table()
         self.create_user_like_table()
         self.create_mix_table()
         self.create_music_table()
+        self.create_crawl_state_table()
+        self.create_indexes()
+        # 已记录作品id的内存/mmap 索引, 增量判断不再逐条查询数据库; 同一数据库的各个实例共享
+        self.known = KnownIndex.open(self, f"{path}.known")
+        if fresh:
+            self.known.clear()
 
     def create_user_post_table(self):
         sql = """CREATE TABLE if not exists t_user_post (
                         id integer primary key autoincrement,
                         sec_uid varchar(200),
-                        aweme_id integer unique, 
+                        aweme_id integer unique,
                         rawdata json
                     );"""
 
@@ -29,25 +46,84 @@ class DataBase(object):
         except Exception as e:
             pass
 
+    def create_indexes(self):
+        """增量更新按 (集合id, 作品id) 批量查询, 为其建立联合索引"""
+        sqls = [
+            "CREATE INDEX if not exists idx_user_post_sec_uid_aweme_id on t_user_post (sec_uid, aweme_id);",
+            "CREATE INDEX if not exists idx_user_like_sec_uid_aweme_id on t_user_like (sec_uid, aweme_id);",
+            "CREATE INDEX if not exists idx_mix_mix_id_aweme_id on t_mix (mix_id, aweme_id);",
+            "CREATE INDEX if not exists idx_music_music_id_aweme_id on t_music (music_id, aweme_id);",
+        ]
+
+        try:
+            with self.lock, self.conn:
+                for sql in sqls:
+                    self.conn.execute(sql)
+        except Exception as e:
+            pass
+
+    def max_row_id(self, table: str) -> int:
+        try:
+            with self.lock:
+                return self.conn.execute(f"select max(id) from {table};").fetchone()[0] or 0
+        except Exception as e:
+            return 0
+
+    def aweme_ids_since(self, table: str, where: dict, row_id: int, upto: int) -> list:
+        """集合中行id在 (row_id, upto] 之间的作品id, 用于对齐持久化索引"""
+        conditions = "".join(f"{column}=? and " for column in where)
+        sql = f"select aweme_id from {table} where {conditions}id>? and id<=?;"
+        try:
+            with self.lock:
+                return [aweme_id for (aweme_id,) in self.conn.execute(sql, (*where.values(), row_id, upto))]
+        except Exception as e:
+            return []
+
+    def _insert_many(self, sql: str, rows, table: str, where: dict, aweme_ids) -> None:
+        """一个事务内批量写入, 已存在的作品忽略; 写入成功后同步到已记录索引"""
+        try:
+            with self.lock, self.conn:
+                self.conn.executemany(sql, rows)
+        except Exception as e:
+            return
+        self.known.add(table, where, aweme_ids)
+
+    def flush(self):
+        """将已记录索引写回磁盘"""
+        self.known.flush()
+
+    def close(self):
+        """写回已记录索引并关闭数据库连接"""
+        self.known.detach(self)
+        with self.lock:
+            self.conn.close()
+
     def get_user_post(self, sec_uid: str, aweme_id: int):
         sql = """select id, sec_uid, aweme_id, rawdata from t_user_post where sec_uid=? and aweme_id=?;"""
 
         try:
-            self.cursor.execute(sql, (sec_uid, aweme_id))
-            self.conn.commit()
-            res = self.cursor.fetchone()
-            return res
+            with self.lock:
+                return self.conn.execute(sql, (sec_uid, aweme_id)).fetchone()
         except Exception as e:
             pass
 
+    def known_user_post(self, sec_uid: str, aweme_ids) -> set:
+        return self.known.filter("t_user_post", {"sec_uid": sec_uid}, aweme_ids)
+
     def insert_user_post(self, sec_uid: str, aweme_id: int, data: dict):
         insertsql = """insert into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (sec_uid, aweme_id, json.dumps(data)))
-            self.conn.commit()
+            with self.lock, self.conn:
+                self.conn.execute(insertsql, (sec_uid, aweme_id, json.dumps(data)))
         except Exception as e:
-            pass
+            return
+        self.known.add("t_user_post", {"sec_uid": sec_uid}, [aweme_id])
+
+    def insert_user_posts(self, sec_uid: str, awemes: list):
+        insertsql = """insert or ignore into t_user_post (sec_uid, aweme_id, rawdata) values(?,?,?);"""
+        self._insert_many(insertsql, [(sec_uid, aweme['aweme_id'], json.dumps(aweme)) for aweme in awemes],
+                          "t_user_post", {"sec_uid": sec_uid}, [aweme['aweme_id'] for aweme in awemes])
 
     def create_user_like_table(self):
         sql = """CREATE TABLE if not exists t_user_like (
@@ -67,21 +143,28 @@ class DataBase(object):
         sql = """select id, sec_uid, aweme_id, rawdata from t_user_like where sec_uid=? and aweme_id=?;"""
 
         try:
-            self.cursor.execute(sql, (sec_uid, aweme_id))
-            self.conn.commit()
-            res = self.cursor.fetchone()
-            return res
+            with self.lock:
+                return self.conn.execute(sql, (sec_uid, aweme_id)).fetchone()
         except Exception as e:
             pass
 
+    def known_user_like(self, sec_uid: str, aweme_ids) -> set:
+        return self.known.filter("t_user_like", {"sec_uid": sec_uid}, aweme_ids)
+
     def insert_user_like(self, sec_uid: str, aweme_id: int, data: dict):
         insertsql = """insert into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (sec_uid, aweme_id, json.dumps(data)))
-            self.conn.commit()
+            with self.lock, self.conn:
+                self.conn.execute(insertsql, (sec_uid, aweme_id, json.dumps(data)))
         except Exception as e:
-            pass
+            return
+        self.known.add("t_user_like", {"sec_uid": sec_uid}, [aweme_id])
+
+    def insert_user_likes(self, sec_uid: str, awemes: list):
+        insertsql = """insert or ignore into t_user_like (sec_uid, aweme_id, rawdata) values(?,?,?);"""
+        self._insert_many(insertsql, [(sec_uid, aweme['aweme_id'], json.dumps(aweme)) for aweme in awemes],
+                          "t_user_like", {"sec_uid": sec_uid}, [aweme['aweme_id'] for aweme in awemes])
 
     def create_mix_table(self):
         sql = """CREATE TABLE if not exists t_mix (
@@ -102,21 +185,29 @@ class DataBase(object):
         sql = """select id, sec_uid, mix_id, aweme_id, rawdata from t_mix where sec_uid=? and  mix_id=? and aweme_id=?;"""
 
         try:
-            self.cursor.execute(sql, (sec_uid, mix_id, aweme_id))
-            self.conn.commit()
-            res = self.cursor.fetchone()
-            return res
+            with self.lock:
+                return self.conn.execute(sql, (sec_uid, mix_id, aweme_id)).fetchone()
         except Exception as e:
             pass
 
+    def known_mix(self, sec_uid: str, mix_id: str, aweme_ids) -> set:
+        return self.known.filter("t_mix", {"mix_id": mix_id, "sec_uid": sec_uid}, aweme_ids)
+
     def insert_mix(self, sec_uid: str, mix_id: str, aweme_id: int, data: dict):
         insertsql = """insert into t_mix (sec_uid, mix_id, aweme_id, rawdata) values(?,?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (sec_uid, mix_id, aweme_id, json.dumps(data)))
-            self.conn.commit()
+            with self.lock, self.conn:
+                self.conn.execute(insertsql, (sec_uid, mix_id, aweme_id, json.dumps(data)))
         except Exception as e:
-            pass
+            return
+        self.known.add("t_mix", {"mix_id": mix_id, "sec_uid": sec_uid}, [aweme_id])
+
+    def insert_mixes(self, sec_uid: str, mix_id: str, awemes: list):
+        # t_mix 的 aweme_id 没有唯一约束, 调用方只传入未记录过的作品
+        insertsql = """insert into t_mix (sec_uid, mix_id, aweme_id, rawdata) values(?,?,?,?);"""
+        self._insert_many(insertsql, [(sec_uid, mix_id, aweme['aweme_id'], json.dumps(aweme)) for aweme in awemes],
+                          "t_mix", {"mix_id": mix_id, "sec_uid": sec_uid}, [aweme['aweme_id'] for aweme in awemes])
 
     def create_music_table(self):
         sql = """CREATE TABLE if not exists t_music (
@@ -136,22 +227,77 @@ class DataBase(object):
         sql = """select id, music_id, aweme_id, rawdata from t_music where music_id=? and aweme_id=?;"""
 
         try:
-            self.cursor.execute(sql, (music_id, aweme_id))
-            self.conn.commit()
-            res = self.cursor.fetchone()
-            return res
+            with self.lock:
+                return self.conn.execute(sql, (music_id, aweme_id)).fetchone()
         except Exception as e:
             pass
 
+    def known_music(self, music_id: str, aweme_ids) -> set:
+        return self.known.filter("t_music", {"music_id": music_id}, aweme_ids)
+
     def insert_music(self, music_id: str, aweme_id: int, data: dict):
         insertsql = """insert into t_music (music_id, aweme_id, rawdata) values(?,?,?);"""
 
         try:
-            self.cursor.execute(insertsql, (music_id, aweme_id, json.dumps(data)))
+            with self.lock, self.conn:
+                self.conn.execute(insertsql, (music_id, aweme_id, json.dumps(data)))
+        except Exception as e:
+            return
+        self.known.add("t_music", {"music_id": music_id}, [aweme_id])
+
+    def insert_musics(self, music_id: str, awemes: list):
+        insertsql = """insert or ignore into t_music (music_id, aweme_id, rawdata) values(?,?,?);"""
+        self._insert_many(insertsql, [(music_id, aweme['aweme_id'], json.dumps(aweme)) for aweme in awemes],
+                          "t_music", {"music_id": music_id}, [aweme['aweme_id'] for aweme in awemes])
+
+
+    def create_crawl_state_table(self):
+        """翻页断点: 每个集合(用户作品/喜欢、合集、音乐)在某个过滤条件下的翻页进度"""
+        sql = """CREATE TABLE if not exists t_crawl_state (
+                        kind varchar(20),
+                        target varchar(200),
+                        filter_hash varchar(32),
+                        cursor integer,
+                        has_more integer,
+                        yielded integer,
+                        pages integer,
+                        done integer,
+                        updated real,
+                        primary key (kind, target, filter_hash)
+                    );"""
+
+        try:
+            self.cursor.execute(sql)
             self.conn.commit()
         except Exception as e:
             pass
 
+    def get_crawl_state(self, kind: str, target: str, filter_hash: str):
+        sql = """select cursor, has_more, yielded, pages, done, updated from t_crawl_state
+                 where kind=? and target=? and filter_hash=?;"""
+
+        try:
+            with self.lock:
+                row = self.conn.execute(sql, (kind, target, filter_hash)).fetchone()
+        except Exception as e:
+            return None
+        if row is None:
+            return None
+        return dict(zip(("cursor", "has_more", "yielded", "pages", "done", "updated"), row))
+
+    def save_crawl_state(self, kind: str, target: str, filter_hash: str, cursor: int, has_more: bool,
+                         yielded: int, pages: int, done=False):
+        sql = """insert or replace into t_crawl_state
+                 (kind, target, filter_hash, cursor, has_more, yielded, pages, done, updated)
+                 values(?,?,?,?,?,?,?,?,?);"""
+
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(sql, (kind, target, filter_hash, cursor, int(bool(has_more)), yielded, pages,
+                                        int(done), time.time()))
+        except Exception as e:
+            pass
+
 
 if __name__ == '__main__':
     pass
@@ -3,21 +3,23 @@
 
 
 import re
-import requests
-import json
 import time
-import copy
+import hashlib
+import functools
 # from tenacity import retry, stop_after_attempt, wait_exponential
 from typing import Tuple, Optional
 from requests.exceptions import RequestException
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
 from rich.console import Console
 
-from apiproxy.douyin import douyin_headers
 from apiproxy.douyin.urls import Urls
-from apiproxy.douyin.result import Result
+from apiproxy.douyin.result import Result, aweme_projector
+from apiproxy.douyin.records import to_plain
 from apiproxy.douyin.database import DataBase
-from apiproxy.common import utils
+from apiproxy.douyin.feed import CrawlFeed
+from apiproxy.douyin.request import requestApi
+from apiproxy.douyin.resolver import link_resolver
+from apiproxy.common.aio import iterate_in_thread
 from utils import logger
 
 # 创建全局console实例
@@ -25,12 +27,12 @@ console = Console()
 
 class Douyin(object):
 
-    def __init__(self, database=False):
+    def __init__(self, database=False, db_path='data.db'):
         self.urls = Urls()
         self.result = Result()
         self.database = database
         if database:
-            self.db = DataBase()
+            self.db = DataBase(db_path)
         # 用于设置重复请求某个接口的最大时间
         self.timeout = 10
         self.console = Console()  # 也可以在实例中创建console
@@ -49,64 +51,8 @@ class Douyin(object):
         Returns:
             (资源类型, 资源ID)
         """
-        key = None
-        key_type = None
-
-        try:
-            r = requests.get(url=url, headers=douyin_headers)
-        except Exception as e:
-            print('[  错误  ]:输入链接有误！\r')
-            return key_type, key
-
-        # 抖音把图集更新为note
-        # 作品 第一步解析出来的链接是share/video/{aweme_id}
-        # https://www.iesdouyin.com/share/video/7037827546599263488/?region=CN&mid=6939809470193126152&u_code=j8a5173b&did=MS4wLjABAAAA1DICF9-A9M_CiGqAJZdsnig5TInVeIyPdc2QQdGrq58xUgD2w6BqCHovtqdIDs2i&iid=MS4wLjABAAAAomGWi4n2T0H9Ab9x96cUZoJXaILk4qXOJlJMZFiK6b_aJbuHkjN_f0mBzfy91DX1&with_sec_did=1&titleType=title&schema_type=37&from_ssr=1&utm_source=copy&utm_campaign=client_share&utm_medium=android&app=aweme
-        # 用户 第一步解析出来的链接是share/user/{sec_uid}
-        # https://www.iesdouyin.com/share/user/MS4wLjABAAAA06y3Ctu8QmuefqvUSU7vr0c_ZQnCqB0eaglgkelLTek?did=MS4wLjABAAAA1DICF9-A9M_CiGqAJZdsnig5TInVeIyPdc2QQdGrq58xUgD2w6BqCHovtqdIDs2i&iid=MS4wLjABAAAAomGWi4n2T0H9Ab9x96cUZoJXaILk4qXOJlJMZFiK6b_aJbuHkjN_f0mBzfy91DX1&with_sec_did=1&sec_uid=MS4wLjABAAAA06y3Ctu8QmuefqvUSU7vr0c_ZQnCqB0eaglgkelLTek&from_ssr=1&u_code=j8a5173b&timestamp=1674540164&ecom_share_track_params=%7B%22is_ec_shopping%22%3A%221%22%2C%22secuid%22%3A%22MS4wLjABAAAA-jD2lukp--I21BF8VQsmYUqJDbj3FmU-kGQTHl2y1Cw%22%2C%22enter_from%22%3A%22others_homepage%22%2C%22share_previous_page%22%3A%22others_homepage%22%7D&utm_source=copy&utm_campaign=client_share&utm_medium=android&app=aweme
-        # 合集
-        # https://www.douyin.com/collection/7093490319085307918
-        urlstr = str(r.request.path_url)
-
-        if "/user/" in urlstr:
-            # 获取用户 sec_uid
-            if '?' in r.request.path_url:
-                for one in re.finditer(r'user\/([\d\D]*)([?])', str(r.request.path_url)):
-                    key = one.group(1)
-            else:
-                for one in re.finditer(r'user\/([\d\D]*)', str(r.request.path_url)):
-                    key = one.group(1)
-            key_type = "user"
-        elif "/video/" in urlstr:
-            # 获取作品 aweme_id
-            key = re.findall('video/(\d+)?', urlstr)[0]
-            key_type = "aweme"
-        elif "/note/" in urlstr:
-            # 获取note aweme_id
-            key = re.findall('note/(\d+)?', urlstr)[0]
-            key_type = "aweme"
-        elif "/mix/detail/" in urlstr:
-            # 获取合集 id
-            key = re.findall('/mix/detail/(\d+)?', urlstr)[0]
-            key_type = "mix"
-        elif "/collection/" in urlstr:
-            # 获取合集 id
-            key = re.findall('/collection/(\d+)?', urlstr)[0]
-            key_type = "mix"
-        elif "/music/" in urlstr:
-            # 获取原声 id
-            key = re.findall('music/(\d+)?', urlstr)[0]
-            key_type = "music"
-        elif "/webcast/reflow/" in urlstr:
-            key1 = re.findall('reflow/(\d+)?', urlstr)[0]
-            url = self.urls.LIVE2 + utils.getXbogus(
-                f'live_id=1&room_id={key1}&app_id=1128')
-            res = requests.get(url, headers=douyin_headers)
-            resjson = json.loads(res.text)
-            key = resjson['data']['room']['owner']['web_rid']
-            key_type = "live"
-        elif "live.douyin.com" in r.url:
-            key = r.url.replace('https://live.douyin.com/', '')
-            key_type = "live"
+        # 短链只跟随重定向, 不下载落地页; 结果持久化缓存
+        key_type, key = link_resolver.resolve(url)
 
         if key is None or key_type is None:
             print('[  错误  ]:输入链接有误！无法获取 id\r')
@@ -114,6 +60,10 @@ class Douyin(object):
 
         return key_type, key
 
+    def getKeys(self, urls: list) -> list:
+        """并发解析多个链接, 返回与输入顺序一致的 (资源类型, 资源ID) 列表"""
+        return link_resolver.resolveMany(urls)
+
     # 暂时注释掉装饰器
     # @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def getAwemeInfo(self, aweme_id: str) -> dict:
@@ -125,42 +75,16 @@ class Douyin(object):
                 if aweme_id is None:
                     return {}
 
-                start = time.time()  # 开始时间
-                while True:
-                    # 接口不稳定, 有时服务器不返回数据, 需要重新获取
-                    try:
-                        # 单作品接口返回 'aweme_detail'
-                        # 主页作品接口返回 'aweme_list'->['aweme_detail']
-                        jx_url = self.urls.POST_DETAIL + utils.getXbogus(
-                            f'aweme_id={aweme_id}&device_platform=webapp&aid=6383')
-
-                        raw = requests.get(url=jx_url, headers=douyin_headers).text
-                        datadict = json.loads(raw)
-                        if datadict is not None and datadict["status_code"] == 0:
-                            break
-                    except Exception as e:
-                        end = time.time()  # 结束时间
-                        if end - start > self.timeout:
-                            print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
-                            return {}
-
-
-                # 清空self.awemeDict
-                self.result.clearDict(self.result.awemeDict)
-
-                # 默认为视频
-                awemeType = 0
-                try:
-                    # datadict['aweme_detail']["images"] 不为 None 说明是图集
-                    if datadict['aweme_detail']["images"] is not None:
-                        awemeType = 1
-                except Exception as e:
-                    print("[  警告  ]:接口中未找到 images\r")
-
-                # 转换成我们自己的格式
-                self.result.dataConvert(awemeType, self.result.awemeDict, datadict['aweme_detail'])
+                # 单作品接口返回 'aweme_detail'
+                # 主页作品接口返回 'aweme_list'->['aweme_detail']
+                datadict = requestApi(self.urls.POST_DETAIL,
+                                      f'aweme_id={aweme_id}&device_platform=webapp&aid=6383', self.timeout)
+                if datadict is None:
+                    print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
+                    return {}
 
-                return self.result.awemeDict
+                # 转换成我们自己的格式, 作品类型由 images 判断; 单个作品对外返回普通字典
+                return to_plain(aweme_projector.project(datadict['aweme_detail']))
             except RequestException as e:
                 logger.warning(f"请求失败（尝试 {attempt+1}/{retries}）: {str(e)}")
                 time.sleep(2 ** attempt)
@@ -184,23 +108,11 @@ class Douyin(object):
         """
         if sec_uid is None:
             return None
+        if mode not in ("post", "like"):
+            self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
+            return None
 
-        # 处理时间范围
-        if end_time == "now":
-            end_time = time.strftime("%Y-%m-%d")
-        
-        if not start_time:
-            start_time = "1970-01-01"
-        if not end_time:
-            end_time = "2099-12-31"
-
-        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
-        
-        max_cursor = 0
         awemeList = []
-        total_fetched = 0
-        filtered_count = 0
-        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -214,99 +126,184 @@ class Douyin(object):
                 f"[cyan]📥 正在获取{mode}作品列表...", 
                 total=None  # 总数未知，使用无限进度条
             )
-            
-            while True:
-                try:
-                    # 构建请求URL
+            for aweme in self.iterUserInfo(sec_uid, mode, count, number, increase, start_time, end_time).drain():
+                awemeList.append(aweme)
+                progress.update(fetch_task, description=f"[cyan]📥 已获取: {len(awemeList)}个作品")
+
+        return awemeList
+
+    def iterUserInfo(self, sec_uid, mode="post", count=35, number=0, increase=False, start_time="", end_time=""):
+        """getUserInfo 的迭代器版本, 每获取一页就产出该页转换后的作品
+
+        参数同 getUserInfo。下载器可以边翻页边下载, 内存中只保留在途的作品。
+        返回 CrawlFeed: 处理完每个作品后调用 ack, 断点与已下载记录只推进到最早还有作品未处理完的那一页。
+        """
+        start_time, end_time = self._timeRange(start_time, end_time)
+        filter_hash = self._crawlFilter(start_time, end_time, number, increase)
+        return CrawlFeed(self._userPages(sec_uid, mode, count, number, increase, start_time, end_time, filter_hash),
+                         functools.partial(self._saveCheckpoint, mode, sec_uid, filter_hash))
+
+    def _userPages(self, sec_uid, mode, count, number, increase, start_time, end_time, filter_hash):
+        """iterUserInfo 的翻页生成器, 逐页产出 (断点, 下一页断点, 作品列表, 记录函数), 见 CrawlFeed"""
+        if sec_uid is None:
+            return None
+        if mode not in ("post", "like"):
+            self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
+            return None
+
+        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
+
+        # 断点续传: 上次中途失败时从记录的游标继续翻页
+        max_cursor, yielded, pages = self._loadCheckpoint(mode, sec_uid, filter_hash)
+        total_fetched = 0
+
+        # 发布作品按发布时间倒序(置顶作品除外), max_cursor 是毫秒时间戳:
+        # 设置了结束时间时跳到结束时间处翻页, 越过开始时间后即停止。
+        # 置顶作品只出现在第一页, 所以仍先取第一页; 第一页整页都晚于结束时间时只保留其中的置顶作品再跳转
+        ordered = mode == "post"
+        jump = 0
+        if ordered and max_cursor == 0 and end_time != "2099-12-31":
+            jump = self._timeCursor(end_time)
+        pinned = set()
+        
+        while True:
+            try:
+                # 发送请求
+                datadict = requestApi(
+                    self.urls.USER_POST if mode == "post" else self.urls.USER_FAVORITE_A,
+                    f'sec_user_id={sec_uid}&count={count}&max_cursor={max_cursor}&device_platform=webapp&aid=6383',
+                    self.timeout)
+
+                # 处理返回数据
+                if not datadict:
+                    self.console.print(f"[red]❌ API请求失败: 重复请求 {self.timeout}s 仍未获取到数据[/]")
+                    return None
+                    
+                total_fetched += len(datadict["aweme_list"])
+                page = []
+                new_awemes = []
+                stop = False
+                pinned_only = bool(jump and datadict["has_more"] and datadict["max_cursor"] > jump)
+                jump_to, jump = jump, 0
+
+                # 增量更新: 整页作品一次查询是否已记录
+                if self.database:
+                    ids = [aweme['aweme_id'] for aweme in datadict["aweme_list"]]
                     if mode == "post":
-                        url = self.urls.USER_POST + utils.getXbogus(
-                            f'sec_user_id={sec_uid}&count={count}&max_cursor={max_cursor}&device_platform=webapp&aid=6383')
-                    elif mode == "like":
-                        url = self.urls.USER_FAVORITE_A + utils.getXbogus(
-                            f'sec_user_id={sec_uid}&count={count}&max_cursor={max_cursor}&device_platform=webapp&aid=6383')
+                        known = self.db.known_user_post(sec_uid, ids)
                     else:
-                        self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
-                        return None
+                        known = self.db.known_user_like(sec_uid, ids)
 
-                    # 发送请求
-                    res = requests.get(url=url, headers=douyin_headers)
-                    datadict = json.loads(res.text)
-                    
-                    # 处理返回数据
-                    if not datadict or datadict.get("status_code") != 0:
-                        self.console.print(f"[red]❌ API请求失败: {datadict.get('status_msg', '未知错误')}[/]")
-                        break
-                        
-                    current_count = len(datadict["aweme_list"])
-                    total_fetched += current_count
-                    
-                    # 更新进度显示
-                    progress.update(
-                        fetch_task, 
-                        description=f"[cyan]📥 已获取: {total_fetched}个作品"
+                # 在处理作品时添加时间过滤
+                for aweme in datadict["aweme_list"]:
+                    if pinned_only:
+                        if not aweme.get("is_top"):
+                            continue
+                        pinned.add(aweme['aweme_id'])
+                    elif aweme['aweme_id'] in pinned:
+                        # 跳转后的页中再次出现的置顶作品
+                        continue
+
+                    create_time = time.strftime(
+                        "%Y-%m-%d", 
+                        time.localtime(int(aweme.get("create_time", 0)))
                     )
+                    
+                    # 时间过滤
+                    if not (start_time <= create_time <= end_time):
+                        # 非置顶作品早于开始时间, 之后的作品只会更早
+                        if ordered and create_time < start_time and not aweme.get("is_top"):
+                            self.console.print(f"[green]✅ 已获取时间范围内的全部作品[/]")
+                            stop = True
+                            break
+                        continue
 
-                    # 在处理作品时添加时间过滤
-                    for aweme in datadict["aweme_list"]:
-                        create_time = time.strftime(
-                            "%Y-%m-%d", 
-                            time.localtime(int(aweme.get("create_time", 0)))
-                        )
+                    # 数量限制检查
+                    if number > 0 and yielded + len(page) >= number:
+                        self.console.print(f"[green]✅ 已达到限制数量: {number}[/]")
+                        stop = True
+                        break
                         
-                        # 时间过滤
-                        if not (start_time <= create_time <= end_time):
-                            filtered_count += 1
-                            continue
-
-                        # 数量限制检查
-                        if number > 0 and len(awemeList) >= number:
-                            self.console.print(f"[green]✅ 已达到限制数量: {number}[/]")
-                            return awemeList
-                            
-                        # 增量更新检查
-                        if self.database:
-                            if mode == "post":
-                                if self.db.get_user_post(sec_uid=sec_uid, aweme_id=aweme['aweme_id']):
-                                    if increase and aweme['is_top'] == 0:
-                                        self.console.print("[green]✅ 增量更新完成[/]")
-                                        return awemeList
-                                else:
-                                    self.db.insert_user_post(sec_uid=sec_uid, aweme_id=aweme['aweme_id'], data=aweme)
-                            elif mode == "like":
-                                if self.db.get_user_like(sec_uid=sec_uid, aweme_id=aweme['aweme_id']):
-                                    if increase and aweme['is_top'] == 0:
-                                        self.console.print("[green]✅ 增量更新完成[/]")
-                                        return awemeList
-                            else:
-                                self.console.print("[red]❌ 模式选择错误，仅支持post、like[/]")
-                                return None
-
-                        # 转换数据格式
-                        aweme_data = self._convert_aweme_data(aweme)
-                        if aweme_data:
-                            awemeList.append(aweme_data)
-
-                    # 检查是否还有更多数据
-                    if not datadict["has_more"]:
+                    # 增量更新检查
+                    if self.database:
+                        if str(aweme['aweme_id']) in known:
+                            if increase and aweme['is_top'] == 0:
+                                self.console.print("[green]✅ 增量更新完成[/]")
+                                stop = True
+                                break
+                        else:
+                            new_awemes.append(aweme)
+
+                    # 转换数据格式
+                    aweme_data = self._convert_aweme_data(aweme)
+                    if aweme_data:
+                        page.append(aweme_data)
+
+                # 整页新作品在一个事务中写入, 等这一页处理完再写
+                record = None
+                if new_awemes:
+                    insert = self.db.insert_user_posts if mode == "post" else self.db.insert_user_likes
+                    record = functools.partial(insert, sec_uid, new_awemes)
+
+                last = stop or not datadict["has_more"]
+                state = (max_cursor, yielded, pages)
+                yielded += len(page)
+                pages += 1
+                if not last:
+                    max_cursor = jump_to if pinned_only else datadict["max_cursor"]
+                yield state, None if last else (max_cursor, yielded, pages), page, record
+
+                if last:
+                    if not stop:
                         self.console.print(f"[green]✅ 已获取全部作品: {total_fetched}个[/]")
-                        break
-                    
-                    # 更新游标
-                    max_cursor = datadict["max_cursor"]
-                    
-                except Exception as e:
-                    self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
-                    break
+                    return yielded, pages
+                
+            except Exception as e:
+                self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
+                return None
 
-        return awemeList
+    @staticmethod
+    def _timeRange(start_time, end_time):
+        """处理时间范围: 结束时间 now 表示今天, 未设置时不限制"""
+        if end_time == "now":
+            end_time = time.strftime("%Y-%m-%d")
+        return start_time or "1970-01-01", end_time or "2099-12-31"
+
+    def _crawlFilter(self, *conditions) -> str:
+        """过滤条件的摘要, 过滤条件不同的翻页进度分开记录"""
+        return hashlib.md5("|".join(str(c) for c in conditions).encode("utf-8")).hexdigest()
+
+    def _loadCheckpoint(self, kind, target, filter_hash):
+        """返回 (游标, 已产出作品数, 已获取页数); 上次翻页中途失败时从断点继续"""
+        if not self.database:
+            return 0, 0, 0
+        state = self.db.get_crawl_state(kind, target, filter_hash)
+        if state is None or state["done"] or not state["has_more"]:
+            return 0, 0, 0
+        self.console.print(f"[yellow]⏩ 从上次中断处继续: 已获取 {state['pages']} 页, {state['yielded']} 个作品[/]")
+        return state["cursor"], state["yielded"], state["pages"]
+
+    def _saveCheckpoint(self, kind, target, filter_hash, cursor, yielded, pages, done=False):
+        """记录翻页进度; done 表示本次翻页正常结束, 下次从头开始
+
+        翻页与下载同时进行, 由 CrawlFeed 调用: 记录的是最早还有作品未处理完的那一页的游标与之前的计数,
+        中断后从这一页重新开始, 已下载的作品会被跳过。
+        """
+        if self.database:
+            self.db.save_crawl_state(kind, target, filter_hash, cursor, not done, yielded, pages, done)
+
+    @staticmethod
+    def _timeCursor(day: str) -> int:
+        """结束日期当天 24 点对应的 max_cursor(毫秒时间戳), 日期无法解析时返回 0"""
+        try:
+            return (int(time.mktime(time.strptime(day, "%Y-%m-%d"))) + 24 * 60 * 60) * 1000
+        except (ValueError, OverflowError):
+            return 0
 
     def _convert_aweme_data(self, aweme):
         """转换作品数据格式"""
         try:
-            self.result.clearDict(self.result.awemeDict)
-            aweme_type = 1 if aweme.get("images") else 0
-            self.result.dataConvert(aweme_type, self.result.awemeDict, aweme)
-            return copy.deepcopy(self.result.awemeDict)
+            return aweme_projector.project(aweme)
         except Exception as e:
             logger.error(f"数据转换错误: {str(e)}")
             return None
@@ -314,22 +311,10 @@ class Douyin(object):
     def getLiveInfo(self, web_rid: str):
         print('[  提示  ]:正在请求的直播间 id = %s\r\n' % web_rid)
 
-        start = time.time()  # 开始时间
-        while True:
-            # 接口不稳定, 有时服务器不返回数据, 需要重新获取
-            try:
-                live_api = self.urls.LIVE + utils.getXbogus(
-                    f'aid=6383&device_platform=web&web_rid={web_rid}')
-
-                response = requests.get(live_api, headers=douyin_headers)
-                live_json = json.loads(response.text)
-                if live_json != {} and live_json['status_code'] == 0:
-                    break
-            except Exception as e:
-                end = time.time()  # 结束时间
-                if end - start > self.timeout:
-                    print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
-                    return {}
+        live_json = requestApi(self.urls.LIVE, f'aid=6383&device_platform=web&web_rid={web_rid}', self.timeout)
+        if live_json is None:
+            print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
+            return {}
 
         # 清空字典
         self.result.clearDict(self.result.liveDict)
@@ -402,22 +387,7 @@ class Douyin(object):
         if mix_id is None:
             return None
 
-        # 处理时间范围
-        if end_time == "now":
-            end_time = time.strftime("%Y-%m-%d")
-        
-        if not start_time:
-            start_time = "1970-01-01"
-        if not end_time:
-            end_time = "2099-12-31"
-
-        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
-
-        cursor = 0
         awemeList = []
-        total_fetched = 0
-        filtered_count = 0
-
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -431,65 +401,105 @@ class Douyin(object):
                 "[cyan]📥 正在获取合集作品...",
                 total=None
             )
+            for aweme in self.iterMixInfo(mix_id, count, number, increase, sec_uid, start_time, end_time).drain():
+                awemeList.append(aweme)
+                progress.update(fetch_task, description=f"[cyan]📥 已获取: {len(awemeList)}个作品")
 
-            while True:  # 外层循环
-                try:
-                    url = self.urls.USER_MIX + utils.getXbogus(
-                        f'mix_id={mix_id}&cursor={cursor}&count={count}&device_platform=webapp&aid=6383')
+        return awemeList
 
-                    res = requests.get(url=url, headers=douyin_headers)
-                    datadict = json.loads(res.text)
+    def iterMixInfo(self, mix_id, count=35, number=0, increase=False, sec_uid="", start_time="", end_time=""):
+        """getMixInfo 的迭代器版本, 每获取一页就产出该页转换后的作品; 返回 CrawlFeed, 见 iterUserInfo"""
+        start_time, end_time = self._timeRange(start_time, end_time)
+        filter_hash = self._crawlFilter(start_time, end_time, number, increase)
+        return CrawlFeed(self._mixPages(mix_id, count, number, increase, sec_uid, start_time, end_time, filter_hash),
+                         functools.partial(self._saveCheckpoint, "mix", mix_id, filter_hash))
 
-                    if not datadict:
-                        self.console.print("[red]❌ 获取数据失败[/]")
-                        break
+    def _mixPages(self, mix_id, count, number, increase, sec_uid, start_time, end_time, filter_hash):
+        """iterMixInfo 的翻页生成器, 见 CrawlFeed"""
+        if mix_id is None:
+            return None
 
-                    for aweme in datadict["aweme_list"]:
-                        create_time = time.strftime(
-                            "%Y-%m-%d",
-                            time.localtime(int(aweme.get("create_time", 0)))
-                        )
+        self.console.print(f"[cyan]🕒 时间范围: {start_time} 至 {end_time}[/]")
 
-                        # 时间过滤
-                        if not (start_time <= create_time <= end_time):
-                            filtered_count += 1
-                            continue
+        # 断点续传: 上次中途失败时从记录的游标继续翻页
+        cursor, yielded, pages = self._loadCheckpoint("mix", mix_id, filter_hash)
+        filtered_count = 0
+        result = None
 
-                        # 数量限制检查
-                        if number > 0 and len(awemeList) >= number:
-                            return awemeList  # 使用return替代break
-
-                        # 增量更新检查
-                        if self.database:
-                            if self.db.get_mix(sec_uid=sec_uid, mix_id=mix_id, aweme_id=aweme['aweme_id']):
-                                if increase and aweme['is_top'] == 0:
-                                    return awemeList  # 使用return替代break
-                            else:
-                                self.db.insert_mix(sec_uid=sec_uid, mix_id=mix_id, aweme_id=aweme['aweme_id'], data=aweme)
-
-                        # 转换数据
-                        aweme_data = self._convert_aweme_data(aweme)
-                        if aweme_data:
-                            awemeList.append(aweme_data)
-
-                    # 检查是否还有更多数据
-                    if not datadict.get("has_more"):
-                        self.console.print(f"[green]✅ 已获取全部作品[/]")
+        while True:  # 外层循环
+            try:
+                datadict = requestApi(self.urls.USER_MIX,
+                                      f'mix_id={mix_id}&cursor={cursor}&count={count}&device_platform=webapp&aid=6383',
+                                      self.timeout, accept=lambda d: "aweme_list" in d)
+
+                if not datadict:
+                    self.console.print("[red]❌ 获取数据失败[/]")
+                    break
+
+                page = []
+                new_awemes = []
+                stop = False
+
+                # 增量更新: 整页作品一次查询是否已记录
+                if self.database:
+                    known = self.db.known_mix(sec_uid, mix_id, [aweme['aweme_id'] for aweme in datadict["aweme_list"]])
+
+                for aweme in datadict["aweme_list"]:
+                    create_time = time.strftime(
+                        "%Y-%m-%d",
+                        time.localtime(int(aweme.get("create_time", 0)))
+                    )
+
+                    # 时间过滤
+                    if not (start_time <= create_time <= end_time):
+                        filtered_count += 1
+                        continue
+
+                    # 数量限制检查
+                    if number > 0 and yielded + len(page) >= number:
+                        stop = True
                         break
 
-                    # 更新游标
+                    # 增量更新检查
+                    if self.database:
+                        if str(aweme['aweme_id']) in known:
+                            if increase and aweme['is_top'] == 0:
+                                stop = True
+                                break
+                        else:
+                            new_awemes.append(aweme)
+
+                    # 转换数据
+                    aweme_data = self._convert_aweme_data(aweme)
+                    if aweme_data:
+                        page.append(aweme_data)
+
+                record = None
+                if new_awemes:
+                    record = functools.partial(self.db.insert_mixes, sec_uid, mix_id, new_awemes)
+
+                # 检查是否还有更多数据
+                last = stop or not datadict.get("has_more")
+                state = (cursor, yielded, pages)
+                yielded += len(page)
+                pages += 1
+                if not last:
                     cursor = datadict.get("cursor", 0)
-                    total_fetched += len(datadict["aweme_list"])
-                    progress.update(fetch_task, description=f"[cyan]📥 已获取: {total_fetched}个作品")
+                yield state, None if last else (cursor, yielded, pages), page, record
 
-                except Exception as e:
-                    self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
+                if last:
+                    if not stop:
+                        self.console.print(f"[green]✅ 已获取全部作品[/]")
+                    result = (yielded, pages)
                     break
 
+            except Exception as e:
+                self.console.print(f"[red]❌ 获取作品列表出错: {str(e)}[/]")
+                break
+
         if filtered_count > 0:
             self.console.print(f"[yellow]⚠️  已过滤 {filtered_count} 个不在时间范围内的作品[/]")
-
-        return awemeList
+        return result
 
     def getUserAllMixInfo(self, sec_uid, count=35, number=0):
         print('[  提示  ]:正在请求的用户 id = %s\r\n' % sec_uid)
@@ -510,25 +520,13 @@ class Douyin(object):
             times = times + 1
             print("[  提示  ]:正在对 [合集列表] 进行第 " + str(times) + " 次请求...\r")
 
-            start = time.time()  # 开始时间
-            while True:
-                # 接口不稳定, 有时服务器不返回数据, 需要重新获取
-                try:
-                    url = self.urls.USER_MIX_LIST + utils.getXbogus(
-                        f'sec_user_id={sec_uid}&count={count}&cursor={cursor}&device_platform=webapp&aid=6383')
-
-                    res = requests.get(url=url, headers=douyin_headers)
-                    datadict = json.loads(res.text)
-                    print('[  提示  ]:本次请求返回 ' + str(len(datadict["mix_infos"])) + ' 条数据\r')
-
-                    if datadict is not None and datadict["status_code"] == 0:
-                        break
-                except Exception as e:
-                    end = time.time()  # 结束时间
-                    if end - start > self.timeout:
-                        print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
-                        return mixIdNameDict
-
+            datadict = requestApi(self.urls.USER_MIX_LIST,
+                                  f'sec_user_id={sec_uid}&count={count}&cursor={cursor}&device_platform=webapp&aid=6383',
+                                  self.timeout)
+            if datadict is None:
+                print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
+                return mixIdNameDict
+            print('[  提示  ]:本次请求返回 ' + str(len(datadict["mix_infos"])) + ' 条数据\r')
 
             for mix in datadict["mix_infos"]:
                 mixIdNameDict[mix["mix_id"]] = mix["mix_name"]
@@ -553,18 +551,24 @@ class Douyin(object):
         return mixIdNameDict
 
     def getMusicInfo(self, music_id: str, count=35, number=0, increase=False):
+        if music_id is None:
+            return None
+        return list(self.iterMusicInfo(music_id, count, number, increase).drain())
+
+    def iterMusicInfo(self, music_id: str, count=35, number=0, increase=False):
+        """getMusicInfo 的迭代器版本, 每获取一页就产出该页转换后的作品; 返回 CrawlFeed, 见 iterUserInfo"""
+        filter_hash = self._crawlFilter(number, increase)
+        return CrawlFeed(self._musicPages(music_id, count, number, increase, filter_hash),
+                         functools.partial(self._saveCheckpoint, "music", music_id, filter_hash))
+
+    def _musicPages(self, music_id, count, number, increase, filter_hash):
+        """iterMusicInfo 的翻页生成器, 见 CrawlFeed"""
         print('[  提示  ]:正在请求的音乐集合 id = %s\r\n' % music_id)
         if music_id is None:
             return None
-        if number <= 0:
-            numflag = False
-        else:
-            numflag = True
 
-        cursor = 0
-        awemeList = []
-        increaseflag = False
-        numberis0 = False
+        # 断点续传: 上次中途失败时从记录的游标继续翻页
+        cursor, yielded, pages = self._loadCheckpoint("music", music_id, filter_hash)
 
         print("[  提示  ]:正在获取音乐集合下的所有作品数据请稍后...\r")
         print("[  提示  ]:会进行多次请求，等待时间较长...\r\n")
@@ -573,120 +577,85 @@ class Douyin(object):
             times = times + 1
             print("[  提示  ]:正在对 [音乐集合] 进行第 " + str(times) + " 次请求...\r")
 
-            start = time.time()  # 开始时间
-            while True:
-                # 接口不稳定, 有时服务器不返回数据, 需要重新获取
-                try:
-                    url = self.urls.MUSIC + utils.getXbogus(
-                        f'music_id={music_id}&cursor={cursor}&count={count}&device_platform=webapp&aid=6383')
-
-                    res = requests.get(url=url, headers=douyin_headers)
-                    datadict = json.loads(res.text)
-                    print('[  提示  ]:本次请求返回 ' + str(len(datadict["aweme_list"])) + ' 条数据\r')
+            datadict = requestApi(self.urls.MUSIC,
+                                  f'music_id={music_id}&cursor={cursor}&count={count}&device_platform=webapp&aid=6383',
+                                  self.timeout)
+            if datadict is None:
+                print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
+                return None
+            print('[  提示  ]:本次请求返回 ' + str(len(datadict["aweme_list"])) + ' 条数据\r')
 
-                    if datadict is not None and datadict["status_code"] == 0:
-                        break
-                except Exception as e:
-                    end = time.time()  # 结束时间
-                    if end - start > self.timeout:
-                        print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
-                        return awemeList
+            page = []
+            new_awemes = []
+            stop = False
 
+            # 增量更新: 整页作品一次查询是否已记录
+            if self.database:
+                known = self.db.known_music(music_id, [aweme['aweme_id'] for aweme in datadict["aweme_list"]])
 
             for aweme in datadict["aweme_list"]:
+                # 数量限制
+                if number > 0 and yielded + len(page) >= number:
+                    print("\r\n[  提示  ]: [音乐集合] 下指定数量作品数据获取完成...\r\n")
+                    stop = True
+                    break
+
                 if self.database:
-                    # 退出条件
-                    if increase is False and numflag and numberis0:
-                        break
-                    if increase and numflag and numberis0 and increaseflag:
-                        break
-                    # 增量更新, 找到非置顶的最新的作品发布时间
-                    if self.db.get_music(music_id=music_id, aweme_id=aweme['aweme_id']) is not None:
+                    # 增量更新, 遇到已记录的非置顶作品即结束
+                    if str(aweme['aweme_id']) in known:
                         if increase and aweme['is_top'] == 0:
-                            increaseflag = True
+                            print("\r\n[  提示  ]: [音乐集合] 下作品增量更新数据获取完成...\r\n")
+                            stop = True
+                            break
                     else:
-                        self.db.insert_music(music_id=music_id, aweme_id=aweme['aweme_id'], data=aweme)
-
-                    # 退出条件
-                    if increase and numflag is False and increaseflag:
-                        break
-                    if increase and numflag and numberis0 and increaseflag:
-                        break
-                else:
-                    if numflag and numberis0:
-                        break
-
-                if numflag:
-                    number -= 1
-                    if number == 0:
-                        numberis0 = True
-
-                # 清空self.awemeDict
-                self.result.clearDict(self.result.awemeDict)
-
-                # 默认为视频
-                awemeType = 0
-                try:
-                    if aweme["images"] is not None:
-                        awemeType = 1
-                except Exception as e:
-                    print("[  警告  ]:接口中未找到 images\r")
+                        new_awemes.append(aweme)
 
                 # 转换成我们自己的格式
-                self.result.dataConvert(awemeType, self.result.awemeDict, aweme)
-
-                if self.result.awemeDict is not None and self.result.awemeDict != {}:
-                    awemeList.append(copy.deepcopy(self.result.awemeDict))
-
-            if self.database:
-                if increase and numflag is False and increaseflag:
-                    print("\r\n[  提示  ]: [音乐集合] 下作品增量更新数据获取完成...\r\n")
-                    break
-                elif increase is False and numflag and numberis0:
-                    print("\r\n[  提示  ]: [音乐集合] 下指定数量作品数据获取完成...\r\n")
-                    break
-                elif increase and numflag and numberis0 and increaseflag:
-                    print("\r\n[  提示  ]: [音乐集合] 下指定数量作品数据获取完成, 增量更新数据获取完成...\r\n")
-                    break
-            else:
-                if numflag and numberis0:
-                    print("\r\n[  提示  ]: [音乐集合] 下指定数量作品数据获取完成...\r\n")
-                    break
+                aweme_data = self._convert_aweme_data(aweme)
+                if aweme_data:
+                    page.append(aweme_data)
 
-            # 更新 cursor
-            cursor = datadict["cursor"]
+            record = None
+            if new_awemes:
+                record = functools.partial(self.db.insert_musics, music_id, new_awemes)
 
             # 退出条件
-            if datadict["has_more"] == 0 or datadict["has_more"] == False:
-                print("\r\n[  提示  ]:[音乐集合] 下所有作品数据获取完成...\r\n")
-                break
-            else:
-                print("\r\n[  提示  ]:[音乐集合] 第 " + str(times) + " 次请求成功...\r\n")
-
-        return awemeList
+            last = stop or datadict["has_more"] == 0 or datadict["has_more"] == False
+            state = (cursor, yielded, pages)
+            yielded += len(page)
+            pages += 1
+            if not last:
+                # 更新 cursor
+                cursor = datadict["cursor"]
+            yield state, None if last else (cursor, yielded, pages), page, record
+
+            if last:
+                if not stop:
+                    print("\r\n[  提示  ]:[音乐集合] 下所有作品数据获取完成...\r\n")
+                return yielded, pages
+            print("\r\n[  提示  ]:[音乐集合] 第 " + str(times) + " 次请求成功...\r\n")
+
+    # 异步迭代器版本: 生成器在独立线程中翻页, 事件循环中逐个取出作品
+    # 取出的作品不逐个确认, 取完后断点才推进
+    def aiterUserInfo(self, *args, **kwargs):
+        return iterate_in_thread(lambda: self.iterUserInfo(*args, **kwargs).drain())
+
+    def aiterMixInfo(self, *args, **kwargs):
+        return iterate_in_thread(lambda: self.iterMixInfo(*args, **kwargs).drain())
+
+    def aiterMusicInfo(self, *args, **kwargs):
+        return iterate_in_thread(lambda: self.iterMusicInfo(*args, **kwargs).drain())
 
     def getUserDetailInfo(self, sec_uid):
         if sec_uid is None:
             return None
 
-        datadict = {}
-        start = time.time()  # 开始时间
-        while True:
-            # 接口不稳定, 有时服务器不返回数据, 需要重新获取
-            try:
-                url = self.urls.USER_DETAIL + utils.getXbogus(
-                        f'sec_user_id={sec_uid}&device_platform=webapp&aid=6383')
-
-                res = requests.get(url=url, headers=douyin_headers)
-                datadict = json.loads(res.text)
-
-                if datadict is not None and datadict["status_code"] == 0:
-                    return datadict
-            except Exception as e:
-                end = time.time()  # 结束时间
-                if end - start > self.timeout:
-                    print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
-                    return datadict
+        datadict = requestApi(self.urls.USER_DETAIL, f'sec_user_id={sec_uid}&device_platform=webapp&aid=6383',
+                              self.timeout)
+        if datadict is None:
+            print("[  提示  ]:重复请求该接口" + str(self.timeout) + "s, 仍然未获取到数据")
+            return {}
+        return datadict
 
 
 if __name__ == "__main__":
@@ -5,10 +5,13 @@
 import os
 import json
 import time
-import requests
+import threading
+from urllib.parse import urlsplit
 from tqdm import tqdm
+from collections import deque
+from contextlib import nullcontext
 from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
-from typing import List, Optional
+from typing import Iterable, List, Optional, Union
 from pathlib import Path
 # import asyncio  # 暂时注释掉
 # import aiohttp  # 暂时注释掉
@@ -20,15 +23,139 @@ from rich.text import Text
 from rich import print as rprint
 
 from apiproxy.douyin import douyin_headers
-from apiproxy.common import utils
+from apiproxy.douyin.records import to_plain
+from apiproxy.common import utils, session, bandwidth_shaper, ProgressBus, RichProgressSink, ThroughputMeter
+from apiproxy.douyin.segmented import SegmentedDownloader
+from apiproxy.douyin.blobstore import BlobStore
+from apiproxy.douyin.manifest import Manifest
+from apiproxy.douyin.partial import PartialDownload
+from apiproxy.douyin.stream import StreamCopier, abort_response, reader
+from apiproxy.douyin.mirror import mirror_selector
 
 logger = logging.getLogger("douyin_downloader")
 console = Console()
 
+class ByteBudget(object):
+    """全局在途字节预算
+
+    所有并发下载共享同一个预算, 建立连接前为每个数据流预留额度,
+    收到响应头后按实际长度调整, 传输结束后归还。
+    每个数据流最多预留 window 字节(一次读取缓冲的数据量), 且不超过总预算的四分之一,
+    因此大文件只占用一个缓冲窗口, 不会独占预算而让其他小文件排队。
+    预算不足时连接不会建立, 因此同时打开的连接与其中缓冲的数据都受预算限制。
+    """
+
+    def __init__(self, limit: int, window: Optional[int] = None):
+        self.limit = max(1, int(limit))
+        self.window = max(1, min(int(window or self.limit), self.limit // 4))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def size(self, size: int, streams: int = 1) -> int:
+        """streams 个数据流传输 size 字节需要预留的额度"""
+        return min(max(1, int(size)), self.window * max(1, streams), self.limit)
+
+    def acquire(self, size: int, streams: int = 1) -> int:
+        """预留 size 字节, 返回实际预留的字节数(用于归还)"""
+        size = self.size(size, streams)
+        with self._cond:
+            while self.in_flight and self.in_flight + size > self.limit:
+                self._cond.wait()
+            self.in_flight += size
+        return size
+
+    def try_acquire(self, size: int, streams: int = 1) -> int:
+        """不等待的 acquire, 额度不足时返回 0; 供事件循环中轮询使用"""
+        size = self.size(size, streams)
+        with self._cond:
+            if self.in_flight and self.in_flight + size > self.limit:
+                return 0
+            self.in_flight += size
+        return size
+
+    def adjust(self, reserved: int, size: int) -> int:
+        """把已预留的 reserved 字节调整为 size 字节, 返回新的预留量; 增加时可能等待"""
+        size = self.size(size)
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - reserved)
+            while self.in_flight and self.in_flight + size > self.limit:
+                self._cond.wait()
+            self.in_flight += size
+            self._cond.notify_all()
+        return size
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - size)
+            self._cond.notify_all()
+
+
+def _mirrors(addr) -> List[str]:
+    """资源的全部镜像地址"""
+    return [url for url in ((addr or {}).get("url_list") or []) if url]
+
+
+def _blob_key(kind: str, addr, variant: str = "") -> Optional[str]:
+    """媒体去重的 key: 文件类型 + 资源 uri; 同一视频的不同清晰度版本 uri 可能相同, 附加版本名区分"""
+    uri = addr.get("uri") if addr else None
+    if not uri:
+        return None
+    return f"{kind}:{uri}:{variant}" if variant else f"{kind}:{uri}"
+
+
 class Download(object):
-    def __init__(self, thread=5, music=True, cover=True, avatar=True, resjson=True, folderstyle=True):
+    def __init__(self, thread=5, music=True, cover=True, avatar=True, resjson=True, folderstyle=True,
+                 inflight_mb=256, segments=4, segment_min_mb=16, progress=None, blob_dir=None,
+                 manifest_dir=None, min_speed_kb=20, stall_window=15):
         # 自动检测ffmpeg路径
         self.ffmpeg_path = self._detect_ffmpeg()
+        self.thread = thread
+        self.music = music
+        self.cover = cover
+        self.avatar = avatar
+        self.resjson = resjson
+        self.folderstyle = folderstyle
+        self.console = Console()
+        # 多个 Download 并行工作时共用外部传入的进度条, 由创建者负责启动与关闭
+        self._shared_progress = progress is not None
+        self.progress = progress or Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            TimeRemainingColumn(),
+            transient=True  # 添加这个参数，进度条完成后自动消失
+        )
+        # 下载线程只向总线提交进度, 由总线按固定频率合并后刷新进度条
+        self.bus = ProgressBus()
+        self.bus.subscribe(RichProgressSink(self.progress))
+        self.meter = ThroughputMeter()
+        self.bus.subscribe(self.meter)
+        # 累计下载结果, 供调用方统计
+        self.stats = {"success": 0, "failed": 0}
+        self.retry_times = 3
+        # 大块流式写入, 进度更新节流; 速度持续低于下限的连接会被中断, 换新连接或其他镜像续传
+        self.stream = StreamCopier(min_speed=min_speed_kb * 1024, stall_window=stall_window)
+        # 在作品给出的多个 CDN 地址中选择最快的节点
+        self.mirrors = mirror_selector
+        # 所有数据流共享的带宽整形与流量预算; job 为当前抓取任务, 用于按任务限速与计算预算
+        self.shaper = bandwidth_shaper
+        self.job = None
+        self._budget_warned = set()
+        self.timeout = 30
+        # 所有并发下载共享的在途字节预算, 每个数据流按一个读取缓冲区预留
+        self.byte_budget = ByteBudget(inflight_mb * 1024 * 1024, window=self.stream.max_chunk)
+        # 作品内的各个文件(视频/图集/音乐/封面/头像)在独立线程池中并行下载
+        self._asset_pool = None
+        # 大视频按字节区间多连接并发下载
+        self.segmenter = SegmentedDownloader(connections=segments, min_size=segment_min_mb * 1024 * 1024,
+                                             timeout=self.timeout, stream=self.stream)
+        # 按 uri 去重的媒体仓库, 同一文件在不同目录中只下载一次
+        self.blobs = BlobStore.open(blob_dir) if blob_dir else None
+        # 已完成文件清单, 启用后判断文件是否已下载只查内存
+        self.manifest = Manifest.open(manifest_dir) if manifest_dir else None
+        # 本进程已创建过的目录
+        self._dirs = set()
 
     def _detect_ffmpeg(self):
         """自动检测ffmpeg安装路径"""
@@ -65,90 +192,140 @@ class Download(object):
                     return path
         
         return None
-        self.thread = thread
-        self.music = music
-        self.cover = cover
-        self.avatar = avatar
-        self.resjson = resjson
-        self.folderstyle = folderstyle
-        self.console = Console()
-        self.progress = Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TimeRemainingColumn(),
-            transient=True  # 添加这个参数，进度条完成后自动消失
-        )
-        self.retry_times = 3
-        self.chunk_size = 8192
-        self.timeout = 30
 
-    def _download_media(self, url: str, path: Path, desc: str) -> bool:
-        """通用下载方法，处理所有类型的媒体下载"""
-        if path.exists():
+    def _download_media(self, url: Union[str, List[str]], path: Path, desc: str, key: Optional[str] = None) -> bool:
+        """通用下载方法，处理所有类型的媒体下载
+
+        url 为同一文件的镜像地址列表; key 为资源 uri, 启用去重时已下载过的同一资源直接从仓库链接
+        """
+        if self._is_complete(path, key):
             self.console.print(f"[cyan]⏭️  跳过已存在: {desc}[/]")
             return True
-            
-        # 使用新的断点续传下载方法替换原有的下载逻辑
-        return self.download_with_resume(url, path, desc)
+        self._ensure_dir(path.parent)
+
+        if not key or self.blobs is None:
+            # 使用新的断点续传下载方法替换原有的下载逻辑
+            ok = self.download_with_resume(url, path, desc)
+        else:
+            # 同一资源同时只下载一次, 其余线程等待后直接链接
+            while (waiting := self.blobs.claim(key)) is not None:
+                waiting.wait()
+            try:
+                if self.blobs.link(key, path):
+                    self.console.print(f"[cyan]🔗 复用已下载文件: {desc}[/]")
+                    ok = True
+                else:
+                    ok = self.download_with_resume(url, path, desc)
+                    if ok:
+                        self.blobs.add(key, path)
+            finally:
+                self.blobs.release(key)
+        if ok and self.manifest is not None:
+            self.manifest.record(path, key)
+        return ok
+
+    def _over_budget(self, job: Optional[str] = None) -> bool:
+        """流量预算用完后不再开始新的下载, 提示只显示一次; job 默认为当前任务"""
+        job = job or self.job
+        if not self.shaper.exhausted(job):
+            return False
+        if job not in self._budget_warned:
+            self._budget_warned.add(job)
+            suffix = f": {job}" if job else ""
+            self.console.print(f"[yellow]⚠️  流量预算已用完, 不再开始新的下载{suffix}[/]")
+        return True
+
+    def _is_complete(self, path: Path, key: Optional[str] = None) -> bool:
+        """文件是否已下载完成; 有清单时只查清单, 清单外已存在的文件补登记到清单"""
+        if self.manifest is not None and self.manifest.has(path):
+            return True
+        if path.exists():
+            if self.manifest is not None:
+                self.manifest.record(path, key)
+            return True
+        return False
+
+    def _ensure_dir(self, path: Path) -> None:
+        """创建目录, 同一目录只创建一次"""
+        if path not in self._dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(path)
+
+    def _collect_assets(self, aweme: dict, path: Path, name: str, desc: str) -> List[tuple]:
+        """列出作品需要下载的所有文件
+
+        Returns:
+            [(镜像地址列表, 保存路径, 描述, 是否必需, 去重key)], 必需文件失败时整个作品视为失败;
+            去重key 由文件类型与资源 uri 组成, 没有 uri 时为 None
+        """
+        assets = []
+
+        # 视频或图集
+        if aweme["awemeType"] == 0:  # 视频
+            video = aweme.get("video", {})
+            play_addr = video.get("play_addr", {})
+            if urls := _mirrors(play_addr):
+                gear = (video.get("quality") or {}).get("gear_name") or ""
+                assets.append((urls, path / f"{name}_video.mp4", f"[视频]{desc}", True,
+                               _blob_key("video", play_addr, gear)))
+
+        elif aweme["awemeType"] == 1:  # 图集
+            for i, image in enumerate(aweme.get("images", [])):
+                if urls := _mirrors(image):
+                    assets.append((urls, path / f"{name}_image_{i}.jpeg", f"[图集{i+1}]{desc}", True,
+                                   _blob_key("image", image)))
+
+        # 音乐
+        if self.music and (urls := _mirrors(aweme.get("music", {}).get("play_url"))):
+            music_name = utils.replaceStr(aweme["music"]["title"])
+            assets.append((urls, path / f"{name}_music_{music_name}.mp3", f"[音乐]{desc}", False,
+                           _blob_key("music", aweme["music"]["play_url"])))
+
+        # 封面
+        if self.cover and aweme["awemeType"] == 0:
+            if urls := _mirrors(aweme.get("video", {}).get("cover")):
+                assets.append((urls, path / f"{name}_cover.jpeg", f"[封面]{desc}", False,
+                               _blob_key("cover", aweme["video"]["cover"])))
+
+        # 头像
+        if self.avatar:
+            if urls := _mirrors(aweme.get("author", {}).get("avatar")):
+                assets.append((urls, path / f"{name}_avatar.jpeg", f"[头像]{desc}", False,
+                               _blob_key("avatar", aweme["author"]["avatar"])))
+
+        return assets
 
     def _download_media_files(self, aweme: dict, path: Path, name: str, desc: str) -> None:
-        """下载所有媒体文件"""
-        try:
-            # 下载视频或图集
-            if aweme["awemeType"] == 0:  # 视频
-                video_path = path / f"{name}_video.mp4"
-                if url := aweme.get("video", {}).get("play_addr", {}).get("url_list", [None])[0]:
-                    if not self._download_media(url, video_path, f"[视频]{desc}"):
-                        raise Exception("视频下载失败")
-                    
-            elif aweme["awemeType"] == 1:  # 图集
-                for i, image in enumerate(aweme.get("images", [])):
-                    if url := image.get("url_list", [None])[0]:
-                        image_path = path / f"{name}_image_{i}.jpeg"
-                        if not self._download_media(url, image_path, f"[图集{i+1}]{desc}"):
-                            raise Exception(f"图片{i+1}下载失败")
-
-            # 下载音乐
-            if self.music and (url := aweme.get("music", {}).get("play_url", {}).get("url_list", [None])[0]):
-                music_name = utils.replaceStr(aweme["music"]["title"])
-                music_path = path / f"{name}_music_{music_name}.mp3"
-                if not self._download_media(url, music_path, f"[音乐]{desc}"):
-                    self.console.print(f"[yellow]⚠️  音乐下载失败: {desc}[/]")
-
-            # 下载封面
-            if self.cover and aweme["awemeType"] == 0:
-                if url := aweme.get("video", {}).get("cover", {}).get("url_list", [None])[0]:
-                    cover_path = path / f"{name}_cover.jpeg"
-                    if not self._download_media(url, cover_path, f"[封面]{desc}"):
-                        self.console.print(f"[yellow]⚠️  封面下载失败: {desc}[/]")
-
-            # 下载头像
-            if self.avatar:
-                if url := aweme.get("author", {}).get("avatar", {}).get("url_list", [None])[0]:
-                    avatar_path = path / f"{name}_avatar.jpeg"
-                    if not self._download_media(url, avatar_path, f"[头像]{desc}"):
-                        self.console.print(f"[yellow]⚠️  头像下载失败: {desc}[/]")
-                    
-        except Exception as e:
-            raise Exception(f"下载失败: {str(e)}")
+        """下载所有媒体文件, 同一作品内的文件并行下载"""
+        assets = self._collect_assets(aweme, path, name, desc)
+        if self._asset_pool is not None:
+            futures = [self._asset_pool.submit(self._download_media, urls, asset_path, asset_desc, key)
+                       for urls, asset_path, asset_desc, _, key in assets]
+            results = [future.result() for future in futures]
+        else:
+            results = [self._download_media(urls, asset_path, asset_desc, key)
+                       for urls, asset_path, asset_desc, _, key in assets]
 
-    def awemeDownload(self, awemeDict: dict, savePath: Path) -> None:
+        for (urls, asset_path, asset_desc, required, _), ok in zip(assets, results):
+            if ok:
+                continue
+            if required:
+                raise Exception(f"下载失败: {asset_desc}")
+            self.console.print(f"[yellow]⚠️  下载失败: {asset_desc}[/]")
+
+    def awemeDownload(self, awemeDict: dict, savePath: Path) -> bool:
         """下载单个作品的所有内容"""
         if not awemeDict:
             logger.warning("无效的作品数据")
-            return
+            return False
             
         try:
-            # 创建保存目录
+            # 保存目录在真正写入文件时才创建
             save_path = Path(savePath)
-            save_path.mkdir(parents=True, exist_ok=True)
             
             # 构建文件名
             file_name = f"{awemeDict['create_time']}_{utils.replaceStr(awemeDict['desc'])}"
             aweme_path = save_path / file_name if self.folderstyle else save_path
-            aweme_path.mkdir(exist_ok=True)
             
             # 保存JSON数据
             if self.resjson:
@@ -157,35 +334,51 @@ class Download(object):
             # 下载媒体文件
             desc = file_name[:30]
             self._download_media_files(awemeDict, aweme_path, file_name, desc)
+            return True
                 
         except Exception as e:
             logger.error(f"处理作品时出错: {str(e)}")
+            return False
 
     def _save_json(self, path: Path, data: dict) -> None:
-        """保存JSON数据"""
+        """保存JSON数据, 清单中已有时不再重写"""
+        if self.manifest is not None and self.manifest.has(path):
+            return
         try:
+            self._ensure_dir(path.parent)
             with open(path, "w", encoding='utf-8') as f:
-                json.dump(data, ensure_ascii=False, indent=2, fp=f)
+                # 作品记录按需还原为字典再写入
+                json.dump(to_plain(data), ensure_ascii=False, indent=2, fp=f)
+            if self.manifest is not None:
+                self.manifest.record(path)
         except Exception as e:
             logger.error(f"保存JSON失败: {path}, 错误: {str(e)}")
 
-    def userDownload(self, awemeList: List[dict], savePath: Path):
-        if not awemeList:
+    def userDownload(self, awemeList: Iterable[dict], savePath: Path):
+        """批量下载作品
+
+        awemeList 可以是列表, 也可以是 Douyin.iterUserInfo 等迭代器。迭代器会边取边下载:
+        第一页获取完成即开始下载, 内存中最多保留 thread * 2 个待下载的作品;
+        每个作品下载完成(或失败)后调用迭代器的 ack, 翻页断点据此推进。
+        """
+        total_count = len(awemeList) if hasattr(awemeList, "__len__") else None
+        if total_count == 0:
             self.console.print("[yellow]⚠️  没有找到可下载的内容[/]")
             return
 
         save_path = Path(savePath)
-        save_path.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(save_path)
 
         start_time = time.time()
-        total_count = len(awemeList)
+        start_bytes = self.meter.bytes
+        done_count = 0
         success_count = 0
         
         # 显示下载信息面板
         self.console.print(Panel(
             Text.assemble(
                 ("下载配置\n", "bold cyan"),
-                (f"总数: {total_count} 个作品\n", "cyan"),
+                (f"总数: {total_count} 个作品\n" if total_count is not None else "总数: 边获取边下载\n", "cyan"),
                 (f"线程: {self.thread}\n", "cyan"),
                 (f"保存路径: {save_path}\n", "cyan"),
             ),
@@ -193,19 +386,29 @@ class Download(object):
             border_style="cyan"
         ))
 
-        with self.progress:
-            download_task = self.progress.add_task(
-                "[cyan]📥 批量下载进度", 
-                total=total_count
-            )
-            
-            for aweme in awemeList:
-                try:
-                    self.awemeDownload(awemeDict=aweme, savePath=save_path)
+        with nullcontext() if self._shared_progress else self.progress:
+            download_task = self.bus.add_task("[cyan]📥 批量下载进度", total=total_count, unit="个")
+
+            ack = getattr(awemeList, "ack", None)
+            for aweme, ok in self._schedule(awemeList, save_path):
+                if ack is not None:
+                    ack(aweme)
+                done_count += 1
+                if ok:
                     success_count += 1
-                    self.progress.update(download_task, advance=1)
-                except Exception as e:
-                    self.console.print(f"[red]❌ 下载失败: {str(e)}[/]")
+                    self.stats["success"] += 1
+                else:
+                    self.stats["failed"] += 1
+                    self.console.print(f"[red]❌ 下载失败: {aweme.get('aweme_id', '')}[/]")
+                self.bus.advance(download_task, 1)
+            self.bus.remove_task(download_task)
+            self.bus.flush()
+        if self.manifest is not None:
+            self.manifest.flush()
+
+        if done_count == 0:
+            self.console.print("[yellow]⚠️  没有找到可下载的内容[/]")
+            return
 
         # 显示下载完成统计
         end_time = time.time()
@@ -216,57 +419,182 @@ class Download(object):
         self.console.print(Panel(
             Text.assemble(
                 ("下载完成\n", "bold green"),
-                (f"成功: {success_count}/{total_count}\n", "green"),
+                (f"成功: {success_count}/{done_count}\n", "green"),
                 (f"用时: {minutes}分{seconds}秒\n", "green"),
+                (f"流量: {(self.meter.bytes - start_bytes) / 1024 / 1024:.1f}MB, "
+                 f"平均 {(self.meter.bytes - start_bytes) / 1024 / 1024 / max(duration, 0.001):.1f}MB/s\n", "green"),
                 (f"保存位置: {save_path}\n", "green"),
             ),
             title="下载统计",
             border_style="green"
         ))
 
-    def download_with_resume(self, url: str, filepath: Path, desc: str) -> bool:
-        """支持断点续传的下载方法"""
+    def _schedule(self, awemes, save_path: Path):
+        """有界并发调度作品下载
+
+        最多同时提交 thread * 2 个作品, 按提交顺序产出 (aweme, 是否成功),
+        因此结果汇报的顺序与输入顺序一致。
+        """
+        window = max(1, self.thread) * 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max(1, self.thread), thread_name_prefix="aweme") as aweme_pool, \
+                ThreadPoolExecutor(max_workers=max(1, self.thread) * 2, thread_name_prefix="asset") as asset_pool:
+            self._asset_pool = asset_pool
+            try:
+                for aweme in awemes:
+                    pending.append((aweme, aweme_pool.submit(self.awemeDownload, aweme, save_path)))
+                    if len(pending) >= window:
+                        aweme, future = pending.popleft()
+                        yield aweme, future.result()
+                while pending:
+                    aweme, future = pending.popleft()
+                    yield aweme, future.result()
+            finally:
+                self._asset_pool = None
+
+    def download_with_resume(self, url: Union[str, List[str]], filepath: Path, desc: str,
+                             job: Optional[str] = None) -> bool:
+        """支持断点续传的下载方法
+
+        url 可以是同一文件的多个镜像地址, 由镜像选择器排序; 某个节点失败时换下一个节点从断点继续。
+        job 为按任务限速与计算预算的任务名, 默认为 self.job; 多个任务共用一个下载器时由调用方传入
+        """
+        job = job or self.job
+        if self._over_budget(job):
+            return False
         # 多平台路径处理
-filepath = Path(str(filepath).replace('\\', '/'))  # 统一路径分隔符
-file_size = filepath.stat().st_size if filepath.exists() else 0
-        headers = {'Range': f'bytes={file_size}-'} if file_size > 0 else {}
-        
-        for attempt in range(self.retry_times):
+        filepath = Path(str(filepath).replace('\\', '/'))  # 统一路径分隔符
+        urls = self.mirrors.order([url] if isinstance(url, str) else url, douyin_headers)
+
+        # 视频文件可以分段下载: 未完成的分段下载按进度表续传; 新下载不单独探测,
+        # 首个请求带 Range: bytes=0-, 响应表明文件足够大且支持分段时再改为分段下载
+        segmentable = self.segmenter.connections > 1 and filepath.suffix == '.mp4'
+        if segmentable:
+            total = self.segmenter.pending_total(filepath)
+            if total:
+                return self._download_segmented(urls, filepath, desc, total, job=job)
+
+        # 先写入 .part, 校验长度后再重命名为目标文件
+        partial = PartialDownload(filepath)
+        attempts = max(self.retry_times, len(urls))
+        segment_total = None
+
+        for attempt in range(attempts):
+            url = urls[attempt % len(urls)]
+            reserved = 0
             try:
-                response = requests.get(url, headers={**douyin_headers, **headers}, 
-                                     stream=True, timeout=self.timeout)
-                
-                # 处理HTTP 429 Too Many Requests
-if response.status_code == 429:
-    retry_after = int(response.headers.get('Retry-After', 5))
-    logger.warning(f'HTTP 429 Too Many Requests, 将在 {retry_after} 秒后重试')
-    time.sleep(retry_after)
-    continue
-
-if response.status_code not in (200, 206):
-                    raise Exception(f"HTTP {response.status_code}")
-                    
-                total_size = int(response.headers.get('content-length', 0)) + file_size
-                mode = 'ab' if file_size > 0 else 'wb'
-                
-                with self.progress:
-                    task = self.progress.add_task(f"[cyan]⬇️  {desc}", total=total_size)
-                    self.progress.update(task, completed=file_size)  # 更新断点续传的进度
-                    
-                    with open(filepath, mode) as f:
-                        for chunk in response.iter_content(chunk_size=self.chunk_size):
-                            if chunk:
-                                size = f.write(chunk)
-                                self.progress.update(task, advance=size)
-                                
-                return True
-                
+                file_size = partial.resume()
+                # 在途字节预算: 建立连接前按预计的剩余长度预留, 最多一个读取缓冲区
+                expected = partial.total - file_size if partial.total else 0
+                reserved = self.byte_budget.acquire(expected or self.stream.max_chunk)
+                start = time.monotonic()
+                with session.get(url, headers={**douyin_headers, **partial.headers(url, ranged=segmentable)},
+                                 stream=True, timeout=self.timeout) as response:
+                    # 处理HTTP 429 Too Many Requests
+                    if response.status_code == 429:
+                        retry_after = int(response.headers.get('Retry-After', 5))
+                        logger.warning(f'HTTP 429 Too Many Requests, 将在 {retry_after} 秒后重试')
+                        self.byte_budget.release(reserved)
+                        reserved = 0
+                        time.sleep(retry_after)
+                        continue
+
+                    # 已经没有剩余数据: 长度对得上即完成, 否则从头下载
+                    if response.status_code == 416 and file_size:
+                        if partial.total == file_size and partial.finish():
+                            return True
+                        partial.discard()
+                        raise Exception("HTTP 416")
+
+                    if segmentable and not file_size:
+                        segment_total = self.segmenter.range_total(response.status_code, response.headers)
+                        if self.segmenter.should_segment(segment_total):
+                            # 关闭这个连接, 改为分段下载
+                            break
+                        segment_total = None
+
+                    mode = partial.start(response.status_code, response.headers, url)
+                    content_length = int(response.headers.get('content-length', 0))
+                    latency = time.monotonic() - start
+                    resumed_from = partial.done
+
+                    # 按响应的实际长度调整预留(小文件归还多预留的部分)
+                    if content_length:
+                        reserved = self.byte_budget.adjust(reserved, content_length)
+                    # 进度条由 userDownload 统一启动, 这里只添加/移除任务, 避免多线程重复进入上下文
+                    # 断点续传时从已完成的字节数开始
+                    task = self.bus.add_task(f"[cyan]⬇️  {desc}", total=partial.total, completed=partial.done)
+                    try:
+                        with open(partial.part, mode) as f:
+                            self.stream.copy(reader(response), lambda view: partial.advance(f.write(view)),
+                                             on_progress=lambda n: self.bus.advance(task, n),
+                                             abort=lambda: abort_response(response),
+                                             throttle=self.shaper.tap(urlsplit(url).netloc, job))
+                    finally:
+                        self.bus.remove_task(task)
+
+                    if not partial.finish():
+                        raise Exception(f"文件不完整: {partial.done}/{partial.total}")
+                    self.mirrors.record(url, partial.done - resumed_from, time.monotonic() - start, latency)
+                    return True
+
             except Exception as e:
-                logger.warning(f"下载失败 (尝试 {attempt + 1}/{self.retry_times}): {str(e)}")
-                if attempt == self.retry_times - 1:
+                if partial.done:
+                    partial.save(force=True)
+                self.mirrors.fail(url)
+                logger.warning(f"下载失败 (尝试 {attempt + 1}/{attempts}): {str(e)}")
+                if attempt == attempts - 1:
                     self.console.print(f"[red]❌ 下载失败: {desc}\n   {str(e)}[/]")
                     return False
-                time.sleep(1)  # 重试前等待
+                # 还有其他镜像时立即切换, 所有镜像都试过后再等待
+                if (attempt + 1) % len(urls) == 0:
+                    self.byte_budget.release(reserved)
+                    reserved = 0
+                    time.sleep(1)
+            finally:
+                self.byte_budget.release(reserved)
+        if segment_total:
+            return self._download_segmented(urls, filepath, desc, segment_total, job=job)
+        return False
+
+    def _download_segmented(self, urls: List[str], filepath: Path, desc: str, total: int,
+                            reserved: Optional[int] = None, job: Optional[str] = None) -> bool:
+        """多连接分段下载, 失败重试时换下一个镜像按分段进度表续传
+
+        服务器上的文件长度已变化时进度表会被丢弃, 此时重新按单连接流程下载。
+        reserved 为调用方已经预留的在途字节数, 由这里负责归还。
+        """
+        job = job or self.job
+        restart = False
+        if reserved is None:
+            reserved = self.byte_budget.acquire(total, streams=self.segmenter.connections)
+        task = self.bus.add_task(f"[cyan]⬇️  {desc}", total=total)
+        attempts = max(self.retry_times, len(urls))
+        try:
+            for attempt in range(attempts):
+                url = urls[attempt % len(urls)]
+                self.bus.update(task, completed=0)
+                start = time.monotonic()
+                if self.segmenter.download(url, filepath, total, douyin_headers,
+                                           on_progress=lambda n: self.bus.advance(task, n),
+                                           throttle=self.shaper.tap(urlsplit(url).netloc, job)):
+                    self.mirrors.record(url, total, time.monotonic() - start)
+                    return True
+                if not self.segmenter.is_pending(filepath):
+                    restart = True
+                    break
+                self.mirrors.fail(url)
+                logger.warning(f"分段下载未完成 (尝试 {attempt + 1}/{attempts}): {desc}")
+                if (attempt + 1) % len(urls) == 0:
+                    time.sleep(1)
+        finally:
+            self.bus.remove_task(task)
+            self.byte_budget.release(reserved)
+        if restart:
+            logger.warning(f"文件长度已变化, 重新下载: {desc}")
+            return self.download_with_resume(urls, filepath, desc, job)
+        self.console.print(f"[red]❌ 下载失败: {desc}[/]")
+        return False
 
 
 class DownloadManager:
@@ -279,7 +607,7 @@ class DownloadManager:
         file_size = os.path.getsize(filepath) if os.path.exists(filepath) else 0
         headers = {'Range': f'bytes={file_size}-'}
         
-        with requests.get(url, headers=headers, stream=True) as response:
+        with session.get(url, headers=headers, stream=True) as response:
             response.raise_for_status()
             total_size = int(response.headers.get('content-length', 0)) + file_size
             
@@ -22,6 +22,7 @@ QUEUE_SIZE = Gauge('download_queue_size', '当前下载队列长度')
 REQUEST_TIME = Summary('request_processing_seconds', '请求处理时间')
 
 from apiproxy.douyin import douyin_headers
+from apiproxy.douyin.records import to_plain
 from apiproxy.common import utils
 
 logger = logging.getLogger("douyin_downloader")
@@ -124,7 +125,8 @@ class DownloadManager:
     def _save_json(self, path: Path, data: dict) -> None:
         try:
             with open(path, "w", encoding='utf-8') as f:
-                json.dump(data, ensure_ascii=False, indent=2, fp=f)
+                # 作品记录按需还原为字典再写入
+                json.dump(to_plain(data), ensure_ascii=False, indent=2, fp=f)
         except Exception as e:
             logger.error(f"保存JSON失败: {path}, 错误: {str(e)}")
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import itertools
+import threading
+from collections import deque
+
+
+_PAGING = object()
+
+
+class CrawlFeed(object):
+    """翻页生成器的包装: 逐个产出作品, 断点只推进到最早还有作品未处理完的那一页
+
+    pages 逐页产出 (断点, 下一页断点, 作品列表, 记录函数)。断点是重新获取这一页所需的
+    (游标, 之前已产出的作品数, 之前已获取的页数), 最后一页的下一页断点为 None;
+    记录函数把这一页的新作品写入数据库, 可以为 None。正常结束时返回 (已产出作品数, 已获取页数),
+    出错中断时返回 None。save(游标, 已产出作品数, 已获取页数, done=False) 记录断点。
+
+    下载器每处理完一个作品(无论成败)调用 ack。一页连同之前的页都处理完时, 断点才推进到之后的页,
+    这一页的新作品也在这时才写入数据库: 中断后从最早未处理完的页重新开始,
+    这些页的作品还没有记录, 不会被增量更新当作已下载跳过; 已下载的文件在下载时跳过。
+    所有页处理完且翻页正常结束后记录为已完成, 下次从头开始。
+    """
+
+    def __init__(self, pages, save):
+        self._pages = pages
+        self._save = save
+        self._saved = None
+        self._items = iter(())
+        # 未处理完的页 [断点, 下一页断点, 未处理作品数, 记录函数], 按页序排列
+        self._open = deque()
+        # id(作品) -> (作品, 所在页); 保留作品引用, 避免 id 被复用
+        self._entries = {}
+        self._result = _PAGING
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            for item in self._items:
+                return item
+            if self._result is not _PAGING:
+                raise StopIteration
+            try:
+                state, after, items, record = next(self._pages)
+            except StopIteration as e:
+                with self._lock:
+                    self._result = e.value
+                    self._advance()
+                raise StopIteration from None
+            with self._lock:
+                page = [state, after, len(items), record]
+                self._open.append(page)
+                for item in items:
+                    self._entries[id(item)] = (item, page)
+                self._advance()
+            self._items = iter(items)
+
+    def peek(self):
+        """取出下一个作品但不消耗它, 没有作品时返回 None"""
+        item = next(self, None)
+        if item is not None:
+            self._items = itertools.chain([item], self._items)
+        return item
+
+    def ack(self, item):
+        """一个作品已处理完"""
+        with self._lock:
+            entry = self._entries.pop(id(item), None)
+            if entry is None:
+                return
+            entry[1][2] -= 1
+            self._advance()
+
+    def ack_all(self):
+        """已产出的作品全部处理完"""
+        with self._lock:
+            self._entries.clear()
+            for page in self._open:
+                page[2] = 0
+            self._advance()
+
+    def drain(self):
+        """产出全部作品, 取完后一并确认; 一次取完整个列表、不逐个 ack 的使用者用"""
+        yield from self
+        self.ack_all()
+
+    def _advance(self):
+        finished = []
+        while self._open and self._open[0][2] <= 0:
+            finished.append(self._open.popleft())
+        done = False
+        if self._open:
+            state = self._open[0][0]
+        elif self._result is not _PAGING and self._result is not None:
+            state, done = self._result, True
+        else:
+            # 翻页未结束或出错中断: 从处理完的最后一页之后继续
+            state = finished[-1][1] if finished else None
+        # 先推进断点再写入记录: 两者之间中断时, 只会少记录几个已下载的作品
+        if done and self._saved != ("done",):
+            self._saved = ("done",)
+            self._save(0, *state, done=True)
+        elif not done and state is not None and state != self._saved:
+            self._saved = state
+            self._save(*state)
+        for page in finished:
+            if page[3] is not None:
+                page[3]()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import mmap
+import atexit
+import struct
+import hashlib
+import tempfile
+import threading
+import weakref
+import logging
+from bisect import bisect_left
+from pathlib import Path
+
+
+logger = logging.getLogger("douyin_downloader")
+
+# 文件头: 魔数, 版本, 写入时对应表的最大行id
+_HEADER = struct.Struct("<4sIq")
+_MAGIC = b"DYKI"
+_VERSION = 1
+
+
+class KnownIds(object):
+    """某个集合(用户作品/喜欢、合集、音乐)下已记录的作品id
+
+    持久化部分是 mmap 映射的有序 int64 数组, 用二分查找判断是否存在;
+    本次运行新增的id放在内存集合中, flush 时合并写回。
+    last_id 为索引已覆盖的最大行id: 该集合中行id不超过它的作品都已在索引中。
+    """
+
+    def __init__(self, path: Path, load=True):
+        self.path = path
+        self.last_id = 0
+        # 文件头中记录的行id
+        self.stamped = 0
+        self.added = set()
+        self._file = None
+        self._mm = None
+        self._ids = memoryview(b"").cast("q")
+        if load:
+            self._open()
+
+    def _open(self):
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size or (size - _HEADER.size) % 8:
+            self._release()
+            return
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, last_id = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC or version != _VERSION:
+            self._release()
+            return
+        self.last_id = self.stamped = last_id
+        self._ids = memoryview(self._mm)[_HEADER.size:].cast("q")
+
+    def _release(self):
+        self._ids.release()
+        self._ids = memoryview(b"").cast("q")
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.last_id = self.stamped = 0
+
+    def __contains__(self, aweme_id) -> bool:
+        aweme_id = int(aweme_id)
+        if aweme_id in self.added:
+            return True
+        i = bisect_left(self._ids, aweme_id)
+        return i < len(self._ids) and self._ids[i] == aweme_id
+
+    def __len__(self):
+        return len(self._ids) + len(self.added)
+
+    def add(self, aweme_ids) -> None:
+        for aweme_id in aweme_ids:
+            aweme_id = int(aweme_id)
+            if aweme_id not in self:
+                self.added.add(aweme_id)
+
+    def flush(self) -> None:
+        """合并新增id, 以 last_id 为文件头原子替换索引文件
+
+        临时文件名各不相同, 多个实例(多个工作线程各自的数据库连接)同时写回同一索引时互不干扰。
+        """
+        if not self.added and self.last_id == self.stamped:
+            return
+        ids = sorted(set(self._ids) | self.added)
+        last_id = self.last_id
+        fd, tmp = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, last_id))
+                f.write(struct.pack(f"<{len(ids)}q", *ids))
+            # Windows 下被映射的文件不能被替换, 先释放映射
+            self._release()
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            # 替换失败(如 Windows 下其他进程仍映射着该文件)时恢复映射, 已持久化的id不能丢失
+            if self._mm is None:
+                self._open()
+            raise
+        self.added = set()
+        # 重新映射刚写入的文件; 其他实例随后替换了它时以读到的文件头为准, 下次对齐时补齐
+        self._open()
+
+    def close(self):
+        self._release()
+
+
+# 进程退出时写回所有仍在使用的索引; 只注册一次, 不随数据库实例的数量累积
+_open_indexes = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all():
+    for index in list(_open_indexes):
+        index.flush()
+
+
+class KnownIndex(object):
+    """已记录作品id的持久化索引, 保存在数据库文件旁的 <数据库>.known 目录中
+
+    每个集合一个索引文件, 首次使用时加载; 文件头记录索引已覆盖的最大行id,
+    加载后只需查询比它新的行即可与数据库对齐, 增量判断不再逐条访问数据库。
+    写回前同样先对齐, 文件头只记录对齐时读到的最大行id, 其他进程或实例在此之间写入的行
+    要么已合并进索引, 要么行id更大、下次加载时补齐。
+    同一目录在进程内只有一个实例, 由 open 获取: 各个工作线程的数据库实例共享它,
+    不会有另一个实例映射着正要替换的索引文件。
+    """
+
+    FLUSH_THRESHOLD = 1000
+
+    _indexes = {}
+    _indexes_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, db, directory) -> "KnownIndex":
+        """获取目录对应的共享实例, db 登记为使用者; 关闭数据库时调用 detach"""
+        directory = Path(directory).resolve()
+        with cls._indexes_lock:
+            index = cls._indexes.get(directory)
+            if index is None:
+                index = cls._indexes[directory] = cls(db, directory)
+            with index._lock:
+                index._users.append(db)
+            return index
+
+    def __init__(self, db, directory):
+        # 用于对齐的数据库实例, 它关闭后换用其他使用者
+        self.db = db
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._scopes = {}
+        self._users = []
+        self._lock = threading.RLock()
+        _open_indexes.add(self)
+
+    def clear(self):
+        """数据库重建时丢弃所有旧索引"""
+        with self._lock:
+            for known in self._scopes.values():
+                known.close()
+            self._scopes = {}
+            for path in self.directory.glob("*.idx"):
+                path.unlink()
+
+    def _path(self, table: str, where: dict) -> Path:
+        key = "|".join([table, *(f"{k}={v}" for k, v in sorted(where.items()))])
+        return self.directory / f"{table}_{hashlib.md5(key.encode('utf-8')).hexdigest()[:16]}.idx"
+
+    def get(self, table: str, where: dict) -> KnownIds:
+        key = (table, tuple(sorted(where.items())))
+        with self._lock:
+            known = self._scopes.get(key)
+            if known is not None:
+                return known
+            known = KnownIds(self._path(table, where))
+            # 数据库被替换(最大行id变小)时重建
+            if known.last_id > self.db.max_row_id(table):
+                known.close()
+                known = KnownIds(known.path, load=False)
+            self._sync(known, table, where)
+            self._scopes[key] = known
+            return known
+
+    def _sync(self, known: KnownIds, table: str, where: dict) -> None:
+        """补齐索引覆盖范围之后数据库中该集合新增的行, 覆盖范围推进到当前的最大行id"""
+        mark = self.db.max_row_id(table)
+        if mark > known.last_id:
+            known.add(self.db.aweme_ids_since(table, where, known.last_id, mark))
+            known.last_id = mark
+
+    def filter(self, table: str, where: dict, aweme_ids) -> set:
+        """返回 aweme_ids 中已记录的作品id(字符串)"""
+        known = self.get(table, where)
+        with self._lock:
+            return {str(aweme_id) for aweme_id in aweme_ids if aweme_id in known}
+
+    def add(self, table: str, where: dict, aweme_ids) -> None:
+        known = self.get(table, where)
+        with self._lock:
+            known.add(aweme_ids)
+            # 新增较多时及时落盘, 其余在进程退出时写回; 写回失败时新增的id仍在内存中, 下次再写
+            if len(known.added) >= self.FLUSH_THRESHOLD:
+                try:
+                    self._sync(known, table, where)
+                    known.flush()
+                except Exception as e:
+                    logger.warning(f"写回已记录索引失败: {known.path} {str(e)}")
+
+    def flush(self):
+        with self._lock:
+            for (table, items), known in self._scopes.items():
+                try:
+                    self._sync(known, table, dict(items))
+                    known.flush()
+                except Exception as e:
+                    logger.warning(f"写回已记录索引失败: {known.path} {str(e)}")
+
+    def detach(self, db):
+        """数据库实例关闭; 最后一个使用者关闭时写回并释放索引"""
+        with self._indexes_lock:
+            with self._lock:
+                if db in self._users:
+                    self._users.remove(db)
+                if self._users:
+                    if self.db is db:
+                        self.db = self._users[0]
+                    return
+            # 先从共享表中移除, 之后 open 会创建新实例
+            if self._indexes.get(self.directory) is self:
+                del self._indexes[self.directory]
+        self.close()
+
+    def close(self):
+        """写回并释放所有索引, 之后进程退出时不再处理该实例"""
+        with self._lock:
+            self.flush()
+            for known in self._scopes.values():
+                known.close()
+            self._scopes = {}
+        _open_indexes.discard(self)
+        with self._indexes_lock:
+            if self._indexes.get(self.directory) is self:
+                del self._indexes[self.directory]
+
+
+if __name__ == "__main__":
+    pass
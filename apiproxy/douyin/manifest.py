@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("douyin_downloader")
+
+MANIFEST_NAME = ".manifest.jsonl"
+
+
+class Manifest(object):
+    """已完成下载的文件清单
+
+    保存在下载根目录的 .manifest.jsonl 中, 每行一条记录: 相对路径、大小、资源 uri、是否完成。
+    启动时整体读入内存, 之后判断文件是否已下载只查内存, 不再逐个 stat,
+    在网络存储(SMB/NFS)上重新同步已有的大量作品时可以省去几乎所有的文件系统访问。
+    新记录攒够一批(或超过 interval 秒)后一次性追加写入并 fsync; 写到一半中断时,
+    读取时会忽略不完整的最后一行, 对应的文件下次按原方式检查。
+    清单中的文件被手动删除后, 删除 .manifest.jsonl 即可重新检查全部文件。
+    """
+
+    _manifests = {}
+    _manifests_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root) -> "Manifest":
+        """同一目录只创建一个实例, 并行下载的各个 Download 共享"""
+        root = os.path.abspath(root)
+        with cls._manifests_lock:
+            manifest = cls._manifests.get(root)
+            if manifest is None:
+                manifest = cls._manifests[root] = cls(root)
+            return manifest
+
+    def __init__(self, root, batch=200, interval=5.0):
+        self.root = os.path.abspath(root)
+        self.path = Path(self.root) / MANIFEST_NAME
+        self.batch = batch
+        self.interval = interval
+        self.entries = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.flushed = time.monotonic()
+        self._torn = False
+        self._load()
+
+    def _rel(self, path) -> str:
+        """清单中使用相对下载根目录的路径, 根目录之外的文件使用绝对路径"""
+        path = os.path.abspath(path)
+        if path.startswith(self.root + os.sep):
+            path = path[len(self.root) + 1:]
+        return path.replace(os.sep, "/")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"读取下载清单失败: {self.path} {str(e)}")
+            return
+
+        lines = data.splitlines()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("done"):
+                self.entries[entry["path"]] = (entry.get("size"), entry.get("uri"))
+            else:
+                self.entries.pop(entry.get("path"), None)
+        self._torn = bool(data) and not data.endswith("\n")
+
+        # 重复与失效的记录过多时重写一次
+        if len(lines) > len(self.entries) * 2 + 1000:
+            self._compact()
+
+    def _compact(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for path, (size, uri) in self.entries.items():
+                    f.write(self._line(path, size, uri))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._torn = False
+        except OSError as e:
+            logger.warning(f"整理下载清单失败: {self.path} {str(e)}")
+
+    @staticmethod
+    def _line(path, size, uri, done=True) -> str:
+        return json.dumps({"path": path, "size": size, "uri": uri, "done": done},
+                          ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def has(self, path) -> bool:
+        """文件是否已经完整下载过"""
+        return self._rel(path) in self.entries
+
+    def record(self, path, uri=None, size=None) -> None:
+        """登记一个下载完成的文件"""
+        rel = self._rel(path)
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return
+        with self.lock:
+            self.entries[rel] = (size, uri)
+            self.pending.append(self._line(rel, size, uri))
+            if len(self.pending) >= self.batch or time.monotonic() - self.flushed >= self.interval:
+                self._flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.flushed = time.monotonic()
+        if not self.pending:
+            return
+        # 一批记录一次写入, 上次写到一半的行单独结束掉
+        data = ("\n" if self._torn else "") + "".join(self.pending)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending.clear()
+            self._torn = False
+        except OSError as e:
+            logger.warning(f"写入下载清单失败: {self.path} {str(e)}")
+
+    def __len__(self):
+        return len(self.entries)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, List, Optional
+
+from apiproxy.common import session
+
+logger = logging.getLogger("douyin_downloader")
+
+# 估算下载耗时时使用的典型文件大小
+_TYPICAL_SIZE = 1024 * 1024
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class HostStats(object):
+    """一个 CDN 节点的历史表现"""
+
+    __slots__ = ("rate", "latency", "failures")
+
+    def __init__(self):
+        self.rate = None       # 平滑后的吞吐(字节/秒)
+        self.latency = None    # 平滑后的首字节延迟(秒)
+        self.failures = 0      # 连续失败次数
+
+
+class MirrorSelector(object):
+    """在同一文件的多个 CDN 镜像地址之间选择
+
+    作品中的 url_list 通常包含多个 CDN 节点的地址。每个节点(按域名)记录平滑后的吞吐与首字节延迟,
+    按 "延迟 + 典型文件大小 / 吞吐" 估算耗时排序, 连续失败的节点排到最后。
+    候选中有从未访问过的节点时, 同时向所有候选发一个 1 字节的 Range 请求, 按到达顺序排序,
+    最快的节点立即返回, 其余的请求在后台完成并更新延迟。
+    下载过程中某个节点失败时, 调用方换下一个地址用 Range 从断点继续。
+    """
+
+    def __init__(self, alpha=0.3, race_timeout=5.0, workers=8):
+        self.alpha = alpha
+        self.race_timeout = race_timeout
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mirror")
+
+    def _stats(self, host: str) -> HostStats:
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = HostStats()
+        return stats
+
+    def _smooth(self, old: Optional[float], new: float) -> float:
+        return new if old is None else self.alpha * new + (1 - self.alpha) * old
+
+    def record(self, url: str, size: int = 0, seconds: float = 0.0, latency: Optional[float] = None) -> None:
+        """记录一次成功的传输"""
+        with self.lock:
+            stats = self._stats(_host(url))
+            stats.failures = 0
+            if latency is not None:
+                stats.latency = self._smooth(stats.latency, latency)
+            # 太小的传输主要受延迟影响, 不用来估计吞吐
+            if size >= 64 * 1024 and seconds > 0:
+                stats.rate = self._smooth(stats.rate, size / seconds)
+
+    def fail(self, url: str) -> None:
+        with self.lock:
+            self._stats(_host(url)).failures += 1
+
+    def _expected(self, host: str, fallback_rate: float, fallback_latency: float) -> tuple:
+        stats = self.hosts.get(host) or HostStats()
+        latency = stats.latency if stats.latency is not None else fallback_latency
+        # 估计值相同时优先有实测数据的节点
+        return stats.failures, latency + _TYPICAL_SIZE / (stats.rate or fallback_rate), stats.rate is None
+
+    def rank(self, urls: Iterable[str]) -> List[str]:
+        """按历史表现排序, 不发请求"""
+        urls = list(urls)
+        with self.lock:
+            # 没有数据的节点按已知节点的中位数估计
+            rates = sorted(s.rate for s in self.hosts.values() if s.rate)
+            latencies = sorted(s.latency for s in self.hosts.values() if s.latency is not None)
+            rate = rates[len(rates) // 2] if rates else _TYPICAL_SIZE
+            latency = latencies[len(latencies) // 2] if latencies else 0.0
+            keys = {url: self._expected(_host(url), rate, latency) for url in urls}
+        return sorted(urls, key=lambda url: keys[url])
+
+    def order(self, urls: Iterable[str], headers: Optional[dict] = None) -> List[str]:
+        """返回按预计速度排序的候选地址, 有未知节点时先竞速"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if len(urls) <= 1:
+            return urls
+        with self.lock:
+            unknown = any(_host(url) not in self.hosts for url in urls)
+            # 先登记, 竞速期间其他文件直接按已有信息排序, 不再重复竞速
+            for url in urls:
+                self._stats(_host(url))
+        if unknown:
+            winner = self.race(urls, headers)
+            if winner is not None:
+                return [winner] + [url for url in self.rank(urls) if url != winner]
+        return self.rank(urls)
+
+    def _probe(self, url: str, headers: Optional[dict]) -> Optional[str]:
+        start = time.monotonic()
+        try:
+            with session.get(url, headers={**(headers or {}), 'Range': 'bytes=0-0'}, stream=True,
+                             timeout=self.race_timeout) as response:
+                if response.status_code not in (200, 206):
+                    raise Exception(f"HTTP {response.status_code}")
+        except Exception as e:
+            logger.debug(f"镜像探测失败: {_host(url)} {str(e)}")
+            self.fail(url)
+            return None
+        self.record(url, latency=time.monotonic() - start)
+        return url
+
+    def race(self, urls: List[str], headers: Optional[dict] = None) -> Optional[str]:
+        """同时探测所有候选, 返回最先响应的地址; 全部失败时返回 None"""
+        pending = {self._pool.submit(self._probe, url, headers) for url in urls}
+        deadline = time.monotonic() + self.race_timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.result() is not None:
+                    return future.result()
+        return None
+
+
+# 所有下载器共享, 节点的历史表现在整个进程内累积
+mirror_selector = MirrorSelector()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+logger = logging.getLogger("douyin_downloader")
+
+
+class CrawlJob(object):
+    """一个抓取任务, 例如某个用户的发布作品或喜欢作品
+
+    owner 是任务所属的账号(或合集、音乐id), 同一 owner 的任务共享公平调度的配额。
+    run(context) 在工作线程中执行, 返回值记录在 result 中。
+    """
+
+    def __init__(self, owner: str, name: str, run: Callable):
+        self.owner = owner
+        self.name = name
+        self.run = run
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+
+
+class CrawlOrchestrator(object):
+    """把多个抓取任务分发到固定数量的工作线程
+
+    调度按 owner 轮转: 每次从下一个有待执行任务的 owner 取一个任务,
+    同一 owner 同时运行的任务数不超过 per_owner, 大账号不会占满所有线程。
+    接口域名的并发由 apiproxy.common.host_gate 按请求限制, 任务下载文件时不占用接口名额。
+    每个工作线程启动时调用一次 context_factory 创建自己的上下文(Douyin/Download 实例),
+    任务在该上下文中依次执行。
+    """
+
+    def __init__(self, workers=4, per_owner=1):
+        self.workers = max(1, workers)
+        self.per_owner = max(1, per_owner)
+        self.jobs = []
+        self._queues = OrderedDict()
+        self._running_owner = {}
+        self._cond = threading.Condition()
+
+    def add(self, job: CrawlJob) -> CrawlJob:
+        with self._cond:
+            self.jobs.append(job)
+            self._queues.setdefault(job.owner, deque()).append(job)
+            self._cond.notify()
+        return job
+
+    def _eligible(self, job: CrawlJob) -> bool:
+        return self._running_owner.get(job.owner, 0) < self.per_owner
+
+    def _next(self) -> Optional[CrawlJob]:
+        """按 owner 轮转取下一个可以运行的任务; 全部完成时返回 None"""
+        with self._cond:
+            while True:
+                if not self._queues:
+                    return None
+                for owner in list(self._queues):
+                    queue = self._queues[owner]
+                    if not self._eligible(queue[0]):
+                        continue
+                    job = queue.popleft()
+                    # 取过任务的 owner 排到队尾
+                    del self._queues[owner]
+                    if queue:
+                        self._queues[owner] = queue
+                    self._running_owner[job.owner] = self._running_owner.get(job.owner, 0) + 1
+                    return job
+                self._cond.wait()
+
+    def _finish(self, job: CrawlJob) -> None:
+        with self._cond:
+            self._running_owner[job.owner] -= 1
+            self._cond.notify_all()
+
+    def _worker(self, context_factory):
+        context = context_factory() if context_factory else None
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            job.status = "running"
+            start = time.time()
+            try:
+                job.result = job.run(context)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                logger.error(f"任务失败: {job.owner} {job.name} {str(e)}")
+            finally:
+                job.elapsed = time.time() - start
+                self._finish(job)
+
+    def run(self, context_factory: Optional[Callable] = None) -> list:
+        """执行所有任务, 返回任务列表(含状态、结果与耗时)"""
+        threads = [threading.Thread(target=self._worker, args=(context_factory,), name=f"crawl-{i}", daemon=True)
+                   for i in range(min(self.workers, len(self.jobs)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.jobs
+
+    def summary(self, console: Optional[Console] = None) -> None:
+        """打印每个任务的执行结果"""
+        table = Table(title="任务汇总")
+        table.add_column("对象", overflow="fold")
+        table.add_column("任务")
+        table.add_column("状态")
+        table.add_column("结果")
+        table.add_column("耗时", justify="right")
+        styles = {"done": "green", "failed": "red"}
+        for job in self.jobs:
+            result = job.error if job.status == "failed" else ("" if job.result is None else str(job.result))
+            table.add_row(job.owner, job.name, f"[{styles.get(job.status, 'yellow')}]{job.status}[/]",
+                          result, f"{job.elapsed:.1f}s")
+        (console or Console()).print(table)
+
+
+if __name__ == "__main__":
+    pass
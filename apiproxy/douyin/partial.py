@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import re
+import json
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+class PartialDownload(object):
+    """一个未完成的下载
+
+    数据先写入 <文件名>.part, 进度记录在 <文件名>.part.json(文件总长度、ETag/Last-Modified、已写入字节数),
+    全部写完且长度与服务器声明的一致后才原子重命名为目标文件, 因此目标文件存在即代表完整。
+    续传时带上 If-Range, 服务器上的文件已经变化时会返回完整内容(200), 此时从头下载。
+    进度每秒最多写一次, 一秒内完成的小文件不会产生进度文件。
+    """
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self.part = self.part_path(self.filepath)
+        self.journal = self.filepath.with_name(self.filepath.name + ".part.json")
+        self.total = None
+        self.etag = None
+        self.last_modified = None
+        # 校验信息来自哪个节点, 不同 CDN 节点的 ETag 不一定相同
+        self.source = None
+        self.done = 0
+        self._saved_at = 0.0
+        self._journaled = False
+
+    @staticmethod
+    def part_path(filepath: Path) -> Path:
+        return filepath.with_name(filepath.name + ".part")
+
+    def resume(self) -> int:
+        """读取进度, 返回可以续传的字节数; 没有可用的进度时清理残留并从头开始"""
+        try:
+            with open(self.journal, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            # 没有进度记录, 残留的 .part 会在从头写入时被覆盖
+            return 0
+        except (OSError, ValueError):
+            self.discard()
+            return 0
+        try:
+            size = self.part.stat().st_size
+        except OSError:
+            self.discard()
+            return 0
+        self._journaled = True
+        self.total = data.get("total")
+        self.etag = data.get("etag")
+        self.last_modified = data.get("last_modified")
+        self.source = data.get("source")
+        # 进度记录之后还没落盘的数据不可信, 以两者中较小的为准
+        self.done = min(size, data.get("done", 0))
+        if size > self.done:
+            os.truncate(self.part, self.done)
+        return self.done
+
+    def headers(self, url: Optional[str] = None, ranged=False) -> dict:
+        """续传请求需要附加的请求头
+
+        换到其他镜像节点续传时不带 If-Range, 只靠 Content-Range 中的文件总长度校验。
+        ranged 为 True 时新下载也带 Range: bytes=0-, 由响应是否为 206 判断服务器能否分段下载。
+        """
+        if not self.done:
+            return {'Range': 'bytes=0-'} if ranged else {}
+        headers = {'Range': f'bytes={self.done}-'}
+        validator = self.etag or self.last_modified
+        if validator and (url is None or urlsplit(url).netloc == self.source):
+            headers['If-Range'] = validator
+        return headers
+
+    def start(self, status: int, headers, url: Optional[str] = None) -> str:
+        """根据响应确定写入方式: 'ab' 续传, 'wb' 从头写; 同时记录文件长度与校验信息"""
+        source = urlsplit(url).netloc if url else None
+        if status == 206 and self.done:
+            match = re.match(r'bytes\s+(\d+)-\d+/(\d+|\*)', headers.get('Content-Range', ''))
+            total = int(match.group(2)) if match and match.group(2) != '*' else None
+            if match and int(match.group(1)) == self.done and (self.total is None or total in (None, self.total)):
+                self.total = self.total or total
+                if source != self.source:
+                    # 之后按新节点的校验信息续传
+                    self.source = source
+                    self.etag = headers.get('ETag')
+                    self.last_modified = headers.get('Last-Modified')
+                self._saved_at = time.time()
+                return 'ab'
+            self.discard()
+            raise Exception(f"续传位置或文件长度与服务器不一致: {headers.get('Content-Range')}")
+        match = None
+        if status == 206:
+            # 新下载以 Range: bytes=0- 请求(用来判断能否分段下载), 从 0 开始的 206 等同于 200
+            match = re.match(r'bytes\s+0-\d+/(\d+|\*)', headers.get('Content-Range', ''))
+            if not match:
+                raise Exception(f"起始位置与请求不一致: {headers.get('Content-Range')}")
+        elif status != 200:
+            raise Exception(f"HTTP {status}")
+
+        # 服务器忽略了 Range, 或者 If-Range 校验失败(文件已变化), 从头下载
+        self.done = 0
+        self.source = source
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+        # 压缩传输时 Content-Length 是压缩后的长度, 无法用来校验
+        encoding = headers.get('Content-Encoding', 'identity')
+        length = headers.get('Content-Length')
+        self.total = int(length) if length and encoding == 'identity' else None
+        if match and match.group(1) != '*':
+            # 服务器只返回了文件的前一部分时, 以 Content-Range 中的总长度校验
+            self.total = int(match.group(1))
+        self._saved_at = time.time()
+        return 'wb'
+
+    def advance(self, size: int) -> None:
+        self.done += size
+        self.save()
+
+    def save(self, force=False) -> None:
+        """原子写入进度, 非强制写入时每秒最多一次"""
+        now = time.time()
+        if not force and now - self._saved_at < 1:
+            return
+        self._saved_at = now
+        data = {"total": self.total, "etag": self.etag, "last_modified": self.last_modified,
+                "source": self.source, "done": self.done}
+        tmp = self.journal.with_name(self.journal.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.journal)
+        self._journaled = True
+
+    def finish(self) -> bool:
+        """长度校验通过后把 .part 重命名为目标文件; 不完整时保留进度以便续传"""
+        size = self.part.stat().st_size
+        if self.total is not None and size > self.total:
+            self.discard()
+            return False
+        if size != self.done or (self.total is not None and size != self.total):
+            self.done = min(size, self.done)
+            self.save(force=True)
+            return False
+        os.replace(self.part, self.filepath)
+        self._remove_journal()
+        return True
+
+    def discard(self) -> None:
+        """删除 .part 与进度, 下次从头下载"""
+        for path in (self.part, self.journal):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self.done = 0
+        self.total = None
+        self._journaled = False
+
+    def _remove_journal(self):
+        if self._journaled:
+            try:
+                self.journal.unlink()
+            except FileNotFoundError:
+                pass
+            self._journaled = False
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import threading
+from typing import List, Optional
+
+MODES = ("highest", "lowest")
+
+
+def _int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def resolution(variant: dict) -> int:
+    """清晰度按短边计算, 竖屏 720x1280 与横屏 1280x720 都是 720p"""
+    addr = variant.get("play_addr") or {}
+    sides = [side for side in (_int(addr.get("width")), _int(addr.get("height"))) if side]
+    return min(sides) if sides else 0
+
+
+def size_of(variant: dict, duration_ms: Optional[int] = None) -> int:
+    """文件大小(字节): 优先使用接口给出的 data_size, 没有时按码率与时长估算"""
+    size = _int((variant.get("play_addr") or {}).get("data_size"))
+    if not size and duration_ms:
+        size = _int(variant.get("bit_rate")) * _int(duration_ms) // 8000
+    return size
+
+
+class QualityPolicy(object):
+    """从作品的 bit_rate 阶梯中选择要下载的视频版本
+
+    mode 为 highest(默认) 时取满足所有上限的最高版本, lowest 时取最低版本。
+    上限均为 0 表示不限制:
+        max_resolution  短边像素, 如 720 表示最高 720p
+        max_bitrate     码率(kbps)
+        max_size        单个视频的字节数, 接口没有 data_size 时按码率 × 时长估算
+    没有任何版本满足上限时退而取最低的版本, 保证每个作品都能下载。
+    """
+
+    def __init__(self, mode="highest", max_resolution=0, max_bitrate=0, max_size=0):
+        self.lock = threading.Lock()
+        self.mode = "highest"
+        self.max_resolution = 0
+        self.max_bitrate = 0
+        self.max_size = 0
+        self.configure(mode, max_resolution, max_bitrate, max_size)
+
+    def configure(self, mode=None, max_resolution=None, max_bitrate=None, max_size=None) -> None:
+        with self.lock:
+            if mode is not None:
+                if mode not in MODES:
+                    raise ValueError(f"未知的清晰度策略: {mode}, 可选 {', '.join(MODES)}")
+                self.mode = mode
+            if max_resolution is not None:
+                self.max_resolution = max(0, max_resolution)
+            if max_bitrate is not None:
+                self.max_bitrate = max(0, max_bitrate)
+            if max_size is not None:
+                self.max_size = max(0, max_size)
+
+    def _fits(self, variant: dict, duration_ms: Optional[int]) -> bool:
+        if self.max_resolution and resolution(variant) > self.max_resolution:
+            return False
+        if self.max_bitrate and _int(variant.get("bit_rate")) > self.max_bitrate * 1000:
+            return False
+        if self.max_size and size_of(variant, duration_ms) > self.max_size:
+            return False
+        return True
+
+    def select(self, ladder: List[dict], duration_ms: Optional[int] = None) -> Optional[dict]:
+        """返回选中的 bit_rate 项; 没有可用版本时返回 None"""
+        variants = [v for v in (ladder or []) if (v.get("play_addr") or {}).get("url_list")]
+        if not variants:
+            return None
+        # 按 (清晰度, 码率) 从低到高排序
+        variants.sort(key=lambda v: (resolution(v), _int(v.get("bit_rate"))))
+        fitting = [v for v in variants if self._fits(v, duration_ms)]
+        if not fitting:
+            return variants[0]
+        return fitting[-1] if self.mode == "highest" else fitting[0]
+
+    def describe(self, variant: dict, duration_ms: Optional[int] = None) -> dict:
+        """记录到作品 JSON 中的版本信息"""
+        addr = variant.get("play_addr") or {}
+        return {
+            "gear_name": variant.get("gear_name", ""),
+            "quality_type": variant.get("quality_type", ""),
+            "bit_rate": _int(variant.get("bit_rate")),
+            "width": _int(addr.get("width")),
+            "height": _int(addr.get("height")),
+            "data_size": size_of(variant, duration_ms),
+            "is_h265": bool(variant.get("is_h265")),
+            "fps": _int(variant.get("FPS")),
+        }
+
+
+# 所有作品转换共享的清晰度策略, 由命令行在启动时配置
+quality_policy = QualityPolicy()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from functools import lru_cache
+
+
+class Record(tuple):
+    """按字段名访问的只读元组记录
+
+    转换后的作品数据以 Record 保存: 每个字段只占一个元组槽位, 字段名保存在类上,
+    空列表用共享的空元组表示, 空的子结构共享同一个实例。
+    读取方式与字典一致(record["desc"]、record.get("video", {})),
+    需要写 JSON 时调用 to_dict() 还原为与原来相同结构的字典。
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if type(key) is str:
+            try:
+                return tuple.__getitem__(self, self._index[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(tuple.__iter__(self))
+
+    def items(self):
+        return zip(self._fields, tuple.__iter__(self))
+
+    def to_dict(self) -> dict:
+        return {key: to_plain(value) for key, value in zip(self._fields, tuple.__iter__(self))}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+    def __reduce__(self):
+        return make_record, (type(self).__name__, self._fields, self.values())
+
+
+@lru_cache(maxsize=None)
+def record_type(name: str, fields: tuple) -> type:
+    """按字段列表生成(并缓存)一个 Record 子类"""
+    return type(name, (Record,), {
+        "__slots__": (),
+        "_fields": fields,
+        "_index": {key: i for i, key in enumerate(fields)},
+    })
+
+
+def make_record(name: str, fields: tuple, values) -> Record:
+    return record_type(name, tuple(fields))(values)
+
+
+def freeze(value):
+    """把接口返回的值转为只读紧凑形式: 列表转元组, 空列表共享同一个空元组"""
+    if type(value) is list:
+        return tuple(freeze(v) for v in value) if value else ()
+    if type(value) is dict:
+        return {k: freeze(v) for k, v in value.items()}
+    return value
+
+
+def to_plain(value):
+    """freeze 的逆过程, 得到可以直接 json.dump 的数据; 也用于对外接口返回普通的字典与列表"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if type(value) is tuple or type(value) is list:
+        return [to_plain(v) for v in value]
+    if type(value) is dict:
+        return {k: to_plain(v) for k, v in value.items()}
+    return value
+
+
+if __name__ == "__main__":
+    pass
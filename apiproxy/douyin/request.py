@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import json
+import time
+import logging
+from urllib.parse import urlsplit, parse_qsl
+
+from apiproxy.douyin import douyin_headers
+from apiproxy.common import utils, session, rate_limiter, backoff, response_cache, host_gate
+from apiproxy.common.ratelimit import parse_retry_after
+
+logger = logging.getLogger("douyin_downloader")
+
+# 各接口响应的缓存有效期(秒); 返回数据中的视频/图片地址带有过期签名, 作品类接口不宜缓存太久。
+# 直播接口不缓存; 作品列表的第一页另见 LISTING_ENDPOINTS
+CACHE_TTLS = {
+    "/aweme/v1/web/aweme/detail/": 30 * 60,
+    "/aweme/v1/web/aweme/post/": 30 * 60,
+    "/aweme/v1/web/aweme/favorite/": 30 * 60,
+    "/aweme/v1/web/mix/aweme/": 30 * 60,
+    "/aweme/v1/web/music/aweme/": 30 * 60,
+    "/aweme/v1/web/user/profile/other/": 6 * 60 * 60,
+    "/aweme/v1/web/mix/list/": 6 * 60 * 60,
+}
+response_cache.configure(ttls=CACHE_TTLS)
+
+# 作品列表接口: 第一页(游标为 0)随新发布/新喜欢的作品变化, 不缓存, 否则增量更新会漏掉新作品;
+# 之后的页由游标确定, 内容基本不变, 按 CACHE_TTLS 缓存
+LISTING_ENDPOINTS = frozenset([
+    "/aweme/v1/web/aweme/post/",
+    "/aweme/v1/web/aweme/favorite/",
+    "/aweme/v1/web/mix/aweme/",
+    "/aweme/v1/web/music/aweme/",
+])
+
+
+def _cacheable(endpoint: str, query: str) -> bool:
+    if endpoint not in LISTING_ENDPOINTS:
+        return True
+    params = dict(parse_qsl(query))
+    return params.get("max_cursor", params.get("cursor", "0")) not in ("", "0")
+
+
+def _status_ok(datadict):
+    return datadict.get("status_code") == 0
+
+
+def requestApi(base_url: str, query: str, timeout=10, accept=None, sign=True, cache=True):
+    """签名并请求抖音接口, 返回解析后的 JSON; 超过 timeout 秒仍未成功时返回 None
+
+    所有接口方法共用: 先查响应缓存(以未签名的参数为键), 命中则不发请求, 列表的第一页不缓存;
+    请求前从该接口的令牌桶取令牌, 并占用接口域名的一个并发名额, 请求结果反馈给自适应限速器;
+    失败(网络错误、429/5xx、空响应、status_code 非 0)后按带抖动的指数退避重试。
+
+    Args:
+        base_url: 接口地址(包含 ? 的前半部分)
+        query: 未签名的查询参数
+        accept: 判断返回数据是否可用的函数, 默认要求 status_code == 0
+        cache: 是否读写响应缓存
+    """
+    parts = urlsplit(base_url)
+    endpoint = parts.path
+    accept = accept or _status_ok
+    cache = cache and _cacheable(endpoint, query)
+    if cache:
+        datadict = response_cache.get(base_url, query)
+        if datadict and accept(datadict):
+            return datadict
+    deadline = time.time() + timeout
+    attempt = 0
+
+    while True:
+        if not rate_limiter.acquire(endpoint, timeout=max(0.0, deadline - time.time())):
+            return None
+
+        url = base_url + (utils.getXbogus(query) if sign else query)
+        started = time.time()
+        throttled, retry_after = True, None
+        try:
+            with host_gate.slot(parts.netloc, timeout=max(0.0, deadline - started)) as acquired:
+                if not acquired:
+                    return None
+                started = time.time()
+                res = session.get(url=url, headers=douyin_headers)
+            retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            # 429/5xx 与空响应是限流信号, 其余失败只重试不降速
+            throttled = res.status_code == 429 or res.status_code >= 500 or not res.text
+            datadict = json.loads(res.text)
+            if datadict and accept(datadict):
+                rate_limiter.feedback(endpoint, False, time.time() - started)
+                if cache:
+                    response_cache.put(base_url, query, datadict)
+                return datadict
+            logger.debug(f"接口返回异常: {endpoint} {str(datadict)[:200]}")
+        except Exception as e:
+            logger.debug(f"请求接口失败: {endpoint} {str(e)}")
+
+        if throttled:
+            rate_limiter.feedback(endpoint, True, time.time() - started, retry_after)
+        delay = backoff.delay(attempt, retry_after)
+        attempt += 1
+        if time.time() + delay > deadline:
+            return None
+        time.sleep(delay)
+
+
+if __name__ == "__main__":
+    pass
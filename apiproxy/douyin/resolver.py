@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlsplit, urljoin
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from apiproxy.douyin import douyin_headers
+from apiproxy.douyin.urls import Urls
+from apiproxy.douyin.request import requestApi
+from apiproxy.common import session
+
+logger = logging.getLogger("douyin_downloader")
+
+# 按顺序匹配链接路径, 抖音把图集更新为 note
+_PATTERNS = (
+    ("user", re.compile(r'/user/([^/?#]+)')),
+    ("aweme", re.compile(r'/video/(\d+)')),
+    ("aweme", re.compile(r'/note/(\d+)')),
+    ("mix", re.compile(r'/mix/detail/(\d+)')),
+    ("mix", re.compile(r'/collection/(\d+)')),
+    ("music", re.compile(r'/music/(\d+)')),
+    ("reflow", re.compile(r'/webcast/reflow/(\d+)')),
+)
+
+MAX_REDIRECTS = 10
+
+
+class LinkResolver(object):
+    """把分享链接解析为 (资源类型, 资源ID)
+
+    v.douyin.com 短链只需要跟随重定向拿到目标地址, 不需要下载落地页:
+    逐跳发送不跟随重定向的流式请求, 读到 Location 后立即关闭连接,
+    一旦地址能识别出资源类型就停止。解析结果按原始链接持久化到 sqlite,
+    同一个短链以后不再请求; resolveMany 并发解析多个链接。
+    enabled 为 False(命令行 --cache False)时不读写持久化结果, 只在本次运行内记住。
+    """
+
+    def __init__(self, path="api_cache.db", timeout=10, enabled=True):
+        self.path = path
+        self.timeout = timeout
+        self.enabled = enabled
+        self.urls = Urls()
+        self.conn = None
+        self.memo = {}
+        self.lock = threading.RLock()
+
+    def configure(self, enabled=None) -> None:
+        with self.lock:
+            if enabled is not None:
+                self.enabled = enabled
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL;")
+            self.conn.execute("""CREATE TABLE if not exists t_link (
+                                    url text primary key,
+                                    key_type varchar(20),
+                                    key varchar(200),
+                                    created real
+                                );""")
+        return self.conn
+
+    def _load(self, url):
+        with self.lock:
+            if url in self.memo:
+                return self.memo[url]
+            if not self.enabled:
+                return None
+            try:
+                row = self._connect().execute("select key_type, key from t_link where url=?;", (url,)).fetchone()
+            except Exception as e:
+                return None
+            if row is not None:
+                self.memo[url] = row
+            return row
+
+    def _save(self, url, result):
+        with self.lock:
+            self.memo[url] = result
+            if not self.enabled:
+                return
+            try:
+                with self._connect() as conn:
+                    conn.execute("insert or replace into t_link (url, key_type, key, created) values(?,?,?,?);",
+                                 (url, result[0], result[1], time.time()))
+            except Exception as e:
+                pass
+
+    @staticmethod
+    def parse(url: str) -> Optional[Tuple[str, str]]:
+        """不发请求, 直接从地址中识别资源类型与ID; 无法识别时返回 None"""
+        parts = urlsplit(url)
+        if parts.hostname == "live.douyin.com":
+            web_rid = parts.path.strip("/").split("/")[0]
+            return ("live", web_rid) if web_rid else None
+        for key_type, pattern in _PATTERNS:
+            match = pattern.search(parts.path)
+            if match:
+                return key_type, match.group(1)
+        return None
+
+    def follow(self, url: str) -> Optional[Tuple[str, str]]:
+        """逐跳跟随重定向, 直到地址可以识别"""
+        for _ in range(MAX_REDIRECTS):
+            result = self.parse(url)
+            if result is not None:
+                return result
+            with session.get(url, headers=douyin_headers, allow_redirects=False, stream=True,
+                             timeout=self.timeout) as response:
+                location = response.headers.get("Location")
+            if not response.is_redirect or not location:
+                return None
+            url = urljoin(url, location)
+        return None
+
+    def resolve(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        cached = self._load(url)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self.follow(url)
+        except Exception as e:
+            logger.warning(f"解析链接失败: {url} {str(e)}")
+            return None, None
+        if result is None:
+            return None, None
+
+        # 直播分享页需要再通过接口换成直播间 web_rid
+        if result[0] == "reflow":
+            resjson = requestApi(self.urls.LIVE2, f'live_id=1&room_id={result[1]}&app_id=1128', self.timeout,
+                                 accept=lambda d: 'data' in d)
+            if resjson is None:
+                return None, None
+            result = ("live", resjson['data']['room']['owner']['web_rid'])
+
+        self._save(url, result)
+        return result
+
+    def resolveMany(self, urls: List[str], workers=8) -> List[Tuple[Optional[str], Optional[str]]]:
+        """并发解析多个链接, 返回结果与输入顺序一致"""
+        pending = list(dict.fromkeys(url for url in urls if self._load(url) is None))
+        results = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))),
+                                    thread_name_prefix="resolve") as pool:
+                results = dict(zip(pending, pool.map(self.resolve, pending)))
+        return [results[url] if url in results else self._load(url) for url in urls]
+
+
+# 所有 Douyin 实例共享, 已解析的链接在进程内与进程间都不再重复请求
+link_resolver = LinkResolver()
+
+
+if __name__ == "__main__":
+    pass
@@ -5,6 +5,9 @@
 import time
 import copy
 
+from apiproxy.douyin.records import Record, record_type, freeze
+from apiproxy.douyin.quality import quality_policy
+
 
 class Result(object):
     def __init__(self):
@@ -112,6 +115,17 @@ class Result(object):
                 "uri": "",
                 "url_list": [],
             },
+            # 按清晰度策略从 bit_rate 中选中的版本
+            "quality": {
+                "gear_name": "",
+                "quality_type": "",
+                "bit_rate": "",
+                "width": "",
+                "height": "",
+                "data_size": "",
+                "is_h265": "",
+                "fps": ""
+            },
             "cover_original_scale": {
                 "height": "",
                 "uri": "",
@@ -265,13 +279,20 @@ class Result(object):
                     self.dataConvert(awemeType, dataNew[item], dataRaw[item][0])
                     continue
 
-                # 根据 uri 获取 1080p 视频
+                # 按清晰度策略从 bit_rate 中选择视频版本
                 if item == "play_addr":
-                    dataNew[item]["uri"] = dataRaw["bit_rate"][0]["play_addr"]["uri"]
+                    variant = quality_policy.select(dataRaw.get("bit_rate"), dataRaw.get("duration"))
+                    addr = variant["play_addr"] if variant else dataRaw["play_addr"]
+                    dataNew[item]["uri"] = addr["uri"]
                     # 使用 这个api 可以获得1080p
                     # dataNew[item]["url_list"] = "https://aweme.snssdk.com/aweme/v1/play/?video_id=%s&ratio=1080p&line=0" \
                     #                             % dataNew[item]["uri"]
-                    dataNew[item]["url_list"] = copy.deepcopy(dataRaw["bit_rate"][0]["play_addr"]["url_list"])
+                    dataNew[item]["url_list"] = copy.deepcopy(addr["url_list"])
+                    continue
+                if item == "quality":
+                    variant = quality_policy.select(dataRaw.get("bit_rate"), dataRaw.get("duration"))
+                    if variant:
+                        dataNew[item].update(quality_policy.describe(variant, dataRaw.get("duration")))
                     continue
 
                 # 常规 递归遍历 字典
@@ -296,5 +317,160 @@ class Result(object):
                 data[item] = ""
 
 
+def _record_name(key: str) -> str:
+    """mix_info -> MixInfoRecord"""
+    return "".join(part.capitalize() for part in key.split("_")) + "Record"
+
+
+def aweme_type(aweme: dict) -> int:
+    """作品类型: images 非空为图集(1), 否则为视频(0); 视频作品的 images 可能是 None 或空列表"""
+    return 1 if aweme.get("images") else 0
+
+
+class AwemeProjector(object):
+    """由 Result.awemeDict 模板编译出的作品数据转换器
+
+    转换规则与 Result.dataConvert 一致(时间格式化、图集/视频分支、头像放大、
+    cover_url 取第一项、play_addr 按清晰度策略选择), 区别在于:
+    模板只在创建时遍历一次, 每个作品单次遍历直接生成新的记录,
+    不修改共享状态, 因此不需要 clearDict/deepcopy, 可以在多个线程中同时使用。
+
+    输出为只读的 Record(见 records.py), 按字段名读取的方式与字典相同,
+    to_dict() 得到与原来 awemeDict 结构一致的字典。Record 只在抓取与下载内部使用,
+    DouyinApi 等对外接口返回前用 to_plain 还原为字典。
+    """
+
+    def __init__(self, template: dict = None):
+        if template is None:
+            result = Result()
+            template = result.awemeDict
+            result.clearDict(template)
+        self._convert = self._compile("aweme", template)
+
+    aweme_type = staticmethod(aweme_type)
+
+    def project(self, aweme: dict, awemeType: int = None) -> Record:
+        if awemeType is None:
+            awemeType = self.aweme_type(aweme)
+        return self._convert(aweme, awemeType)
+
+    def project_many(self, awemes: list, awemeType: int = None) -> list:
+        """批量转换一页作品"""
+        convert, aweme_type = self._convert, self.aweme_type
+        return [convert(aweme, aweme_type(aweme) if awemeType is None else awemeType) for aweme in awemes]
+
+    def _compile(self, name: str, template: dict):
+        """把模板字典编译成 convert(raw, awemeType) -> Record
+
+        普通字段直接 raw.get 取值, 只有需要特殊处理的字段走函数调用。
+        """
+        missing = object()
+        record = record_type(_record_name(name), tuple(template))
+        fields = [(self._compile_field(key, value, template), self._compile_default(key, value))
+                  for key, value in template.items()]
+
+        def convert(raw, awemeType):
+            values = []
+            is_dict = type(raw) is dict
+            for key, (field, default) in zip(record._fields, fields):
+                if field is None:
+                    value = raw.get(key, missing) if is_dict else missing
+                    values.append(default if value is missing else freeze(value))
+                    continue
+                try:
+                    values.append(field(raw, awemeType, values))
+                except Exception:
+                    # 接口中缺少该字段时保留模板的空值
+                    values.append(default)
+            return record(values)
+        return convert
+
+    def _compile_default(self, key, value):
+        """模板的空值; 记录只读, 所有作品共享同一个空值实例"""
+        if isinstance(value, dict):
+            return record_type(_record_name(key), tuple(value))(
+                self._compile_default(k, v) for k, v in value.items())
+        return freeze(value)
+
+    def _compile_field(self, key, value, parent: dict):
+        if key == "create_time":
+            return lambda raw, awemeType, values: time.strftime(
+                "%Y-%m-%d %H.%M.%S", time.localtime(raw["create_time"]))
+
+        if key == "awemeType":
+            return lambda raw, awemeType, values: awemeType
+
+        if key == "images":
+            pic_defaults = Result().picDict
+
+            def images(raw, awemeType, values):
+                if awemeType != 1:
+                    return ()
+                result = []
+                for image in raw["images"]:
+                    merged = {**pic_defaults, **image}
+                    result.append(record_type("ImageRecord", tuple(merged))(freeze(v) for v in merged.values()))
+                return tuple(result)
+            return images
+
+        if key == "avatar":
+            # 将小头像放大, 数据来自已经转换好的 avatar_thumb
+            thumb_index = list(parent).index("avatar_thumb")
+            record = record_type(_record_name(key), tuple(value))
+
+            def avatar(raw, awemeType, values):
+                thumb = values[thumb_index]
+                result = []
+                for k in value:
+                    if k == "url_list":
+                        result.append(tuple(url.replace("100x100", "1080x1080") for url in thumb["url_list"]))
+                    elif k == "uri":
+                        result.append(thumb["uri"].replace("100x100", "1080x1080"))
+                    else:
+                        result.append(thumb[k])
+                return record(result)
+            return avatar
+
+        if key == "play_addr":
+            # 按清晰度策略从 bit_rate 中选择视频版本, 没有 bit_rate 时使用默认地址
+            record = record_type(_record_name(key), tuple(value))
+
+            def play_addr(raw, awemeType, values):
+                variant = quality_policy.select(raw.get("bit_rate"), raw.get("duration"))
+                addr = variant["play_addr"] if variant else raw["play_addr"]
+                return record(freeze(addr[k]) for k in value)
+            return play_addr
+
+        if key == "quality":
+            # 记录选中的版本, 与 play_addr 使用同一策略
+            record = record_type(_record_name(key), tuple(value))
+            default = self._compile_default(key, value)
+
+            def quality(raw, awemeType, values):
+                variant = quality_policy.select(raw.get("bit_rate"), raw.get("duration"))
+                if variant is None:
+                    return default
+                info = quality_policy.describe(variant, raw.get("duration"))
+                return record(info[k] for k in value)
+            return quality
+
+        if isinstance(value, dict):
+            convert = self._compile(key, value)
+            if key == "video":
+                default = self._compile_default(key, value)
+                return lambda raw, awemeType, values: \
+                    convert(raw["video"], awemeType) if awemeType == 0 else default
+            if key == "cover_url":
+                # 原来的json是[{}] 而我们的是 {}
+                return lambda raw, awemeType, values: convert(raw["cover_url"][0], awemeType)
+            return lambda raw, awemeType, values: convert(raw[key], awemeType)
+
+        return None
+
+
+# 模块级共享的转换器, 本身无状态, 可在多线程中使用
+aweme_projector = AwemeProjector()
+
+
 if __name__ == '__main__':
     pass
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import re
+import json
+import time
+import threading
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from apiproxy.common import session
+from apiproxy.douyin.partial import PartialDownload
+from apiproxy.douyin.stream import StreamCopier, abort_response, reader
+
+logger = logging.getLogger("douyin_downloader")
+
+
+class SegmentMap(object):
+    """分段下载的进度表, 以 <文件名>.segments.json 的形式保存在目标文件旁边
+
+    每个分段记录为 [start, end, done], 表示字节区间 [start, end] 中已写入 done 字节。
+    """
+
+    def __init__(self, path: Path, total: int, segments: list):
+        self.path = path
+        self.total = total
+        self.segments = segments
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @staticmethod
+    def sidecar(filepath: Path) -> Path:
+        return filepath.with_name(filepath.name + ".segments.json")
+
+    @classmethod
+    def create(cls, filepath: Path, total: int, count: int) -> "SegmentMap":
+        size = -(-total // count)
+        segments = [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+        return cls(cls.sidecar(filepath), total, segments)
+
+    @classmethod
+    def load(cls, filepath: Path, total: Optional[int] = None) -> Optional["SegmentMap"]:
+        """读取已有的进度表, 文件长度变化时视为无效; total 为 None 时不校验长度"""
+        path = cls.sidecar(filepath)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data.get("total"), int) or total not in (None, data["total"]):
+            return None
+        return cls(path, data["total"], data["segments"])
+
+    def advance(self, index: int, size: int) -> None:
+        with self._lock:
+            self.segments[index][2] += size
+
+    def remaining(self, index: int) -> Tuple[int, int]:
+        start, end, done = self.segments[index]
+        return start + done, end
+
+    def done_bytes(self) -> int:
+        return sum(done for _, _, done in self.segments)
+
+    def save(self, force=False) -> None:
+        """原子写入进度表, 非强制写入时每秒最多一次"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._saved_at < 1:
+                return
+            self._saved_at = now
+            data = {"total": self.total, "segments": [list(s) for s in self.segments]}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SegmentedDownloader(object):
+    """多连接分段下载
+
+    文件总长度由调用方从首个请求的 Content-Range 得到(见 range_total), 把文件切成若干字节区间,
+    每个区间一个连接并发下载, 用位置写入(pwrite)写进预先分配好大小的 .part 文件,
+    全部完成后重命名为目标文件。中断后根据旁边的 .segments.json 按分段续传。
+    """
+
+    def __init__(self, connections=4, min_size=16 * 1024 * 1024, timeout=30, stream=None):
+        self.connections = connections
+        self.min_size = min_size
+        self.timeout = timeout
+        self.stream = stream or StreamCopier()
+
+    @staticmethod
+    def range_total(status: int, headers) -> Optional[int]:
+        """从 Range: bytes=0- 请求的响应中取得文件总长度; 服务器不支持分段(返回 200)时为 None"""
+        if status != 206:
+            return None
+        match = re.match(r'bytes\s+0-\d+/(\d+)', headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+
+    def should_segment(self, total: Optional[int]) -> bool:
+        return self.connections > 1 and total is not None and total >= self.min_size
+
+    @staticmethod
+    def is_pending(filepath: Path) -> bool:
+        """目标文件是否是一个尚未完成的分段下载"""
+        return SegmentMap.sidecar(filepath).exists()
+
+    @staticmethod
+    def pending_total(filepath: Path) -> Optional[int]:
+        """尚未完成的分段下载的文件总长度(来自进度表), 没有时返回 None"""
+        segmap = SegmentMap.load(filepath)
+        return segmap.total if segmap is not None else None
+
+    def download(self, url: str, filepath: Path, total: int, headers: dict,
+                 on_progress: Optional[Callable[[int], None]] = None, throttle=None) -> bool:
+        part = PartialDownload.part_path(filepath)
+        segmap = SegmentMap.load(filepath, total)
+        if segmap is None or not part.exists():
+            segmap = SegmentMap.create(filepath, total, self.connections)
+            # 预分配文件大小, 各分段直接写到自己的位置
+            with open(part, "wb") as f:
+                f.truncate(total)
+            segmap.save(force=True)
+        elif on_progress:
+            on_progress(segmap.done_bytes())
+
+        stale = threading.Event()
+        fd = os.open(part, os.O_RDWR | getattr(os, "O_BINARY", 0))
+        try:
+            with ThreadPoolExecutor(max_workers=len(segmap.segments), thread_name_prefix="segment") as pool:
+                futures = [pool.submit(self._fetch_segment, url, headers, fd, segmap, i, on_progress, throttle,
+                                       stale)
+                           for i in range(len(segmap.segments))]
+                results = [future.result() for future in futures]
+        finally:
+            os.close(fd)
+            segmap.save(force=True)
+
+        if stale.is_set():
+            # 服务器上的文件长度与进度表不一致(文件已变化), 丢弃已下载的分段
+            segmap.remove()
+            part.unlink()
+            return False
+
+        if all(results) and segmap.done_bytes() == total and part.stat().st_size == total:
+            os.replace(part, filepath)
+            segmap.remove()
+            return True
+        return False
+
+    def _fetch_segment(self, url, headers, fd, segmap: SegmentMap, index, on_progress, throttle=None,
+                       stale: Optional[threading.Event] = None) -> bool:
+        offset, end = segmap.remaining(index)
+        if offset > end:
+            return True
+        try:
+            with session.get(url, headers={**headers, 'Range': f'bytes={offset}-{end}'}, stream=True,
+                             timeout=self.timeout) as response:
+                if response.status_code != 206:
+                    raise Exception(f"HTTP {response.status_code}")
+                match = re.match(r'bytes\s+(\d+)-\d+/(\d+)', response.headers.get('Content-Range', ''))
+                if not match or int(match.group(1)) != offset or int(match.group(2)) != segmap.total:
+                    if match and int(match.group(2)) != segmap.total and stale is not None:
+                        stale.set()
+                    raise Exception(f"分段位置或文件长度不一致: {response.headers.get('Content-Range')}")
+
+                def write(view):
+                    nonlocal offset
+                    _pwrite(fd, view, offset)
+                    offset += len(view)
+                    segmap.advance(index, len(view))
+                    segmap.save()
+
+                self.stream.copy(reader(response), write, on_progress=on_progress, limit=end - offset + 1,
+                                 abort=lambda: abort_response(response), throttle=throttle)
+            return offset > end
+        except Exception as e:
+            logger.warning(f"分段 {index} 下载失败: {str(e)}")
+            return False
+
+
+_pwrite_lock = threading.Lock()
+
+
+def _pwrite(fd, data, offset):
+    """按位置写入; Windows 没有 os.pwrite, 退化为加锁的 seek + write"""
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+        return
+    with _pwrite_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        while data:
+            written = os.write(fd, data)
+            data = data[written:]
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import socket
+import asyncio
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger("douyin_downloader")
+
+MIN_CHUNK = 256 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+
+
+class _IterReader(object):
+    """把 iter_content 包装成 readinto 接口, 用于需要解压的响应"""
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.rest = b""
+
+    def readinto(self, view) -> int:
+        filled = 0
+        while filled < len(view):
+            if not self.rest:
+                self.rest = next(self.iterator, b"")
+                if not self.rest:
+                    break
+            n = min(len(view) - filled, len(self.rest))
+            view[filled:filled + n] = self.rest[:n]
+            self.rest = self.rest[n:]
+            filled += n
+        return filled
+
+
+def reader(response):
+    """requests 响应的 readinto 数据源
+
+    未压缩时直接从底层连接读取到缓冲区; 压缩传输时由 requests 解压后再拷贝。
+    """
+    if response.headers.get('Content-Encoding', 'identity') == 'identity':
+        return response.raw
+    return _IterReader(response.iter_content(chunk_size=MIN_CHUNK))
+
+
+class StallError(Exception):
+    """传输速度持续低于下限, 连接已被中断"""
+
+
+class SpeedFloor(object):
+    """单个传输流的速度下限
+
+    每 window 秒为一个统计窗口, 窗口内实际收到的字节数不足 min_speed * 窗口时长时判定为过慢。
+    尚未返回的读取不计入, 因此单次读取限制在 max_read 以内: 以下限速度一个窗口内能完成多次读取,
+    阻塞在读取中的慢速流不会被误当作达标。
+    """
+
+    def __init__(self, min_speed: float, window: float):
+        self.min_speed = min_speed
+        self.window = window
+        self.bytes = 0
+        self.tripped = False
+        self._mark = time.monotonic()
+        self._mark_bytes = 0
+
+    @property
+    def max_read(self) -> int:
+        """单次读取的上限: 以下限速度四分之一个窗口能传输的字节数"""
+        return max(4 * 1024, int(self.min_speed * self.window / 4))
+
+    def feed(self, size: int) -> None:
+        self.bytes += size
+
+    def hold(self, seconds: float) -> None:
+        """主动限速等待的时间不计入统计窗口"""
+        self._mark += seconds
+
+    def check(self, now: Optional[float] = None) -> bool:
+        """返回是否已经过慢; 窗口内速度达标时开始下一个窗口"""
+        if self.tripped:
+            return True
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._mark
+        if elapsed < self.window:
+            return False
+        if self.bytes - self._mark_bytes < self.min_speed * elapsed:
+            self.tripped = True
+            return True
+        self._mark = now
+        self._mark_bytes = self.bytes
+        return False
+
+    def error(self) -> StallError:
+        return StallError(f"传输速度低于 {self.min_speed / 1024:.0f}KB/s 超过 {self.window:g} 秒, 已中断")
+
+
+class StallWatchdog(object):
+    """检查所有受监控的传输流, 过慢时调用其中断函数
+
+    阻塞在一次读取中的流(每秒只到达几个字节)自己没有机会检查速度, 由这个后台线程中断连接,
+    读取随即返回。没有受监控的流时线程自动退出。
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, floor: SpeedFloor, abort: Callable[[], None]) -> None:
+        with self._lock:
+            self._watched[id(floor)] = (floor, abort)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+                self._thread.start()
+
+    def unwatch(self, floor: SpeedFloor) -> None:
+        with self._lock:
+            self._watched.pop(id(floor), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._watched:
+                    self._thread = None
+                    return
+                watched = list(self._watched.values())
+            now = time.monotonic()
+            for floor, abort in watched:
+                if not floor.tripped and floor.check(now):
+                    self.unwatch(floor)
+                    try:
+                        abort()
+                    except Exception as e:
+                        logger.debug(f"中断慢速连接失败: {str(e)}")
+
+
+_watchdog = StallWatchdog()
+
+
+def abort_response(response) -> None:
+    """中断 requests 响应的底层连接, 其他线程中阻塞的读取会立即返回"""
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    if sock is not None:
+        sock.shutdown(socket.SHUT_RDWR)
+    else:
+        response.close()
+
+
+class StreamCopier(object):
+    """大块流式写入
+
+    每个线程复用一块预分配的缓冲区, 用 readinto 读入后把 memoryview 交给写入函数,
+    不再为每 8KB 产生一次 Python 循环与一次进度更新。块大小在 [min_chunk, max_chunk] 之间自适应:
+    一次很快读满时翻倍, 读取耗时过长时减半, 慢速连接上进度仍然及时。
+    进度回调与写入解耦, 每 progress_interval 秒最多调用一次。
+    min_speed(字节/秒) 大于 0 时监控每个流的速度, 连续 stall_window 秒低于下限即中断并抛出 StallError,
+    由调用方换新连接或其他镜像从断点续传。
+    """
+
+    def __init__(self, min_chunk=MIN_CHUNK, max_chunk=MAX_CHUNK, progress_interval=0.1,
+                 min_speed=0, stall_window=15.0):
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.progress_interval = progress_interval
+        self.min_speed = min_speed
+        self.stall_window = stall_window
+        self._local = threading.local()
+
+    def _floor(self) -> Optional[SpeedFloor]:
+        return SpeedFloor(self.min_speed, self.stall_window) if self.min_speed > 0 else None
+
+    def _buffer(self, size: int) -> memoryview:
+        """当前线程的缓冲区, 按需扩大"""
+        buf = getattr(self._local, "buf", None)
+        if buf is None or len(buf) < size:
+            buf = self._local.buf = memoryview(bytearray(size))
+        return buf
+
+    def _adapt(self, chunk: int, filled: bool, elapsed: float) -> int:
+        if filled and elapsed < 0.05:
+            return min(self.max_chunk, chunk * 2)
+        if elapsed > 0.5:
+            return max(self.min_chunk, chunk // 2)
+        return chunk
+
+    def copy(self, source, write: Callable, on_progress: Optional[Callable[[int], None]] = None,
+             limit: Optional[int] = None, abort: Optional[Callable[[], None]] = None, throttle=None) -> int:
+        """从 source(支持 readinto) 读取并交给 write, 最多 limit 字节; 返回复制的字节数
+
+        write 收到的 memoryview 在下次读取时会被覆盖, 不能保存引用。
+        abort 用于中断阻塞中的读取(如 abort_response), 提供时才会由后台线程监控速度。
+        throttle 为带宽整形的接入点(BandwidthTap), 每次读取后按其返回的时间等待。
+        """
+        chunk = self.min_chunk
+        total = 0
+        pending = 0
+        reported = time.monotonic()
+        floor = self._floor()
+        if floor is not None and abort is not None:
+            _watchdog.watch(floor, abort)
+        try:
+            while limit is None or total < limit:
+                size = chunk if limit is None else min(chunk, limit - total)
+                if throttle is not None and throttle.max_read:
+                    size = min(size, throttle.max_read)
+                if floor is not None:
+                    # 限制单次读取的大小, 以下限速度读取时一个统计窗口内能返回多次
+                    size = min(size, floor.max_read)
+                view = self._buffer(chunk)[:size]
+                start = time.monotonic()
+                try:
+                    n = source.readinto(view)
+                except Exception:
+                    if floor is not None and floor.tripped:
+                        raise floor.error()
+                    raise
+                if not n:
+                    break
+                write(view[:n])
+                total += n
+                pending += n
+                now = time.monotonic()
+                chunk = self._adapt(chunk, n == size, now - start)
+                if floor is not None:
+                    floor.feed(n)
+                    if floor.check(now):
+                        break
+                if throttle is not None:
+                    wait = throttle.reserve(n)
+                    if wait:
+                        if floor is not None:
+                            floor.hold(wait)
+                        time.sleep(wait)
+                if on_progress and now - reported >= self.progress_interval:
+                    on_progress(pending)
+                    pending = 0
+                    reported = now
+        finally:
+            if floor is not None:
+                _watchdog.unwatch(floor)
+            if on_progress and pending:
+                on_progress(pending)
+        if floor is not None and floor.tripped:
+            raise floor.error()
+        return total
+
+    async def acopy(self, content, write: Callable, on_progress: Optional[Callable[[int], None]] = None,
+                    throttle=None) -> int:
+        """aiohttp 的 StreamReader 版本: 把到达的数据攒成大块再写入
+
+        write 为协程函数, 可以把磁盘写入放到线程中; 等它返回后才复用缓冲区。
+        协程之间会交替执行, 缓冲区按调用分配而不是按线程复用。
+        数据到达时即检查速度; 完全没有数据时由会话的 sock_read 超时中断。
+        """
+        floor = self._floor()
+        chunk = self.min_chunk
+        buf = memoryview(bytearray(chunk))
+        filled = 0
+        total = 0
+        pending = 0
+        started = reported = time.monotonic()
+        try:
+            async for data in content.iter_any():
+                n = len(data)
+                if filled and filled + n > chunk:
+                    await write(buf[:filled])
+                    now = time.monotonic()
+                    chunk = self._adapt(chunk, True, now - started)
+                    if len(buf) < chunk:
+                        buf = memoryview(bytearray(chunk))
+                    filled = 0
+                    started = now
+                if n >= chunk:
+                    await write(data)
+                else:
+                    buf[filled:filled + n] = data
+                    filled += n
+                total += n
+                pending += n
+                now = time.monotonic()
+                if floor is not None:
+                    floor.feed(n)
+                    if floor.check(now):
+                        if filled:
+                            await write(buf[:filled])
+                        raise floor.error()
+                if throttle is not None:
+                    wait = throttle.reserve(n)
+                    if wait:
+                        if floor is not None:
+                            floor.hold(wait)
+                        await asyncio.sleep(wait)
+                if on_progress and now - reported >= self.progress_interval:
+                    on_progress(pending)
+                    pending = 0
+                    reported = now
+            if filled:
+                await write(buf[:filled])
+        finally:
+            if on_progress and pending:
+                on_progress(pending)
+        return total
+
+
+if __name__ == "__main__":
+    pass
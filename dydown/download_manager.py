@@ -6,6 +6,8 @@ from typing import Optional, List, Callable
 import yt_dlp
 import ffmpeg
 
+from apiproxy.common.progress import ProgressBus
+
 class TaskStatus(Enum):
     PENDING = "pending"
     DOWNLOADING = "downloading"
@@ -33,6 +35,10 @@ class DownloadManager:
         self.lock = threading.Lock()
         self.workers: List[threading.Thread] = []
         self.on_progress_callback: Optional[Callable] = None
+        # yt-dlp 每收到一块数据就回调一次, 先提交到进度总线, 按 10Hz 合并后再通知界面
+        self.progress_bus = ProgressBus()
+        self.progress_bus.subscribe(self._on_progress)
+        self._bus_tasks = {}
         
     def add_task(self, url: str, save_path: str) -> DownloadTask:
         task = DownloadTask(url=url, save_path=save_path, status=TaskStatus.PENDING)
@@ -53,6 +59,8 @@ class DownloadManager:
             self.task_queue.task_done()
     
     def _process_task(self, task: DownloadTask):
+        bus_id = self.progress_bus.add_task(task.url)
+        self._bus_tasks[bus_id] = task
         try:
             with self.lock:
                 task.status = TaskStatus.DOWNLOADING
@@ -64,7 +72,7 @@ class DownloadManager:
             ydl_opts = {
                 'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
                 'outtmpl': f'{author_dir}/%(title)s.%(ext)s',
-                'progress_hooks': [lambda d: self._progress_hook(task, d)],
+                'progress_hooks': [lambda d: self._progress_hook(task, d, bus_id)],
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -81,11 +89,21 @@ class DownloadManager:
                 task.status = TaskStatus.FAILED
                 task.error_message = str(e)
                 self.active_tasks.remove(task)
+        finally:
+            self.progress_bus.remove_task(bus_id)
+            self._bus_tasks.pop(bus_id, None)
     
-    def _progress_hook(self, task: DownloadTask, d: dict):
+    def _progress_hook(self, task: DownloadTask, d: dict, bus_id: int):
         if d['status'] == 'downloading':
             task.progress = float(d.get('downloaded_bytes', 0)) / float(d.get('total_bytes', 1))
-            if self.on_progress_callback:
+            self.progress_bus.update(bus_id, total=d.get('total_bytes'), completed=d.get('downloaded_bytes', 0))
+
+    def _on_progress(self, snapshot):
+        if not self.on_progress_callback:
+            return
+        for state in snapshot.changed:
+            task = self._bus_tasks.get(state.task_id)
+            if task is not None:
                 self.on_progress_callback(task)
     
     def pause_task(self, task: DownloadTask):
@@ -1,5 +1,7 @@
 import os
+import sys
 import asyncio
+import importlib
 import aiohttp
 import aiofiles
 import ffmpeg
@@ -7,6 +9,10 @@ from typing import Dict, Optional, Callable, List
 from dataclasses import dataclass
 from enum import Enum
 from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from apiproxy.common import bandwidth_shaper
+from apiproxy.common.progress import ProgressBus
 from .manager import DownloadManager, DownloadTask, TaskStatus
 
 class DownloadStatus(Enum):
@@ -39,13 +45,75 @@ class ProgressCallback:
         for callback in self._callbacks:
             callback(task)
 
+def _qt_core():
+    """界面使用的 Qt 绑定的 QtCore 模块
+
+    优先使用进程中已经加载的绑定(同一进程混用两种绑定时信号无法投递), 其次 PySide6, 再次 PyQt6;
+    都没有安装时返回 None。
+    """
+    names = ("PySide6.QtCore", "PyQt6.QtCore")
+    for name in names:
+        if name in sys.modules:
+            return sys.modules[name]
+    for name in names:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    return None
+
+
+def _gui_relay(callback: Callable[[DownloadTask], None]):
+    """创建把通知转交到界面线程执行的 QObject; 没有 Qt 或没有创建 QApplication 时返回 None
+
+    进度总线的后台线程与下载协程所在的线程都不能直接操作界面控件,
+    它们发出信号, 由排队连接在界面线程的事件循环中调用 callback。
+    """
+    QtCore = _qt_core()
+    if QtCore is None or QtCore.QCoreApplication.instance() is None:
+        return None
+    Signal = getattr(QtCore, "Signal", None) or QtCore.pyqtSignal
+
+    class Relay(QtCore.QObject):
+        notify = Signal(object)
+
+        def __init__(self):
+            super().__init__()
+            self.notify.connect(self._deliver, QtCore.Qt.ConnectionType.QueuedConnection)
+
+        def _deliver(self, task):
+            callback(task)
+
+    relay = Relay()
+    relay.moveToThread(QtCore.QCoreApplication.instance().thread())
+    return relay
+
+
 class VideoDownloader:
     """视频下载器"""
     def __init__(self, max_workers: int = (os.cpu_count() or 1) * 2):
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.progress_callback = ProgressCallback()
+        # 界面回调统一经由 Qt 信号在界面线程中执行
+        self._relay = _gui_relay(self.progress_callback.notify)
         self.tasks: Dict[str, DownloadTask] = {}
         self._paused = set()
+        # 字节进度先提交到进度总线, 按 10Hz 合并后再通知界面, 状态变化仍然立即通知
+        self.progress_bus = ProgressBus()
+        self.progress_bus.subscribe(self._on_progress)
+        self._bus_tasks: Dict[int, DownloadTask] = {}
+
+    def _notify(self, task: DownloadTask):
+        if self._relay is not None:
+            self._relay.notify.emit(task)
+        else:
+            self.progress_callback.notify(task)
+
+    def _on_progress(self, snapshot):
+        for state in snapshot.changed:
+            task = self._bus_tasks.get(state.task_id)
+            if task is not None and task.status == DownloadStatus.DOWNLOADING:
+                self._notify(task)
     
     def add_task(self, url: str, save_path: str, filename: str) -> DownloadTask:
         """添加下载任务"""
@@ -57,9 +125,15 @@ class VideoDownloader:
         """开始下载任务"""
         if task.status == DownloadStatus.COMPLETED:
             return
+        if bandwidth_shaper.exhausted():
+            task.status = DownloadStatus.FAILED
+            task.error = "流量预算已用完"
+            self._notify(task)
+            return
         
         task.status = DownloadStatus.DOWNLOADING
-        self.progress_callback.notify(task)
+        self._notify(task)
+        bus_id = None
         
         try:
             # 创建保存目录
@@ -70,8 +144,12 @@ class VideoDownloader:
             async with aiohttp.ClientSession() as session:
                 async with session.head(task.url) as resp:
                     task.total_size = int(resp.headers.get('content-length', 0))
+            bus_id = self.progress_bus.add_task(task.filename, total=task.total_size or None,
+                                                completed=task.downloaded_size)
+            self._bus_tasks[bus_id] = task
             
             # 下载文件
+            host = urlsplit(task.url).netloc
             async with aiohttp.ClientSession() as session:
                 async with session.get(task.url) as resp:
                     if resp.status != 200:
@@ -81,20 +159,26 @@ class VideoDownloader:
                         async for chunk in resp.content.iter_chunked(8192):
                             if task.url in self._paused:
                                 task.status = DownloadStatus.PAUSED
-                                self.progress_callback.notify(task)
+                                self._notify(task)
                                 return
                             
                             await f.write(chunk)
                             task.downloaded_size += len(chunk)
-                            self.progress_callback.notify(task)
+                            self.progress_bus.advance(bus_id, len(chunk))
+                            # 与命令行下载共享带宽上限与流量预算
+                            await bandwidth_shaper.aconsume(len(chunk), host)
             
             task.status = DownloadStatus.COMPLETED
-            self.progress_callback.notify(task)
+            self._notify(task)
             
         except Exception as e:
             task.status = DownloadStatus.FAILED
             task.error = str(e)
-            self.progress_callback.notify(task)
+            self._notify(task)
+        finally:
+            if bus_id is not None:
+                self.progress_bus.remove_task(bus_id)
+                self._bus_tasks.pop(bus_id, None)
     
     def pause_task(self, task: DownloadTask):
         """暂停下载任务"""
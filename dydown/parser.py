@@ -7,6 +7,10 @@ from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
 
+from apiproxy.common.cache import ResponseCache
+
+DETAIL_API = "https://www.douyin.com/aweme/v1/web/aweme/detail/?"
+
 @dataclass
 class VideoInfo:
     """视频信息"""
@@ -20,9 +24,11 @@ class VideoInfo:
 
 class VideoParser:
     """视频解析器"""
-    def __init__(self, cookies: Dict[str, str], max_workers: int = 3):
+    def __init__(self, cookies: Dict[str, str], max_workers: int = 3, cache_path: str = "api_cache.db"):
         self.cookies = cookies
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # 接口响应缓存(与命令行使用同一个缓存文件), 重复解析同一作品时不再请求接口
+        self.cache = ResponseCache(cache_path, ttls={urlparse(DETAIL_API).path: 30 * 60})
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Referer": "https://www.douyin.com/"
@@ -41,39 +47,46 @@ class VideoParser:
     
     async def parse_video(self, video_id: str) -> Optional[VideoInfo]:
         """解析视频信息"""
-        api_url = f"https://www.douyin.com/aweme/v1/web/aweme/detail/?aweme_id={video_id}"
-        
-        async with aiohttp.ClientSession(cookies=self.cookies) as session:
-            async with session.get(api_url, headers=self.headers) as resp:
-                if resp.status != 200:
-                    return None
-                
-                try:
-                    data = await resp.json()
-                    aweme = data['aweme_detail']
-                    
-                    # 提取视频信息
-                    video_info = VideoInfo(
-                        id=video_id,
-                        title=aweme['desc'],
-                        author=aweme['author']['nickname'],
-                        cover_url=aweme['video']['cover']['url_list'][0],
-                        duration=aweme['video']['duration'],
-                        resolutions=[],
-                        download_urls={}
-                    )
-                    
-                    # 提取不同清晰度的下载地址
-                    video_urls = aweme['video']['play_addr']['url_list']
-                    if video_urls:
-                        video_info.download_urls['原画'] = video_urls[0]
-                        video_info.resolutions.append('原画')
-                    
-                    return video_info
-                    
-                except Exception as e:
-                    print(f"解析视频信息失败: {e}")
-                    return None
+        query = f"aweme_id={video_id}"
+        data = self.cache.get(DETAIL_API, query)
+        if data is None:
+            async with aiohttp.ClientSession(cookies=self.cookies) as session:
+                async with session.get(DETAIL_API + query, headers=self.headers) as resp:
+                    if resp.status != 200:
+                        return None
+                    try:
+                        data = await resp.json()
+                    except Exception as e:
+                        print(f"解析视频信息失败: {e}")
+                        return None
+            if data and data.get('aweme_detail'):
+                self.cache.put(DETAIL_API, query, data)
+
+        try:
+            aweme = data['aweme_detail']
+            
+            # 提取视频信息
+            video_info = VideoInfo(
+                id=video_id,
+                title=aweme['desc'],
+                author=aweme['author']['nickname'],
+                cover_url=aweme['video']['cover']['url_list'][0],
+                duration=aweme['video']['duration'],
+                resolutions=[],
+                download_urls={}
+            )
+            
+            # 提取不同清晰度的下载地址
+            video_urls = aweme['video']['play_addr']['url_list']
+            if video_urls:
+                video_info.download_urls['原画'] = video_urls[0]
+                video_info.resolutions.append('原画')
+            
+            return video_info
+            
+        except Exception as e:
+            print(f"解析视频信息失败: {e}")
+            return None
     
     async def parse_collection(self, collection_id: str) -> List[VideoInfo]:
         """解析视频合集"""
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import re
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# apiproxy.douyin 导入时会请求 ttwid, 测试中不访问网络
+from apiproxy.common import utils  # noqa: E402
+
+utils.getttwid = lambda: "test"
+
+
+class MediaServer(object):
+    """本地媒体服务器, 支持 Range
+
+    files 为 {路径: 内容}; rate 为 {路径: 字节/秒} 或返回速率的函数 rate(path, 请求序号),
+    为 0 时不限速。每个请求记录为 (路径, Range 请求头), peak 为同时处理的最大请求数。
+    """
+
+    def __init__(self, files, rate=None):
+        self.files = files
+        self.rate = rate or {}
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                try:
+                    server._serve(self)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def _rate(self, path: str, index: int) -> float:
+        if callable(self.rate):
+            return self.rate(path, index)
+        return self.rate.get(path, 0)
+
+    def _serve(self, handler):
+        path = handler.path.split("?")[0]
+        body = self.files.get(path)
+        if body is None:
+            handler.send_error(404)
+            return
+        requested = handler.headers.get("Range")
+        with self._lock:
+            index = len(self.requests)
+            self.requests.append((path, requested))
+        start, end, status = 0, len(body) - 1, 200
+        if requested:
+            match = re.match(r"bytes=(\d+)-(\d*)", requested)
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            status = 206
+        handler.send_response(status)
+        handler.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        handler.end_headers()
+        rate = self._rate(path, index)
+        step = max(1, int(rate / 10)) if rate else 64 * 1024
+        pos = start
+        try:
+            while pos <= end:
+                data = body[pos:min(pos + step, end + 1)]
+                handler.wfile.write(data)
+                handler.wfile.flush()
+                pos += len(data)
+                if rate:
+                    time.sleep(len(data) / rate)
+        except OSError:
+            pass
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def media_server():
+    servers = []
+
+    def start(files, rate=None) -> MediaServer:
+        server = MediaServer(files, rate)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
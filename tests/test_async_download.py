@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import time
+import asyncio
+
+from apiproxy.common import bandwidth_shaper
+from apiproxy.douyin.async_download import AsyncDownload
+
+KB = 1024
+
+
+def test_job_rate_applies_in_async_mode(media_server, tmp_path):
+    body = os.urandom(512 * KB)
+    server = media_server({"/v.mp4": body})
+    aweme = {"create_time": "2024-01-01 00.00.00", "desc": "d", "awemeType": 0,
+             "video": {"play_addr": {"uri": "v", "url_list": [server.url("/v.mp4")]}}}
+
+    async def run():
+        async with AsyncDownload(segments=1, music=False, cover=False, avatar=False, resjson=False,
+                                 min_speed_kb=0) as adl:
+            return await adl.userDownloadAsync([aweme], tmp_path, job="user:J")
+
+    bandwidth_shaper.configure(job_rate=256 * KB)
+    try:
+        started = time.monotonic()
+        assert asyncio.run(run()) == 1
+        elapsed = time.monotonic() - started
+    finally:
+        bandwidth_shaper.configure(job_rate=0)
+    assert bandwidth_shaper.job_used["user:J"] == len(body)
+    # 512KB 按 256KB/s 限速, 扣除一个突发容量后至少 1.5 秒
+    assert elapsed > 1.5
+    assert (tmp_path / "2024-01-01 00.00.00_d" / "2024-01-01 00.00.00_d_video.mp4").read_bytes() == body
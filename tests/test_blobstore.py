@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+
+from apiproxy.douyin import blobstore
+from apiproxy.douyin.blobstore import BlobStore
+
+
+def _no_links(monkeypatch):
+    def fail(src, dst):
+        raise OSError("not supported")
+
+    monkeypatch.setattr(blobstore.os, "link", fail)
+    monkeypatch.setattr(blobstore, "_reflink", lambda src, dst: False)
+
+
+def test_add_links_into_store(tmp_path):
+    store = BlobStore(tmp_path / ".blobs")
+    first = tmp_path / "a" / "v.mp4"
+    first.parent.mkdir()
+    first.write_bytes(b"x" * 100)
+    store.add("video:v1", first)
+    blob = store._blob_path("video:v1")
+    assert os.path.samefile(blob, first)
+    second = tmp_path / "b" / "v.mp4"
+    assert store.link("video:v1", second)
+    assert os.path.samefile(second, first)
+
+
+def test_add_without_links_indexes_output_path(tmp_path, monkeypatch):
+    _no_links(monkeypatch)
+    store = BlobStore(tmp_path / ".blobs")
+    first = tmp_path / "a" / "v.mp4"
+    first.parent.mkdir()
+    first.write_bytes(b"x" * 100)
+    store.add("video:v1", first)
+    # 不复制进仓库
+    assert not store._blob_path("video:v1").exists()
+    second = tmp_path / "b" / "v.mp4"
+    assert store.link("video:v1", second)
+    assert second.read_bytes() == first.read_bytes()
+    # 登记的文件被删除后重新下载
+    first.unlink()
+    assert not store.link("video:v1", tmp_path / "c" / "v.mp4")
+
+
+def test_claim_is_per_key(tmp_path):
+    store = BlobStore(tmp_path / ".blobs")
+    assert store.claim("video:a") is None
+    assert store.claim("video:b") is None
+    waiting = store.claim("video:a")
+    assert waiting is not None and not waiting.is_set()
+    store.release("video:a")
+    assert waiting.is_set()
+    assert store.claim("video:a") is None
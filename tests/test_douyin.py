@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import re
+
+from apiproxy.douyin import douyin
+from apiproxy.douyin.douyin import Douyin
+
+# 三页音乐作品: 游标 -> 作品序号
+PAGES = {0: [0, 1, 2], 3: [3, 4, 5], 6: [6, 7]}
+
+
+def _aweme(i):
+    return {
+        "aweme_id": str(7000000000000000000 + i), "create_time": 1700000000 - i * 3600, "desc": f"作品 {i}",
+        "is_top": 0, "author": {"nickname": "nick", "sec_uid": "SEC", "uid": "1"},
+        "music": {"title": "music", "play_url": {"uri": "m", "url_list": ["http://x/m.mp3"]}},
+        "video": {"play_addr": {"uri": f"v{i}", "url_list": ["http://x/v.mp4"]}, "cover": {"uri": "c", "url_list": []}},
+    }
+
+
+def _fake_api(url, query, *args, **kwargs):
+    cursor = int(re.search(r"cursor=(\d+)", query).group(1))
+    return {"status_code": 0, "aweme_list": [_aweme(i) for i in PAGES[cursor]],
+            "cursor": cursor + len(PAGES[cursor]), "has_more": int(cursor < 6)}
+
+
+def _state(dy):
+    return dy.db.get_crawl_state("music", "M", dy._crawlFilter(0, True))
+
+
+def _known(dy):
+    return {int(i) - 7000000000000000000 for i in dy.db.known_music("M", [_aweme(i)["aweme_id"] for i in range(8)])}
+
+
+def test_checkpoint_waits_for_in_flight_pages(monkeypatch, tmp_path):
+    monkeypatch.setattr(douyin, "requestApi", _fake_api)
+    dy = Douyin(database=True, db_path=str(tmp_path / "data.db"))
+    feed = dy.iterMusicInfo("M", increase=True)
+    first, second = [next(feed) for _ in range(3)], [next(feed) for _ in range(3)]
+
+    # 第二页先下载完, 第一页还有作品在途: 断点不越过第一页, 也不记为已下载
+    for aweme in second + first[1:]:
+        feed.ack(aweme)
+    assert (_state(dy)["cursor"], _state(dy)["pages"]) == (0, 0)
+    assert _known(dy) == set()
+
+    feed.ack(first[0])
+    assert (_state(dy)["cursor"], _state(dy)["yielded"], _state(dy)["pages"]) == (6, 6, 2)
+    assert _known(dy) == set(range(6))
+
+    rest = list(feed)
+    assert not _state(dy)["done"]
+    for aweme in rest:
+        feed.ack(aweme)
+    assert _state(dy)["done"] and _known(dy) == set(range(8))
+
+
+def test_resume_from_oldest_unfinished_page(monkeypatch, tmp_path):
+    monkeypatch.setattr(douyin, "requestApi", _fake_api)
+    db_path = str(tmp_path / "data.db")
+    dy = Douyin(database=True, db_path=db_path)
+    feed = dy.iterMusicInfo("M", increase=True)
+    awemes = list(feed)
+    # 第二页的一个作品还没下载完时中断
+    for aweme in awemes:
+        if aweme["aweme_id"] != _aweme(4)["aweme_id"]:
+            feed.ack(aweme)
+    assert _state(dy)["cursor"] == 3
+
+    # 增量更新从第二页继续, 第二页之后的作品没有被当作已下载
+    resumed = list(Douyin(database=True, db_path=db_path).iterMusicInfo("M", increase=True).drain())
+    assert [aweme["aweme_id"] for aweme in resumed] == [_aweme(i)["aweme_id"] for i in range(3, 8)]
+    assert _state(dy)["done"]
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import json
+
+from apiproxy.douyin import douyinapi
+from apiproxy.douyin.douyinapi import DouyinApi
+
+
+def _aweme(i, images=False):
+    return {
+        "aweme_id": str(7000000000000000000 + i), "create_time": 1700000000 - i * 3600, "desc": f"作品 {i}",
+        "author": {"nickname": "nick", "sec_uid": "SEC", "uid": "1",
+                   "avatar_thumb": {"uri": "av", "url_list": ["http://x/100x100/a.jpeg"], "width": 100, "height": 100}},
+        "music": {"title": "music", "play_url": {"uri": "m", "url_list": ["http://x/m.mp3"]}},
+        "statistics": {"digg_count": 4},
+        "images": [{"uri": f"img{i}", "url_list": ["http://x/i.jpeg"], "width": 10, "height": 10}] if images else None,
+        "video": {"play_addr": {"uri": f"v{i}", "url_list": ["http://x/v.mp4"]}, "cover": {"uri": "c", "url_list": []}},
+    }
+
+
+def _check_plain(aweme):
+    assert type(aweme) is dict
+    assert json.loads(json.dumps(aweme))["aweme_id"] == aweme["aweme_id"]
+    aweme["extra"] = 1
+
+
+def test_public_api_returns_plain_dicts(monkeypatch):
+    page = {"status_code": 0, "aweme_list": [_aweme(0), _aweme(1, images=True)],
+            "max_cursor": 0, "cursor": 2, "has_more": 0}
+    monkeypatch.setattr(douyinapi, "requestApi",
+                        lambda url, query, *args, **kwargs: {"status_code": 0, "aweme_detail": _aweme(2)}
+                        if "aweme_id=" in query else page)
+    api = DouyinApi()
+    aweme, _ = api.getAwemeInfoApi("1")
+    _check_plain(aweme)
+    for awemes in (api.getUserInfoApi("SEC")[0], api.getMixInfoApi("1")[0], api.getMusicInfoApi("1")[0]):
+        assert [a["awemeType"] for a in awemes] == [0, 1]
+        for aweme in awemes:
+            _check_plain(aweme)
+            assert type(aweme["author"]) is dict
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import time
+import threading
+
+from apiproxy.douyin.download import ByteBudget, Download
+
+MB = 1024 * 1024
+
+
+def test_budget_reserves_one_window_per_stream():
+    budget = ByteBudget(32 * MB, window=4 * MB)
+    assert budget.acquire(40 * MB) == 4 * MB
+    assert budget.try_acquire(10 * 1024) == 10 * 1024
+    assert budget.acquire(40 * MB, streams=4) == 16 * MB
+    # 缓冲窗口不超过总预算的四分之一
+    assert ByteBudget(4 * MB, window=4 * MB).window == MB
+
+
+def test_large_download_does_not_block_small_assets(media_server, tmp_path):
+    big, small = os.urandom(8 * MB), os.urandom(10 * 1024)
+    server = media_server({"/big.mp4": big, "/small.jpeg": small}, rate={"/big.mp4": 4 * MB})
+    dl = Download(segments=1, inflight_mb=4, min_speed_kb=0)
+    worker = threading.Thread(target=dl.download_with_resume,
+                              args=(server.url("/big.mp4"), tmp_path / "big.mp4", "big"))
+    worker.start()
+    time.sleep(0.3)
+    started = time.monotonic()
+    assert dl.download_with_resume(server.url("/small.jpeg"), tmp_path / "small.jpeg", "small")
+    assert time.monotonic() - started < 1
+    assert worker.is_alive()
+    worker.join()
+    assert (tmp_path / "big.mp4").read_bytes() == big
+    assert (tmp_path / "small.jpeg").read_bytes() == small
+    assert dl.byte_budget.in_flight == 0
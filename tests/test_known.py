@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+
+from apiproxy.douyin import known
+from apiproxy.douyin.database import DataBase
+
+
+def _awemes(*ids):
+    return [{"aweme_id": str(7000000000000000000 + i)} for i in ids]
+
+
+def _ids(*ids):
+    return {aweme["aweme_id"] for aweme in _awemes(*ids)}
+
+
+def test_databases_share_one_index(tmp_path):
+    path = str(tmp_path / "data.db")
+    first, second = DataBase(path), DataBase(path)
+    assert first.known is second.known
+    first.insert_musics("M", _awemes(1, 2))
+    assert second.known_music("M", _ids(1, 2, 3)) == _ids(1, 2)
+    # 关闭其中一个实例后, 另一个仍可对齐其他连接写入的行
+    first.close()
+    DataBase(path).insert_musics("M", _awemes(3))
+    assert second.known_music("M", _ids(1, 2, 3)) == _ids(1, 2, 3)
+    second.close()
+
+
+def test_failed_flush_does_not_break_inserts(tmp_path, monkeypatch):
+    monkeypatch.setattr(known.KnownIndex, "FLUSH_THRESHOLD", 2)
+    db = DataBase(str(tmp_path / "data.db"))
+    db.insert_musics("M", _awemes(1, 2))
+
+    def locked(src, dst):
+        raise PermissionError(13, "The process cannot access the file", dst)
+
+    # Windows 下其他进程仍映射着索引文件时替换失败
+    monkeypatch.setattr(os, "replace", locked)
+    db.insert_musics("M", _awemes(3, 4))
+    assert db.known_music("M", _ids(1, 2, 3, 4, 5)) == _ids(1, 2, 3, 4)
+    monkeypatch.undo()
+    db.close()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import time
+import threading
+
+from apiproxy.douyin.orchestrator import CrawlOrchestrator, CrawlJob
+
+
+def test_jobs_run_on_all_workers():
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def run(context):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.2)
+        with lock:
+            state["running"] -= 1
+
+    orchestrator = CrawlOrchestrator(workers=4, per_owner=1)
+    for owner in ("a", "b", "c", "d"):
+        orchestrator.add(CrawlJob(owner, "post", run))
+    jobs = orchestrator.run()
+    assert state["peak"] == 4
+    assert all(job.status == "done" for job in jobs)
+
+
+def test_owner_jobs_run_one_at_a_time():
+    order = []
+    orchestrator = CrawlOrchestrator(workers=4, per_owner=1)
+    for mode in ("post", "like", "mix"):
+        orchestrator.add(CrawlJob("a", mode, lambda context, mode=mode: order.append(mode) or time.sleep(0.05)))
+    orchestrator.run()
+    assert order == ["post", "like", "mix"]
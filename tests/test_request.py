@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import json
+import threading
+from urllib.parse import urlsplit
+
+from apiproxy.common import host_gate
+from apiproxy.douyin.request import requestApi
+
+
+def test_host_gate_limits_concurrent_api_requests(media_server):
+    body = json.dumps({"status_code": 0, "padding": "x" * 600}).encode()
+    server = media_server({"/aweme/v1/web/test/": body}, rate={"/aweme/v1/web/test/": 2000})
+    base_url = server.url("/aweme/v1/web/test/?")
+    host_gate.configure({urlsplit(base_url).netloc: 2})
+    results = []
+    try:
+        threads = [threading.Thread(target=lambda: results.append(requestApi(base_url, "a=1", sign=False, cache=False)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        host_gate.configure({})
+    assert len(results) == 5 and all(result and result["status_code"] == 0 for result in results)
+    assert server.peak == 2
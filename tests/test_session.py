@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+from apiproxy.common.session import HttpSession
+
+
+def test_resize_closes_replaced_pools(media_server):
+    server = media_server({"/a.jpeg": b"x" * 1024})
+    http = HttpSession(cdn_pool_size=2)
+    old = http.session.adapters["http://"]
+    assert http.get(server.url("/a.jpeg")).content == b"x" * 1024
+    assert len(old.poolmanager.pools) == 1
+
+    http.set_pool_size(cdn=4)
+    assert len(old.poolmanager.pools) == 0
+    adapter = http.session.adapters["http://"]
+    assert adapter is not old and adapter is http.session.adapters["https://"]
+    assert adapter._pool_maxsize == 4
+    assert http.get(server.url("/a.jpeg")).status_code == 200
+    http.close()
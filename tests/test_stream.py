@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import os
+import time
+
+from apiproxy.douyin.download import Download
+from apiproxy.douyin.stream import SpeedFloor
+
+
+def test_floor_trips_while_read_is_pending():
+    floor = SpeedFloor(20 * 1024, 2)
+    # 阻塞中的一次读取不算作已传输
+    assert floor.max_read * 4 <= floor.min_speed * floor.window
+    assert floor.check(floor._mark + 2.5)
+
+
+def test_floor_keeps_stream_at_speed():
+    floor = SpeedFloor(20 * 1024, 2)
+    start = floor._mark
+    for step in range(1, 9):
+        floor.feed(floor.max_read)
+        assert not floor.check(start + step * floor.max_read / (30 * 1024))
+
+
+def test_slow_stream_is_aborted_and_resumed(media_server, tmp_path):
+    body = os.urandom(400 * 1024)
+    # 第一个连接只有 5KB/s, 之后的续传不限速
+    server = media_server({"/a.mp4": body}, rate=lambda path, index: 5 * 1024 if index == 0 else 0)
+    dl = Download(segments=1, min_speed_kb=20, stall_window=2)
+    target = tmp_path / "a.mp4"
+    started = time.monotonic()
+    assert dl.download_with_resume(server.url("/a.mp4"), target, "a")
+    # 全程 5KB/s 需要 80 秒
+    assert time.monotonic() - started < 15
+    assert target.read_bytes() == body
+    assert len(server.requests) == 2
+    resumed = server.requests[1][1]
+    assert resumed and resumed.startswith("bytes=") and int(resumed[6:].split("-")[0]) > 0